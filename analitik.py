@@ -0,0 +1,427 @@
+import os
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy opsional: hanya dibutuhkan jika ANALITIK=1
+    np = None
+
+from flask import jsonify, request
+
+import database as db
+import uang
+
+# Dimensi yang bisa dipakai untuk group-by dan pivot
+DIMENSI = ('user', 'tipe', 'kategori', 'bulan', 'tanggal')
+# Baris yang dibaca per fetchmany saat memuat snapshot
+UKURAN_BATCH = 50_000
+# Snapshot dipadatkan jika porsi baris mati (versi lama dari baris yang
+# diubah, atau baris yang dihapus) melebihi ini
+PORSI_MATI_MAKS = 0.25
+# Batas kelompok dalam satu hasil /api/analitik
+MAX_KELOMPOK = 10_000
+
+# Tanggal disimpan sebagai jumlah hari sejak 1970-01-01 (julianday 2440587.5)
+_KOLOM_SQL = '''
+    SELECT id, user_id, CAST(julianday(tanggal) - 2440587.5 AS INTEGER), tipe, kategori, jumlah
+    FROM transaksi
+'''
+
+_aktif = False
+_snapshot = None
+_pid = None
+_lock = threading.Lock()
+
+
+class _Kamus:
+    """Dictionary encoding: setiap nilai berbeda mendapat kode int berurutan
+    sesuai kemunculan pertamanya. Kode tidak pernah berubah, jadi kolom lama
+    tetap valid setelah nilai baru ditambahkan."""
+
+    def __init__(self):
+        self.kode = {}
+
+    def kodekan(self, nilai, dtype):
+        kode = self.kode
+        for baru in dict.fromkeys(nilai).keys() - kode.keys():
+            kode[baru] = len(kode)
+        return np.fromiter(map(kode.__getitem__, nilai), dtype, len(nilai))
+
+    def label(self):
+        return tuple(self.kode)
+
+
+class Kolom:
+    """Isi snapshot pada satu saat: array per kolom transaksi (sejajar) dan
+    label untuk kolom yang di-dictionary-encode. Tidak pernah diubah setelah
+    dibuat; pembaruan membuat Kolom baru."""
+
+    __slots__ = ('id', 'user', 'tipe', 'kategori', 'tanggal', 'jumlah', 'hidup',
+                 'label_user', 'label_tipe', 'label_kategori')
+
+    def __init__(self, id, user, tipe, kategori, tanggal, jumlah, hidup,
+                 label_user=(), label_tipe=(), label_kategori=()):
+        self.id = id                    # int64
+        self.user = user                # int32, kode -> label_user (user_id)
+        self.tipe = tipe                # int8, kode -> label_tipe
+        self.kategori = kategori        # int32, kode -> label_kategori
+        self.tanggal = tanggal          # int64, hari sejak 1970-01-01
+        self.jumlah = jumlah            # int64, sen
+        self.hidup = hidup              # bool, False untuk versi lama/dihapus
+        self.label_user = label_user
+        self.label_tipe = label_tipe
+        self.label_kategori = label_kategori
+
+    @classmethod
+    def kosong(cls):
+        return cls(np.empty(0, np.int64), np.empty(0, np.int32), np.empty(0, np.int8),
+                   np.empty(0, np.int32), np.empty(0, np.int64), np.empty(0, np.int64),
+                   np.empty(0, bool))
+
+    def __len__(self):
+        return len(self.id)
+
+    def mati(self):
+        return len(self.hidup) - int(np.count_nonzero(self.hidup))
+
+
+class Snapshot:
+    """Salinan kolumnar tabel transaksi (semua shard) di memori proses ini.
+
+    Setiap pembacaan memeriksa penanda per file database (id terbesar dan
+    seq terakhir perubahan_transaksi) lalu hanya memuat baris baru dan
+    baris yang diubah/dihapus sejak pembacaan sebelumnya.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kolom = Kolom.kosong()
+        self._penanda = {}
+        self._user = _Kamus()
+        self._tipe = _Kamus()
+        self._kategori = _Kamus()
+        self.stats = {'muat_penuh': 0, 'muat_bertahap': 0, 'baris_dimuat': 0}
+
+    def kolom(self):
+        """Kolom terbaru; membaca perubahan dari database dulu jika ada."""
+        with self._lock:
+            self._segarkan()
+            return self._kolom
+
+    def _segarkan(self):
+        if not self._penanda:
+            self._muat_penuh()
+            return
+        potongan, diubah = [], []
+        penanda = dict(self._penanda)
+        for i, conn in enumerate(db.koneksi_shard()):
+            # Satu transaksi baca: penanda dan baris berasal dari snapshot WAL yang sama
+            conn.execute('BEGIN')
+            try:
+                hasil = self._baca_perubahan(conn, penanda.get(i))
+            finally:
+                conn.commit()
+            if hasil is None:
+                self._muat_penuh()
+                return
+            penanda[i], baris, berubah = hasil
+            potongan.extend(baris)
+            diubah.extend(berubah)
+        if not potongan and not diubah:
+            self._penanda = penanda
+            return
+
+        lama = self._kolom
+        hidup = lama.hidup
+        if diubah:
+            hidup = hidup & ~np.isin(lama.id, np.fromiter(diubah, np.int64, len(diubah)))
+        kolom = self._gabung([Kolom(lama.id, lama.user, lama.tipe, lama.kategori, lama.tanggal,
+                                    lama.jumlah, hidup)] + potongan)
+        if kolom.mati() > PORSI_MATI_MAKS * len(kolom):
+            kolom = _pilih(kolom, kolom.hidup)
+        self._kolom = kolom
+        self._penanda = penanda
+        self.stats['muat_bertahap'] += 1
+
+    def _baca_perubahan(self, conn, penanda):
+        """(penanda baru, potongan Kolom, id yang diubah/dihapus), atau None
+        jika file ini harus dimuat ulang dari awal."""
+        id_maks, seq_maks, seq_min = conn.execute('''
+            SELECT (SELECT COALESCE(MAX(id), 0) FROM transaksi),
+                   (SELECT COALESCE(MAX(seq), 0) FROM perubahan_transaksi),
+                   (SELECT MIN(seq) FROM perubahan_transaksi)
+        ''').fetchone()
+        if penanda is None:
+            # Jumlah shard berubah sejak pemuatan terakhir
+            return None
+        id_lama, seq_lama = penanda
+        if (id_maks, seq_maks) == (id_lama, seq_lama):
+            return penanda, [], []
+        if id_maks < id_lama or seq_maks < seq_lama or (seq_min or 0) > seq_lama + 1:
+            # File diganti/dipulihkan, atau log sudah dipangkas melewati penanda
+            return None
+
+        diubah = [id_ for (id_,) in conn.execute(
+            'SELECT DISTINCT id FROM perubahan_transaksi WHERE seq > ? AND id <= ?', (seq_lama, id_lama))]
+        potongan = []
+        # Versi terbaru baris lama yang diubah (yang dihapus tidak kembali)
+        for awal in range(0, len(diubah), 500):
+            bagian = diubah[awal:awal + 500]
+            potongan.extend(self._baca(conn, _KOLOM_SQL + f" WHERE id IN ({','.join('?' * len(bagian))})",
+                                       bagian))
+        potongan.extend(self._baca(conn, _KOLOM_SQL + ' WHERE id > ? ORDER BY id', (id_lama,)))
+        return (id_maks, seq_maks), potongan, diubah
+
+    def _muat_penuh(self):
+        self._kolom = Kolom.kosong()
+        self._penanda = {}
+        potongan, penanda = [], {}
+        for i, conn in enumerate(db.koneksi_shard()):
+            conn.execute('BEGIN')
+            try:
+                id_maks, seq_maks = conn.execute('''
+                    SELECT (SELECT COALESCE(MAX(id), 0) FROM transaksi),
+                           (SELECT COALESCE(MAX(seq), 0) FROM perubahan_transaksi)
+                ''').fetchone()
+                potongan.extend(self._baca(conn, _KOLOM_SQL + ' WHERE id <= ? ORDER BY id', (id_maks,)))
+            finally:
+                conn.commit()
+            penanda[i] = (id_maks, seq_maks)
+        self._kolom = self._gabung(potongan)
+        self._penanda = penanda
+        self.stats['muat_penuh'] += 1
+
+    def _baca(self, conn, query, params):
+        """Membaca hasil query per batch dan langsung mengubahnya menjadi
+        potongan Kolom, tanpa menampung semua baris sebagai objek Python."""
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(query, params)
+        potongan = []
+        while True:
+            rows = cursor.fetchmany(UKURAN_BATCH)
+            if not rows:
+                return potongan
+            id_, user, tanggal, tipe, kategori, jumlah = zip(*rows)
+            n = len(rows)
+            potongan.append(Kolom(
+                np.fromiter(id_, np.int64, n),
+                self._user.kodekan(user, np.int32),
+                self._tipe.kodekan(tipe, np.int8),
+                self._kategori.kodekan(kategori, np.int32),
+                np.fromiter(tanggal, np.int64, n),
+                np.fromiter(jumlah, np.int64, n),
+                np.ones(n, bool)))
+            self.stats['baris_dimuat'] += n
+
+    def _gabung(self, potongan):
+        if not potongan:
+            potongan = [Kolom.kosong()]
+        return Kolom(*(np.concatenate([getattr(p, nama) for p in potongan])
+                       for nama in ('id', 'user', 'tipe', 'kategori', 'tanggal', 'jumlah', 'hidup')),
+                     self._user.label(), self._tipe.label(), self._kategori.label())
+
+
+def _pilih(kolom, mask):
+    return Kolom(kolom.id[mask], kolom.user[mask], kolom.tipe[mask], kolom.kategori[mask],
+                 kolom.tanggal[mask], kolom.jumlah[mask], kolom.hidup[mask],
+                 kolom.label_user, kolom.label_tipe, kolom.label_kategori)
+
+
+def _hari(tanggal):
+    return int(np.datetime64(tanggal[:10], 'D').astype(np.int64))
+
+
+def _kode(label, nilai):
+    try:
+        return label.index(nilai)
+    except ValueError:
+        return -1
+
+
+def filter_mask(kolom, start_date=None, end_date=None, user_id=None, tipe=None, kategori=None):
+    """Mask baris hidup yang lolos filter (semua opsional, tanggal inklusif
+    seperti admin_laporan; tipe 'Semua' berarti tanpa filter tipe)."""
+    mask = kolom.hidup.copy()
+    if start_date:
+        mask &= kolom.tanggal >= _hari(start_date)
+    if end_date:
+        mask &= kolom.tanggal <= _hari(end_date)
+    if user_id:
+        mask &= kolom.user == _kode(kolom.label_user, int(user_id))
+    if tipe and tipe != 'Semua':
+        mask &= kolom.tipe == _kode(kolom.label_tipe, tipe)
+    if kategori:
+        mask &= kolom.kategori == _kode(kolom.label_kategori, kategori)
+    return mask
+
+
+def _dimensi(kolom, nama, mask):
+    """(kode per baris terpilih, label per kode) untuk satu dimensi."""
+    if nama == 'user':
+        return kolom.user[mask], kolom.label_user
+    if nama == 'tipe':
+        return kolom.tipe[mask], kolom.label_tipe
+    if nama == 'kategori':
+        return kolom.kategori[mask], kolom.label_kategori
+    if nama == 'bulan':
+        nilai = kolom.tanggal[mask].astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        format_label = lambda v: str(np.datetime64(int(v), 'M'))
+    elif nama == 'tanggal':
+        nilai = kolom.tanggal[mask]
+        format_label = lambda v: str(np.datetime64(int(v), 'D'))
+    else:
+        raise ValueError(f'dimensi tidak dikenal: {nama}')
+    # Periode dikodekan relatif terhadap periode pertama yang muncul
+    awal = int(nilai.min()) if len(nilai) else 0
+    jumlah_periode = int(nilai.max()) - awal + 1 if len(nilai) else 0
+    return nilai - awal, [format_label(awal + i) for i in range(jumlah_periode)]
+
+
+def _kelompokkan(kolom, dimensi, mask):
+    """Group-by vektor: (kode kelompok yang terisi per dimensi, label per
+    dimensi, total sen, jumlah baris), urut kode."""
+    kode, label = zip(*(_dimensi(kolom, nama, mask) for nama in dimensi)) if dimensi else ((), ())
+    jumlah = kolom.jumlah[mask]
+    kunci = np.zeros(len(jumlah), np.int64)
+    ukuran = 1
+    for k, l in zip(kode, label):
+        kunci = kunci * max(len(l), 1) + k
+        ukuran *= max(len(l), 1)
+    if ukuran > 4 * len(kunci) + 1024:
+        # Kombinasi jarang (misalnya tanggal x user): padatkan kunci dulu
+        kunci_unik, kunci = np.unique(kunci, return_inverse=True)
+        ukuran = len(kunci_unik)
+    else:
+        kunci_unik = None
+    # np.add.at pada int64: jumlah tetap eksak (bincount menjumlah dalam float)
+    total = np.zeros(ukuran, np.int64)
+    np.add.at(total, kunci, jumlah)
+    banyak = np.bincount(kunci, minlength=ukuran)
+    terisi = np.flatnonzero(banyak)
+    gabungan = terisi if kunci_unik is None else kunci_unik[terisi]
+    kode_terisi = []
+    for l in reversed(label):
+        gabungan, sisa = np.divmod(gabungan, max(len(l), 1))
+        kode_terisi.append(sisa)
+    return kode_terisi[::-1], label, total[terisi], banyak[terisi]
+
+
+def agregasi(dimensi, start_date=None, end_date=None, user_id=None, tipe=None, kategori=None,
+             urut_total=False, limit=None):
+    """Total (sen) dan jumlah transaksi per kombinasi dimensi (lihat DIMENSI).
+
+    Mengembalikan list dict {dimensi..., 'total', 'n'}, urut dimensi, atau
+    urut total terbesar dengan urut_total=True (mis. top spender:
+    agregasi(('user',), tipe='Pengeluaran', urut_total=True, limit=10)).
+    """
+    kolom = snapshot().kolom()
+    mask = filter_mask(kolom, start_date, end_date, user_id, tipe, kategori)
+    kode, label, total, banyak = _kelompokkan(kolom, tuple(dimensi), mask)
+    urutan = np.argsort(-total, kind='stable') if urut_total else np.arange(len(total))
+    if limit is not None:
+        urutan = urutan[:limit]
+    return [{**{nama: label[d][int(kode[d][i])] for d, nama in enumerate(dimensi)},
+             'total': int(total[i]), 'n': int(banyak[i])} for i in urutan]
+
+
+def pivot(baris, kolom, start_date=None, end_date=None, user_id=None, tipe=None, kategori=None):
+    """Tabel total (sen) dengan satu dimensi sebagai baris dan satu sebagai
+    kolom, hanya berisi baris/kolom yang punya transaksi. ValueError jika
+    tabelnya lebih dari MAX_KELOMPOK sel."""
+    snap = snapshot().kolom()
+    mask = filter_mask(snap, start_date, end_date, user_id, tipe, kategori)
+    (kode_baris, kode_kolom), (label_baris, label_kolom), total, _ = \
+        _kelompokkan(snap, (baris, kolom), mask)
+    baris_ada, i = np.unique(kode_baris, return_inverse=True)
+    kolom_ada, j = np.unique(kode_kolom, return_inverse=True)
+    if len(baris_ada) * len(kolom_ada) > MAX_KELOMPOK:
+        raise ValueError(f'Hasil lebih dari {MAX_KELOMPOK} sel; persempit filter.')
+    data = np.zeros((len(baris_ada), len(kolom_ada)), np.int64)
+    data[i, j] = total
+    return {
+        'baris': [label_baris[k] for k in baris_ada.tolist()],
+        'kolom': [label_kolom[k] for k in kolom_ada.tolist()],
+        'data': data.tolist(),
+    }
+
+
+def stats_per_user(start_date=None, end_date=None):
+    """Pemasukan dan pengeluaran (sen) per user_id, seperti
+    database.admin_get_stats_per_user tetapi untuk rentang tanggal apa pun.
+    User tanpa transaksi di rentang itu tidak ikut."""
+    hasil = {}
+    for row in agregasi(('user', 'tipe'), start_date, end_date):
+        data = hasil.setdefault(row['user'], {'user_id': row['user'], 'pemasukan': 0, 'pengeluaran': 0})
+        if row['tipe'] in ('Pemasukan', 'Pengeluaran'):
+            data[row['tipe'].lower()] += row['total']
+    return list(hasil.values())
+
+
+def snapshot():
+    """Snapshot milik proses ini (dibuat saat pertama dipakai)."""
+    global _snapshot, _pid
+    with _lock:
+        if _pid != os.getpid():
+            # Lock snapshot proses induk bisa sedang dipegang saat fork
+            _snapshot = Snapshot()
+            _pid = os.getpid()
+        return _snapshot
+
+
+def aktif():
+    return _aktif
+
+
+def api_analitik():
+    """Group-by/pivot untuk admin. Query: baris (dimensi), kolom (dimensi,
+    opsional: pivot), start_date, end_date, user_id, tipe, kategori, dan
+    limit (urut total terbesar, tanpa kolom). Nominal dalam Rupiah.
+
+    Tidak memeriksa akses sendiri; app.py mendaftarkannya di balik
+    login_required dan is_admin()."""
+    baris, kolom = request.args.get('baris', 'user'), request.args.get('kolom')
+    if baris not in DIMENSI or (kolom and (kolom not in DIMENSI or kolom == baris)):
+        return jsonify({'error': f'Dimensi harus salah satu dari {", ".join(DIMENSI)}.'}), 400
+    try:
+        for nama in ('start_date', 'end_date'):
+            if request.args.get(nama):
+                _hari(request.args[nama])
+    except ValueError:
+        return jsonify({'error': 'Tanggal tidak valid. Gunakan format YYYY-MM-DD.'}), 400
+    filter = {nama: request.args.get(nama) or None
+              for nama in ('start_date', 'end_date', 'tipe', 'kategori')}
+    filter['user_id'] = request.args.get('user_id', type=int)
+
+    username = {row['id']: row['username'] for row in db.admin_get_all_users()}
+    nama_label = lambda dimensi, v: username.get(v, str(v)) if dimensi == 'user' else v
+    if kolom:
+        try:
+            hasil = pivot(baris, kolom, **filter)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({
+            'baris': [nama_label(baris, v) for v in hasil['baris']],
+            'kolom': [nama_label(kolom, v) for v in hasil['kolom']],
+            'data': [[uang.ke_rupiah(sen) for sen in r] for r in hasil['data']],
+        })
+    limit = max(1, min(request.args.get('limit', MAX_KELOMPOK, type=int), MAX_KELOMPOK))
+    hasil = agregasi((baris,), urut_total='limit' in request.args, limit=limit, **filter)
+    return jsonify([{baris: nama_label(baris, row[baris]), 'total': uang.ke_rupiah(row['total']),
+                     'n': row['n']} for row in hasil])
+
+
+def configure_from_app(app):
+    """Mengaktifkan analitik jika ANALITIK aktif (app.config atau environment);
+    app.py lalu mendaftarkan /api/analitik.
+
+    Snapshot dimuat saat pertama dipakai, bukan saat start.
+    """
+    global _aktif
+    app.config.setdefault('ANALITIK', os.environ.get('ANALITIK', '') not in ('', '0'))
+    if not app.config['ANALITIK'] or _aktif:
+        return
+    if np is None:
+        raise RuntimeError('ANALITIK=1 membutuhkan NumPy; jalankan pip install numpy')
+    _aktif = True
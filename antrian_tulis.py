@@ -0,0 +1,201 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+# Batas satu group commit: jumlah perintah dan lama menunggu perintah
+# berikutnya. Tanpa tunda, perintah yang masuk selama satu commit berjalan
+# menjadi batch berikutnya; tunda > 0 hanya membantu jika fsync mahal.
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_TUNDA_MS = 0
+# Batas antrian per file database; kirim() menunggu jika penuh (backpressure).
+DEFAULT_MAX_ANTRIAN = 10_000
+
+_aktif = False
+_max_batch = DEFAULT_MAX_BATCH
+_max_tunda = DEFAULT_MAX_TUNDA_MS / 1000
+_max_antrian = DEFAULT_MAX_ANTRIAN
+
+# Satu thread penulis per file database (DB_NAME atau shard), per proses
+_penulis = {}
+_pid = None
+_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {'perintah': 0, 'commit': 0, 'gagal': 0}
+_ukuran_batch = Counter()
+
+
+class _Penulis:
+    """Thread tunggal yang menjalankan perintah tulis untuk satu file database.
+
+    Perintah yang datang bersamaan digabung dalam satu transaksi (satu lock
+    tulis dan satu fsync). Setiap perintah berjalan di SAVEPOINT sendiri,
+    jadi perintah yang gagal tidak membatalkan perintah lain di batch yang sama.
+    """
+
+    def __init__(self, kunci, buka):
+        self.antrian = queue.Queue(maxsize=_max_antrian)
+        self.buka = buka
+        self.thread = threading.Thread(target=self._jalan, daemon=True,
+                                       name=f'penulis-{os.path.basename(kunci)}')
+        self.thread.start()
+
+    def _jalan(self):
+        conn = None
+        berhenti = False
+        while not berhenti:
+            item = self.antrian.get()
+            if item is None:
+                break
+            batch = [item]
+            berhenti = self._kumpulkan(batch)
+            try:
+                # Koneksi dibuka di thread ini, jadi milik thread penulis sendiri
+                conn = conn or self.buka()
+                self._commit(conn, batch)
+            except Exception as e:
+                # Thread penulis harus tetap hidup; pemanggil menerima errornya.
+                # Transaksi yang tertinggal akan menggagalkan BEGIN batch berikutnya.
+                if conn is not None and conn.in_transaction:
+                    conn.rollback()
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _kumpulkan(self, batch):
+        """Menambah perintah yang sudah mengantre ke batch. Hanya jika ada
+        penulis lain yang sedang aktif, tunggu sampai _max_tunda untuk
+        perintah berikutnya; penulis tunggal langsung commit."""
+        batas = None
+        while len(batch) < _max_batch:
+            try:
+                if batas is None:
+                    item = self.antrian.get_nowait()
+                else:
+                    item = self.antrian.get(timeout=max(0, batas - time.monotonic()))
+            except queue.Empty:
+                if batas is not None or len(batch) == 1 or _max_tunda <= 0:
+                    return False
+                batas = time.monotonic() + _max_tunda
+                continue
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    def _commit(self, conn, batch):
+        selesai = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for sql, params, setelah, future in batch:
+                conn.execute('SAVEPOINT perintah')
+                try:
+                    jumlah = conn.execute(sql, params).rowcount
+                except Exception as e:
+                    # Bukan hanya sqlite3.Error: mis. OverflowError untuk
+                    # integer di luar jangkauan INTEGER SQLite
+                    conn.execute('ROLLBACK TO perintah')
+                    future.set_exception(e)
+                    jumlah = None
+                conn.execute('RELEASE perintah')
+                if jumlah is not None:
+                    selesai.append((setelah, future, jumlah))
+            conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            _catat(len(batch), gagal=len(batch))
+            return
+        _catat(len(batch), gagal=len(batch) - len(selesai))
+        for setelah, future, jumlah in selesai:
+            if setelah is not None:
+                setelah()
+            future.set_result(jumlah)
+
+    def tutup(self):
+        self.antrian.put(None)
+        self.thread.join()
+
+
+def _catat(ukuran, gagal):
+    with _stats_lock:
+        _stats['perintah'] += ukuran
+        _stats['commit'] += 1
+        _stats['gagal'] += gagal
+        _ukuran_batch[ukuran] += 1
+
+
+def aktif():
+    return _aktif
+
+
+def kirim(kunci, buka, sql, params=(), setelah=None):
+    """Mengantrekan satu perintah tulis untuk file `kunci` dan mengembalikan
+    Future yang selesai (hasil: rowcount) setelah perintah itu di-commit.
+
+    buka() dipanggil sekali di thread penulis untuk membuka koneksinya;
+    setelah() dipanggil setelah commit, sebelum Future selesai.
+    """
+    global _pid
+    future = Future()
+    with _lock:
+        if _pid != os.getpid():
+            # Thread penulis tidak ikut ke proses hasil fork
+            _penulis.clear()
+            _pid = os.getpid()
+        penulis = _penulis.get(kunci)
+        if penulis is None:
+            penulis = _penulis[kunci] = _Penulis(kunci, buka)
+    penulis.antrian.put((sql, params, setelah, future))
+    return future
+
+
+def tutup():
+    """Menjalankan semua perintah yang masih mengantre lalu menghentikan thread penulis."""
+    with _lock:
+        daftar = list(_penulis.values()) if _pid == os.getpid() else []
+        _penulis.clear()
+    for penulis in daftar:
+        penulis.tutup()
+
+
+atexit.register(tutup)
+
+
+def configure(aktif=True, max_batch=None, max_tunda_ms=None, max_antrian=None):
+    """Mengaktifkan/menonaktifkan antrian tulis. Penulis yang sedang berjalan
+    dihentikan dulu (antriannya dihabiskan) agar batas baru berlaku."""
+    global _aktif, _max_batch, _max_tunda, _max_antrian
+    tutup()
+    _aktif = aktif
+    _max_batch = max(1, max_batch or DEFAULT_MAX_BATCH)
+    _max_tunda = (DEFAULT_MAX_TUNDA_MS if max_tunda_ms is None else max_tunda_ms) / 1000
+    _max_antrian = max_antrian or DEFAULT_MAX_ANTRIAN
+
+
+def configure_from_env():
+    """Membaca WRITE_QUEUE=1, WRITE_QUEUE_BATCH, WRITE_QUEUE_DELAY_MS, dan
+    WRITE_QUEUE_MAXSIZE dari environment."""
+    delay = os.environ.get('WRITE_QUEUE_DELAY_MS')
+    configure(os.environ.get('WRITE_QUEUE', '') not in ('', '0'),
+              int(os.environ.get('WRITE_QUEUE_BATCH', 0)) or None,
+              float(delay) if delay else None,
+              int(os.environ.get('WRITE_QUEUE_MAXSIZE', 0)) or None)
+
+
+def stats():
+    """Counter proses ini: perintah, commit, gagal, ukuran batch, dan
+    kedalaman antrian saat ini."""
+    with _stats_lock:
+        hasil = dict(_stats)
+        hasil['ukuran_batch'] = dict(_ukuran_batch)
+    with _lock:
+        hasil['kedalaman'] = sum(p.antrian.qsize() for p in _penulis.values())
+    return hasil
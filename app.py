@@ -1,65 +1,207 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, Response, g, render_template, request, redirect, url_for, flash, session, jsonify
+import csv
+import inspect
+import io
+import json
+import analitik
+import antrian_tulis
+import aset
+import cache
 import database as db
-from datetime import datetime
-import locale
+import db_async as adb
+import grafik
+import passwords
+import penjadwal
+import profil
+import uang
+from datetime import datetime, timedelta, timezone
 import os
-from werkzeug.security import generate_password_hash, check_password_hash
-from functools import wraps
+from functools import partial, wraps
+from operator import attrgetter
 
 app = Flask(__name__)
 # Use environment variable for secret key, fallback to random key for development
 app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24).hex()  
 
-db.init_db()
+# Cache bersama di samping file database (keuangan.cache.db), kecuali CACHE_PATH di-set
+cache.configure_from_env(os.path.splitext(db.DB_NAME)[0] + '.cache.db')
+antrian_tulis.configure_from_env()
+passwords.configure_from_app(app)
+profil.configure_from_app(app, db, passwords)
+analitik.configure_from_app(app)
+aset.configure_from_app(app)
+# Worker hanya memeriksa versi skema; migrasi dijalankan sekali lewat
+# python migrate_db.py. Server development (python app.py) dan
+# AUTO_MIGRATE=1 langsung menerapkan migrasi.
+if __name__ == '__main__' or os.environ.get('AUTO_MIGRATE', '') not in ('', '0'):
+    db.init_db()
+else:
+    db.cek_schema()
+# Setelah skema siap: thread penjadwal langsung membaca transaksi_berulang
+penjadwal.configure_from_env()
+
+@app.errorhandler(passwords.PoolPenuh)
+def hashing_sibuk(e):
+    # Antrian KDF penuh (login storm): tolak cepat daripada menahan worker
+    return 'Server sedang sibuk, silakan coba lagi.', 503, {'Retry-After': '1'}
+
+# Prefix API JSON berversi untuk client non-browser (mobile)
+API_V1 = '/api/v1'
+
+def respons_json(data, status=200):
+    """Respons JSON ringkas (tanpa spasi dan sort_keys). Baris dari
+    database.py ikut ter-serialisasi sebagai array oleh encoder C json."""
+    return app.response_class(json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+                              status, mimetype='application/json')
+
+def _minta_login():
+    # Client API tidak mengikuti redirect ke halaman login HTML
+    if request.path.startswith(API_V1 + '/'):
+        return respons_json({'error': 'Unauthorized'}, 401)
+    return redirect(url_for('login'))
+
+def _cek_login(user):
+    """Memasang g.user dari identitas yang sudah dibaca; None berarti harus login ulang."""
+    if user is None:
+        # User sudah dihapus
+        session.clear()
+        return _minta_login()
+    g.user = user
+    if session.get('username') != user['username'] or session.get('role') != user['role']:
+        session['username'] = user['username']
+        session['role'] = user['role']
+    return None
 
 def login_required(f):
+    # Varian async di asgi.py membaca identitas lewat executor database juga
+    if inspect.iscoroutinefunction(f):
+        @wraps(f)
+        async def decorated_async(*args, **kwargs):
+            if 'user_id' not in session:
+                return _minta_login()
+            # Identitas (username, role) selalu dibaca dari database, tanpa cache
+            ditolak = _cek_login(await adb.get_identitas_user(session['user_id']))
+            if ditolak:
+                return ditolak
+            return await f(*args, **kwargs)
+        return decorated_async
+
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
-            return redirect(url_for('login'))
+            return _minta_login()
+        # Identitas (username, role) selalu dibaca dari database, tanpa cache
+        ditolak = _cek_login(db.get_identitas_user(session['user_id']))
+        if ditolak:
+            return ditolak
         return f(*args, **kwargs)
     return decorated_function
 
+def is_admin():
+    """True jika user yang login ber-role admin (hanya di dalam login_required)."""
+    return g.user['role'] == 'admin'
+
+# Batas atas ukuran halaman yang boleh diminta lewat ?per_page=
+MAX_PER_PAGE = 200
+
+def ambil_per_page():
+    """Membaca ?per_page= dari query string, dibatasi 1..MAX_PER_PAGE."""
+    per_page = request.args.get('per_page', db.DEFAULT_PER_PAGE, type=int)
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+def url_halaman(endpoint, halaman, **filters):
+    """Membuat URL prev/next untuk hasil keyset pagination dari database.py."""
+    prev_url = next_url = None
+    if halaman['prev_cursor']:
+        prev_url = url_for(endpoint, before=halaman['prev_cursor'], **filters)
+    if halaman['next_cursor']:
+        next_url = url_for(endpoint, after=halaman['next_cursor'], **filters)
+    return prev_url, next_url
+
 @app.template_filter('rupiah')
 def format_rupiah(value):
+    """Nominal dalam sen menjadi 'Rp 1.234.567'."""
     try:
-        return f"Rp {float(value):,.0f}".replace(",", ".")
+        return uang.format_rupiah(value)
     except (ValueError, TypeError):
         return value
 
-@app.route('/')
-@login_required
-def dashboard():
-    user_id = session['user_id']
-    username = session.get('username')
-    
-    if username == 'admin':
-        ringkasan = db.admin_hitung_ringkasan()
-        semua_transaksi = db.admin_ambil_semua_transaksi()
-        stats_per_user = db.admin_get_stats_per_user()
+# Query halaman yang saling bebas ditulis sebagai daftar pemanggilan
+# database.py tanpa argumen (functools.partial): view sync di sini
+# menjalankannya berurutan, varian async di asgi.py bersamaan lewat db_async.
+def jalankan_query(query):
+    return [panggil() for panggil in query]
+
+def query_dashboard(user_id):
+    if is_admin():
+        # Data chart dimuat terpisah lewat /api/grafik/*
+        return [partial(db.admin_hitung_ringkasan),
+                partial(db.admin_ambil_transaksi_limit, 10)]
+    sekarang = datetime.now()
+    return [partial(db.hitung_ringkasan, user_id, bulan=sekarang.month, tahun=sekarang.year),
+            partial(db.ambil_transaksi_limit, user_id, 5),
+            partial(db.status_anggaran, user_id, sekarang.month, sekarang.year)]
+
+def render_dashboard(ringkasan, transaksi, anggaran=None):
+    if is_admin():
         return render_template('admin_dashboard.html', 
                                ringkasan=ringkasan, 
-                               transaksi=semua_transaksi,
-                               stats_per_user=stats_per_user, 
+                               transaksi=transaksi,
                                active_page='dashboard')
+    return render_template('dashboard.html', 
+                           ringkasan=ringkasan, 
+                           transaksi=transaksi, 
+                           anggaran=anggaran,
+                           active_page='dashboard')
 
-    sekarang = datetime.now()
-    bulan_ini = sekarang.month
-    tahun_ini = sekarang.year
+@app.route('/')
+@login_required
+def dashboard():
+    return render_dashboard(*jalankan_query(query_dashboard(session['user_id'])))
+
+@app.route('/anggaran', methods=['POST'])
+@login_required
+def anggaran():
+    """Menetapkan (atau dengan aksi=hapus, menghapus) anggaran bulanan satu kategori."""
+    if is_admin():
+        flash('Admin tidak dapat mengatur anggaran.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    user_id = session['user_id']
+    kategori = request.form.get('kategori', '').strip()
+    if not kategori:
+        flash('Kategori wajib diisi.', 'danger')
+        return redirect(url_for('dashboard'))
     
-    ringkasan = db.hitung_ringkasan(user_id, bulan=bulan_ini, tahun=tahun_ini)
+    if request.form.get('aksi') == 'hapus':
+        db.hapus_anggaran(user_id, kategori)
+        flash(f'Anggaran {kategori} dihapus.', 'warning')
+        return redirect(url_for('dashboard'))
     
-    transaksi_terbaru = db.ambil_transaksi_limit(user_id, 5)
+    try:
+        batas = uang.ke_sen(request.form.get('batas'))
+    except ValueError:
+        flash('Batas anggaran tidak valid. Harap masukkan angka yang benar.', 'danger')
+        return redirect(url_for('dashboard'))
+    if batas <= 0:
+        flash('Batas anggaran harus lebih dari 0.', 'danger')
+        return redirect(url_for('dashboard'))
     
-    return render_template('dashboard.html', 
-                           ringkasan=ringkasan, 
-                           transaksi=transaksi_terbaru, 
-                           active_page='dashboard')
+    db.simpan_anggaran(user_id, kategori, batas)
+    flash(f'Anggaran {kategori} disimpan.', 'success')
+    return redirect(url_for('dashboard'))
+
+def flash_peringatan_anggaran(peringatan, bulan, tahun):
+    """Memberi tahu kategori yang melebihi anggaran (dari ambil_peringatan_anggaran)."""
+    for p in peringatan:
+        flash(f'Pengeluaran {p["kategori"]} bulan {bulan:02d}/{tahun} '
+              f'({uang.format_rupiah(p["terpakai"])}) melebihi anggaran '
+              f'{uang.format_rupiah(p["batas"])}.', 'warning')
 
 @app.route('/api/edit-user', methods=['POST'])
 @login_required
 def api_edit_user():
-    if session.get('username') != 'admin':
+    if not is_admin():
         return {'success': False, 'message': 'Akses ditolak.'}
     
     data = request.get_json()
@@ -71,20 +213,21 @@ def api_edit_user():
         return {'success': False, 'message': 'User ID tidak valid.'}
     
     target_user = db.get_user_by_id(user_id)
-    if not target_user or target_user['username'] == 'admin':
+    if not target_user or target_user['role'] == 'admin':
         return {'success': False, 'message': 'User tidak ditemukan.'}
     
-    if new_username != target_user['username'] and db.cek_user(new_username):
-        return {'success': False, 'message': 'Username sudah digunakan.'}
-    
     if new_password and len(new_password) < 8:
         return {'success': False, 'message': 'Password minimal 8 karakter.'}
     
+    # Username yang sudah dipakai ditolak oleh constraint UNIQUE
     if new_password:
-        hashed = generate_password_hash(new_password)
-        db.update_user(user_id, new_username, hashed)
+        hashed = passwords.hash_password(new_password)
+        berhasil = db.update_user(user_id, new_username, hashed)
     else:
-        db.update_user(user_id, new_username)
+        berhasil = db.update_user(user_id, new_username)
+    
+    if not berhasil:
+        return {'success': False, 'message': 'Username sudah digunakan.'}
     
     return {'success': True}
 
@@ -93,14 +236,53 @@ def api_edit_user():
 
 
 
+TIPE_TRANSAKSI = ('Pemasukan', 'Pengeluaran')
+
+def validasi_transaksi(tanggal, tipe, kategori, jumlah):
+    """Validasi input satu transaksi dari form /transaksi.
+
+    Mengembalikan (jumlah dalam sen, None) jika valid, atau
+    (None, pesan error) jika tidak.
+    """
+    # Validate required fields
+    if not tanggal or not tipe or not kategori:
+        return None, 'Semua field wajib diisi.'
+    
+    # Validate and convert jumlah
+    try:
+        jumlah = uang.ke_sen(jumlah)
+    except ValueError:
+        return None, 'Jumlah tidak valid. Harap masukkan angka yang benar.'
+    if jumlah <= 0:
+        return None, 'Jumlah harus lebih dari 0.'
+    
+    return jumlah, None
+
+def validasi_transaksi_ketat(tanggal, tipe, kategori, jumlah):
+    """validasi_transaksi ditambah format tanggal dan tipe, untuk import dan
+    API v1: di form keduanya sudah dijamin input date dan select tipe, data
+    dari file/client tidak."""
+    jumlah, error = validasi_transaksi(tanggal, tipe, kategori, jumlah)
+    if error:
+        return None, error
+    
+    try:
+        datetime.strptime(tanggal, '%Y-%m-%d')
+    except (ValueError, TypeError):
+        return None, 'Tanggal tidak valid. Gunakan format YYYY-MM-DD.'
+    
+    if tipe not in TIPE_TRANSAKSI:
+        return None, 'Tipe harus Pemasukan atau Pengeluaran.'
+    
+    return jumlah, None
+
 @app.route('/transaksi', methods=['GET', 'POST'])
 @login_required
 def transaksi():
     user_id = session['user_id']
-    username = session.get('username')
     
     if request.method == 'POST':
-        if username == 'admin':
+        if is_admin():
              flash('Admin tidak dapat melakukan transaksi.', 'danger')
              return redirect(url_for('dashboard'))
              
@@ -110,78 +292,182 @@ def transaksi():
         kategori = request.form.get('kategori', '')
         catatan = request.form.get('catatan', '')
         
-        # Validate required fields
-        if not tanggal or not tipe or not kategori:
-            flash('Semua field wajib diisi.', 'danger')
+        jumlah, error = validasi_transaksi(tanggal, tipe, kategori, request.form.get('jumlah'))
+        if error:
+            flash(error, 'danger')
             return redirect(url_for('transaksi'))
         
-        # Validate and convert jumlah
-        try:
-            jumlah = float(request.form['jumlah'])
-            if jumlah <= 0:
-                flash('Jumlah harus lebih dari 0.', 'danger')
+        ulangi = request.form.get('ulangi', '')
+        if aksi == 'tambah' and ulangi:
+            selesai = request.form.get('selesai') or None
+            if ulangi not in db.FREKUENSI_BERULANG:
+                flash('Frekuensi pengulangan tidak valid.', 'danger')
                 return redirect(url_for('transaksi'))
-        except (ValueError, KeyError):
-            flash('Jumlah tidak valid. Harap masukkan angka yang benar.', 'danger')
-            return redirect(url_for('transaksi'))
-        
-        if aksi == 'tambah':
+            try:
+                if selesai:
+                    datetime.strptime(selesai, '%Y-%m-%d')
+            except ValueError:
+                flash('Tanggal selesai tidak valid. Gunakan format YYYY-MM-DD.', 'danger')
+                return redirect(url_for('transaksi'))
+            # Kejadian yang sudah jatuh tempo (termasuk tanggal ini) langsung dibuat
+            db.tambah_transaksi_berulang(user_id, ulangi, tanggal, tipe, kategori, jumlah, catatan, selesai)
+            flash(f'Transaksi berulang ({ulangi}) berhasil ditambahkan!', 'success')
+        elif aksi == 'tambah':
             db.tambah_transaksi(user_id, tanggal, tipe, kategori, jumlah, catatan)
             flash('Transaksi berhasil ditambahkan!', 'success')
         elif aksi == 'edit':
             id_transaksi = request.form['id_transaksi']
             db.edit_transaksi(id_transaksi, user_id, tanggal, tipe, kategori, jumlah, catatan)
             flash('Transaksi berhasil diperbarui!', 'success')
+        if tipe == 'Pengeluaran':
+            try:
+                waktu = datetime.strptime(tanggal, '%Y-%m-%d')
+            except ValueError:
+                # Form menerima tanggal non-ISO (lihat validasi_transaksi) dan
+                # transaksinya sudah tersimpan: lewati peringatan, jangan 500
+                waktu = None
+            if waktu:
+                # Status anggaran sudah dihitung trigger saat tulis; cukup satu lookup
+                flash_peringatan_anggaran(
+                    db.ambil_peringatan_anggaran(user_id, waktu.month, waktu.year, kategori),
+                    waktu.month, waktu.year)
             
         return redirect(url_for('transaksi'))
     
     # GET Request with Filters
+    filter_ = filter_transaksi()
+    halaman, agregasi, berulang = jalankan_query(query_transaksi(user_id, filter_))
+    # Saldo setelah setiap baris dari checkpoint bulanan, tidak menjumlah riwayat
+    saldo = db.saldo_berjalan(user_id, halaman['transaksi'])
+    return render_transaksi(filter_, halaman, agregasi, berulang, saldo)
+
+def filter_transaksi():
+    """Filter GET /transaksi dari query string."""
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
-    filter_tipe = request.args.get('tipe', '')
+    cari = request.args.get('q', '').strip()
     
-    # Jika tidak ada filter tanggal (awal buka halaman), set default bulan ini
-    if start_date is None and end_date is None:
+    # Jika tidak ada filter tanggal (awal buka halaman), set default bulan ini;
+    # pencarian tanpa tanggal mencari di semua tanggal
+    if start_date is None and end_date is None and not cari:
         today = datetime.now()
         start_date = today.strftime('%Y-%m-%d')
         end_date = today.strftime('%Y-%m-%d')
     
-    semua_transaksi = db.ambil_semua_transaksi(user_id, start_date, end_date, filter_tipe)
+    return {'start_date': start_date, 'end_date': end_date, 'tipe': request.args.get('tipe', ''),
+            'cari': cari, 'per_page': ambil_per_page(),
+            'after': request.args.get('after'), 'before': request.args.get('before')}
+
+def query_transaksi(user_id, f):
+    if f['cari']:
+        ambil_halaman = partial(db.cari_transaksi, f['cari'], user_id, f['start_date'], f['end_date'],
+                                f['tipe'], f['per_page'], after=f['after'], before=f['before'])
+    else:
+        ambil_halaman = partial(db.ambil_transaksi_halaman, user_id, f['start_date'], f['end_date'],
+                                f['tipe'], f['per_page'], after=f['after'], before=f['before'])
+    return [ambil_halaman,
+            partial(db.hitung_agregasi, user_id, f['start_date'], f['end_date'], f['tipe'], cari=f['cari']),
+            partial(db.ambil_transaksi_berulang, user_id)]
+
+def render_transaksi(f, halaman, agregasi, berulang, saldo):
+    prev_url, next_url = url_halaman('transaksi', halaman, start_date=f['start_date'], end_date=f['end_date'],
+                                     tipe=f['tipe'], q=f['cari'] or None, per_page=f['per_page'])
     
-    total_jumlah = sum(t['jumlah'] for t in semua_transaksi)
+    total_jumlah = agregasi['pemasukan'] + agregasi['pengeluaran']
     
     return render_template('transaksi.html', 
-                           transaksi=semua_transaksi, 
+                           transaksi=halaman['transaksi'], 
+                           saldo=saldo,
+                           berulang=berulang,
                            total_jumlah=total_jumlah,
+                           jumlah_transaksi=agregasi['jumlah_transaksi'],
+                           prev_url=prev_url,
+                           next_url=next_url,
                            active_page='transaksi',
-                           filter_tipe=filter_tipe,
-                           start_date=start_date,
-                           end_date=end_date)
+                           filter_tipe=f['tipe'],
+                           cari=f['cari'],
+                           start_date=f['start_date'],
+                           end_date=f['end_date'])
+
+# Batas jumlah baris per request import
+MAX_IMPORT_ROWS = 200000
+# Jumlah error per baris yang dikembalikan ke client
+MAX_IMPORT_ERRORS = 100
+
+@app.route('/transaksi/import', methods=['POST'])
+@login_required
+def import_transaksi():
+    """Import banyak transaksi dari file CSV (field 'file') atau body JSON.
+
+    Kolom: tanggal, tipe, kategori, jumlah, catatan. Semua baris divalidasi
+    dulu; jika ada yang tidak valid, tidak ada yang disimpan dan error per
+    baris dikembalikan.
+    """
+    if is_admin():
+        return {'success': False, 'message': 'Admin tidak dapat melakukan transaksi.'}, 403
+    
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            return {'success': False, 'message': 'Body JSON harus berupa list transaksi.'}, 400
+        baris = enumerate(data, 1)
+    elif 'file' in request.files:
+        reader = csv.DictReader(io.TextIOWrapper(request.files['file'].stream, encoding='utf-8-sig'))
+        # Nomor baris mengikuti file (baris 1 = header)
+        baris = ((reader.line_num, row) for row in reader)
+    else:
+        return {'success': False, 'message': 'Kirim file CSV atau body JSON.'}, 400
+    
+    valid = []
+    errors = []
+    jumlah_error = 0
+    try:
+        for nomor, row in baris:
+            if len(valid) + jumlah_error >= MAX_IMPORT_ROWS:
+                return {'success': False, 'message': f'Maksimal {MAX_IMPORT_ROWS} baris per import.'}, 400
+            if not isinstance(row, dict):
+                row = {}
+            tanggal = str(row.get('tanggal') or '').strip()
+            tipe = str(row.get('tipe') or '').strip()
+            kategori = str(row.get('kategori') or '').strip()
+            catatan = str(row.get('catatan') or '')
+            jumlah, error = validasi_transaksi_ketat(tanggal, tipe, kategori, row.get('jumlah'))
+            if error:
+                jumlah_error += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append({'baris': nomor, 'message': error})
+            else:
+                valid.append((tanggal, tipe, kategori, jumlah, catatan))
+    except (UnicodeDecodeError, csv.Error):
+        return {'success': False, 'message': 'File CSV tidak valid (harus UTF-8).'}, 400
+    
+    if jumlah_error:
+        return {'success': False,
+                'message': f'{jumlah_error} baris tidak valid, tidak ada data yang disimpan.',
+                'errors': errors}, 400
+    
+    imported = db.tambah_transaksi_bulk(session['user_id'], valid)
+    return {'success': True, 'imported': imported}
 
 # API untuk mengambil data satu transaksi (untuk Edit Modal)
 @app.route('/get_transaksi/<int:id_transaksi>')
 @login_required
 def get_transaksi(id_transaksi):
-    if session.get('username') == 'admin':
+    if is_admin():
         return jsonify({'error': 'Unauthorized'}), 403
         
     user_id = session['user_id']
     transaksi = db.ambil_satu_transaksi(id_transaksi, user_id)
     if transaksi:
-        return jsonify({
-            'id': transaksi['id'],
-            'tanggal': transaksi['tanggal'],
-            'tipe': transaksi['tipe'],
-            'kategori': transaksi['kategori'],
-            'jumlah': transaksi['jumlah'],
-            'catatan': transaksi['catatan']
-        })
+        data = transaksi_api(transaksi)
+        data['jumlah'] = uang.ke_rupiah(data['jumlah'])
+        return jsonify(data)
     return jsonify({'error': 'Not found'}), 404
 
 @app.route('/hapus/<int:id_transaksi>')
 @login_required
 def hapus(id_transaksi):
-    if session.get('username') == 'admin':
+    if is_admin():
         flash('Admin tidak diizinkan menghapus data user.', 'danger')
         return redirect(url_for('dashboard'))
 
@@ -190,54 +476,391 @@ def hapus(id_transaksi):
     flash('Transaksi berhasil dihapus.', 'warning')
     return redirect(url_for('transaksi'))
 
+@app.route('/hapus-berulang/<int:id_aturan>', methods=['POST'])
+@login_required
+def hapus_berulang(id_aturan):
+    """Menghentikan transaksi berulang; transaksi yang sudah dibuat tetap ada."""
+    if is_admin():
+        flash('Admin tidak diizinkan menghapus data user.', 'danger')
+        return redirect(url_for('dashboard'))
+
+    db.hapus_transaksi_berulang(id_aturan, session['user_id'])
+    flash('Transaksi berulang dihentikan.', 'warning')
+    return redirect(url_for('transaksi'))
+
 @app.route('/laporan')
 @login_required
 def laporan():
-    if session.get('username') != 'admin':
+    if not is_admin():
+        flash('Halaman ini hanya untuk admin.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    filter_ = filter_laporan()
+    return render_laporan(filter_, *jalankan_query(query_laporan(filter_)))
+
+def filter_laporan():
+    """Filter /laporan dari query string."""
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    filter_user = request.args.get('user_id')
+    cari = request.args.get('q', '').strip()
+    
+    # Default to today's date if not provided (search spans all dates instead)
+    today = datetime.now().strftime('%Y-%m-%d')
+    if not start_date and not cari:
+        start_date = today
+    if not end_date and not cari:
+        end_date = today
+    
+    return {'start_date': start_date, 'end_date': end_date, 'user': filter_user or '',
+            # Convert user_id to int if present
+            'user_id': int(filter_user) if filter_user else None,
+            'tipe': request.args.get('tipe', ''), 'cari': cari, 'per_page': ambil_per_page(),
+            'after': request.args.get('after'), 'before': request.args.get('before')}
+
+def query_laporan(f):
+    # Filtered page (keyset), totals (single grouped query, not a re-sum of
+    # the rows) and users for the filter dropdown are independent
+    if f['cari']:
+        ambil_halaman = partial(db.cari_transaksi, f['cari'], f['user_id'], f['start_date'], f['end_date'],
+                                f['tipe'], f['per_page'], after=f['after'], before=f['before'])
+    else:
+        ambil_halaman = partial(db.admin_laporan_halaman, f['start_date'], f['end_date'], f['user_id'],
+                                f['tipe'], f['per_page'], after=f['after'], before=f['before'])
+    return [ambil_halaman,
+            partial(db.hitung_agregasi, f['user_id'], f['start_date'], f['end_date'], f['tipe'],
+                    cari=f['cari']),
+            partial(db.admin_get_all_users)]
+
+def render_laporan(f, halaman, agregasi, users):
+    prev_url, next_url = url_halaman('laporan', halaman, start_date=f['start_date'], end_date=f['end_date'],
+                                     user_id=f['user'], tipe=f['tipe'], q=f['cari'] or None,
+                                     per_page=f['per_page'])
+    
+    return render_template('admin_laporan.html',
+                           transaksi=halaman['transaksi'],
+                           users=users,
+                           total_pemasukan=agregasi['pemasukan'],
+                           total_pengeluaran=agregasi['pengeluaran'],
+                           jumlah_transaksi=agregasi['jumlah_transaksi'],
+                           prev_url=prev_url,
+                           next_url=next_url,
+                           start_date=f['start_date'],
+                           end_date=f['end_date'],
+                           filter_user=f['user'],
+                           filter_tipe=f['tipe'],
+                           cari=f['cari'],
+                           active_page='laporan')
+
+# Kolom file export laporan, urut sesuai tabel di admin_laporan.html
+EXPORT_KOLOM = ('tanggal', 'username', 'tipe', 'kategori', 'jumlah', 'catatan')
+_nilai_export = attrgetter(*EXPORT_KOLOM)
+
+def stream_csv(rows, batch_size=1000):
+    """Mengubah iterable baris menjadi potongan teks CSV tanpa menampung seluruh hasil."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_KOLOM)
+    for i, row in enumerate(rows, 1):
+        tanggal, username, tipe, kategori, jumlah, catatan = _nilai_export(row)
+        writer.writerow((tanggal, username, tipe, kategori, uang.format_desimal(jumlah), catatan))
+        if i % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+@app.route('/laporan/export')
+@login_required
+def export_laporan():
+    if not is_admin():
         flash('Halaman ini hanya untuk admin.', 'danger')
         return redirect(url_for('dashboard'))
     
-    # Get filters from query params
+    # Same filters as /laporan
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     filter_user = request.args.get('user_id')
     filter_tipe = request.args.get('tipe', '')
     
-    # Default to today's date if not provided
     today = datetime.now().strftime('%Y-%m-%d')
     if not start_date:
         start_date = today
     if not end_date:
         end_date = today
     
-    # Convert user_id to int if present
     filter_user_id = int(filter_user) if filter_user else None
     
-    # Get filtered data
-    transaksi = db.admin_laporan(start_date, end_date, filter_user_id, filter_tipe)
+    rows = db.admin_laporan_iter(start_date, end_date, filter_user_id, filter_tipe)
+    filename = f'laporan_{start_date}_{end_date}.csv'
+    return Response(stream_csv(rows), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+def json_bersyarat(data, user_id=None):
+    """Respons JSON dengan ETag (isi) dan Last-Modified (invalidasi cache
+    terakhir untuk user_id, atau data lintas user jika None). Browser wajib
+    revalidasi, dan mendapat 304 tanpa body jika datanya belum berubah."""
+    response = respons_json(data)
+    response.last_modified = datetime.fromtimestamp(cache.terakhir_diubah(user_id), timezone.utc)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
+
+# Rentang default deret waktu per granularitas (hari ke belakang dari hari ini)
+RENTANG_DEFAULT = {'harian': 30, 'mingguan': 7 * 26, 'bulanan': 365}
+# Batas titik per deret yang boleh diminta lewat ?max_titik=
+MAX_TITIK = 500
+
+@app.route('/api/grafik/deret')
+@login_required
+def api_grafik_deret():
+    """Deret pemasukan/pengeluaran harian, mingguan, atau bulanan milik user.
+
+    Query: granularitas, start_date, end_date (YYYY-MM-DD), max_titik.
+    Admin wajib memilih user lewat ?user_id=.
+    """
+    if is_admin():
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id wajib diisi.'}), 400
+    else:
+        user_id = session['user_id']
     
-    # Calculate totals
-    total_pemasukan = sum(t['jumlah'] for t in transaksi if t['tipe'] == 'Pemasukan')
-    total_pengeluaran = sum(t['jumlah'] for t in transaksi if t['tipe'] == 'Pengeluaran')
+    granularitas = request.args.get('granularitas', 'harian')
+    if granularitas not in grafik.GRANULARITAS:
+        return jsonify({'error': 'Granularitas tidak valid.'}), 400
     
-    # Get users for filter dropdown
-    users = db.admin_get_all_users()
+    hari_ini = datetime.now().date()
+    start_date = request.args.get('start_date') or \
+        (hari_ini - timedelta(days=RENTANG_DEFAULT[granularitas])).isoformat()
+    end_date = request.args.get('end_date') or hari_ini.isoformat()
+    try:
+        if datetime.strptime(start_date, '%Y-%m-%d') > datetime.strptime(end_date, '%Y-%m-%d'):
+            return jsonify({'error': 'start_date harus sebelum end_date.'}), 400
+    except ValueError:
+        return jsonify({'error': 'Tanggal tidak valid. Gunakan format YYYY-MM-DD.'}), 400
     
-    return render_template('admin_laporan.html',
-                           transaksi=transaksi,
-                           users=users,
-                           total_pemasukan=total_pemasukan,
-                           total_pengeluaran=total_pengeluaran,
-                           start_date=start_date,
-                           end_date=end_date,
-                           filter_user=filter_user or '',
-                           filter_tipe=filter_tipe,
-                           active_page='laporan')
+    max_titik = request.args.get('max_titik', grafik.DEFAULT_MAX_TITIK, type=int)
+    max_titik = max(1, min(max_titik, MAX_TITIK))
+    
+    rows = db.ambil_deret_waktu(user_id, granularitas, start_date, end_date)
+    data = grafik.susun_deret(rows, granularitas, start_date, end_date, max_titik)
+    return json_bersyarat(data, user_id)
+
+@app.route('/api/grafik/ringkasan')
+@login_required
+def api_grafik_ringkasan():
+    """Pemasukan vs pengeluaran: bulan ini untuk user, semua data untuk admin."""
+    if is_admin():
+        ringkasan, user_id = db.admin_hitung_ringkasan(), None
+    else:
+        sekarang = datetime.now()
+        user_id = session['user_id']
+        ringkasan = db.hitung_ringkasan(user_id, bulan=sekarang.month, tahun=sekarang.year)
+    return json_bersyarat({k: uang.ke_rupiah(v) for k, v in ringkasan.items()}, user_id)
+
+# Batas jumlah user pada chart top-N admin
+MAX_TOP_USER = 50
+
+@app.route('/api/grafik/top-user')
+@login_required
+def api_grafik_top_user():
+    """n user dengan perputaran terbesar, sisanya digabung sebagai 'lainnya'."""
+    if not is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    n = max(1, min(request.args.get('n', 10, type=int), MAX_TOP_USER))
+    
+    top = db.admin_top_user(n)
+    pemasukan = uang.DeretUang.dari_kolom(top, 'pemasukan')
+    pengeluaran = uang.DeretUang.dari_kolom(top, 'pengeluaran')
+    semua = db.admin_hitung_ringkasan()
+    return json_bersyarat({
+        'label': [row['username'] for row in top],
+        'pemasukan': pemasukan.ke_rupiah(),
+        'pengeluaran': pengeluaran.ke_rupiah(),
+        'lainnya': {
+            'pemasukan': uang.ke_rupiah(semua['pemasukan'] - pemasukan.total()),
+            'pengeluaran': uang.ke_rupiah(semua['pengeluaran'] - pengeluaran.total()),
+        },
+    })
+
+@app.route('/api/anggaran')
+@login_required
+def api_anggaran():
+    """Status anggaran user untuk ?bulan=&tahun= (default bulan ini), dalam rupiah."""
+    if is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    user_id = session['user_id']
+    sekarang = datetime.now()
+    bulan = request.args.get('bulan', sekarang.month, type=int)
+    tahun = request.args.get('tahun', sekarang.year, type=int)
+    if not 1 <= bulan <= 12:
+        return jsonify({'error': 'Bulan tidak valid.'}), 400
+    
+    status = db.status_anggaran(user_id, bulan, tahun)
+    return json_bersyarat({
+        'bulan': bulan,
+        'tahun': tahun,
+        'anggaran': [{
+            'kategori': a['kategori'],
+            'batas': uang.ke_rupiah(a['batas']),
+            'terpakai': uang.ke_rupiah(a['terpakai']),
+            'sisa': uang.ke_rupiah(a['sisa']),
+            'melebihi': a['melebihi'],
+        } for a in status],
+    }, user_id)
+
+@app.route('/api/stats')
+@login_required
+def api_stats():
+    """Counter cache, koneksi database, dan penjadwal transaksi berulang
+    worker ini, untuk monitoring."""
+    if not is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify({'cache': cache.stats(), 'db': db.connection_stats(), 'berulang': penjadwal.stats()})
+
+def metrics_required(f):
+    """Scraper dengan Bearer METRICS_TOKEN, atau admin yang login. Alamat
+    asal (loopback di balik reverse proxy) dan role di session tidak dipercaya."""
+    @login_required
+    @wraps(f)
+    def admin_saja(*args, **kwargs):
+        if not is_admin():
+            return jsonify({'error': 'Unauthorized'}), 403
+        return f(*args, **kwargs)
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if profil.token_valid():
+            return f(*args, **kwargs)
+        return admin_saja(*args, **kwargs)
+    return decorated_function
+
+if profil.aktif():
+    app.add_url_rule('/metrics', 'metrics', metrics_required(profil.metrics))
+    app.add_url_rule('/api/profil', 'profil_terakhir', metrics_required(profil.profil_terakhir))
+
+@login_required
+def api_analitik():
+    """Group-by/pivot ad-hoc untuk admin (lihat analitik.api_analitik)."""
+    if not is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    return analitik.api_analitik()
+
+if analitik.aktif():
+    app.add_url_rule('/api/analitik', 'api_analitik', api_analitik)
+
+# Kolom transaksi di API v1; jumlah dalam sen (integer), sama dengan database
+KOLOM_API = ('id', 'tanggal', 'tipe', 'kategori', 'jumlah', 'catatan')
+_SELECT_API = ', '.join(KOLOM_API)
+# Tuple KOLOM_API dari Baris yang memuat kolom lain (hasil pencarian)
+_nilai_api = attrgetter(*KOLOM_API)
+# Batas jumlah id per request hapus massal
+MAX_HAPUS_BATCH = 1000
+
+def transaksi_api(row):
+    """Satu baris transaksi sebagai dict KOLOM_API."""
+    return dict(zip(KOLOM_API, _nilai_api(row)))
+
+def validasi_transaksi_api(data):
+    """Validasi body JSON satu transaksi API v1 (jumlah integer sen).
+
+    Mengembalikan ((tanggal, tipe, kategori, jumlah, catatan), None) jika
+    valid, atau (None, pesan error) jika tidak.
+    """
+    jumlah = data.get('jumlah')
+    if not isinstance(jumlah, int) or isinstance(jumlah, bool):
+        return None, 'Jumlah harus integer dalam sen.'
+    tanggal = str(data.get('tanggal') or '').strip()
+    tipe = str(data.get('tipe') or '').strip()
+    kategori = str(data.get('kategori') or '').strip()
+    catatan = str(data.get('catatan') or '')
+    # Aturan yang sama dengan form; jumlah dilewatkan sebagai teks rupiah eksak
+    jumlah, error = validasi_transaksi_ketat(tanggal, tipe, kategori, uang.format_desimal(jumlah))
+    if error:
+        return None, error
+    return (tanggal, tipe, kategori, jumlah, catatan), None
+
+@app.route(f'{API_V1}/transaksi', methods=['GET', 'POST'])
+@login_required
+def api_v1_transaksi():
+    """GET: satu halaman transaksi user, urut terbaru (keyset seperti
+    /transaksi: ?start_date=&end_date=&tipe=&q=&per_page=&after=&before=).
+    Baris dikirim sebagai array berurutan `kolom`, bukan object per baris.
+
+    POST: menambah satu transaksi dari body JSON, mengembalikan 201.
+    """
+    if is_admin():
+        return respons_json({'error': 'Admin tidak dapat melakukan transaksi.'}, 403)
+    user_id = session['user_id']
+
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return respons_json({'error': 'Body JSON harus berupa object transaksi.'}, 400)
+        nilai, error = validasi_transaksi_api(data)
+        if error:
+            return respons_json({'error': error}, 400)
+        id_transaksi = db.tambah_transaksi_id(user_id, *nilai)
+        response = respons_json(dict(zip(KOLOM_API, (id_transaksi, *nilai))), 201)
+        response.headers['Location'] = url_for('api_v1_satu_transaksi', id_transaksi=id_transaksi)
+        return response
+
+    start_date = request.args.get('start_date') or None
+    end_date = request.args.get('end_date') or None
+    filter_tipe = request.args.get('tipe', '')
+    cari = request.args.get('q', '').strip()
+    per_page = ambil_per_page()
+    after, before = request.args.get('after'), request.args.get('before')
+    if cari:
+        halaman = db.cari_transaksi(cari, user_id, start_date, end_date, filter_tipe, per_page,
+                                    after=after, before=before)
+        rows = list(map(_nilai_api, halaman['transaksi']))
+    else:
+        # Hanya KOLOM_API yang dibaca, jadi Baris langsung menjadi array JSON
+        halaman = db.ambil_transaksi_halaman(user_id, start_date, end_date, filter_tipe, per_page,
+                                             after=after, before=before, kolom=_SELECT_API)
+        rows = halaman['transaksi']
+    return json_bersyarat({
+        'kolom': KOLOM_API,
+        'transaksi': rows,
+        'prev_cursor': halaman['prev_cursor'],
+        'next_cursor': halaman['next_cursor'],
+    }, user_id)
+
+@app.route(f'{API_V1}/transaksi/<int:id_transaksi>')
+@login_required
+def api_v1_satu_transaksi(id_transaksi):
+    """Satu transaksi milik user sebagai object KOLOM_API."""
+    if is_admin():
+        return respons_json({'error': 'Unauthorized'}, 403)
+    transaksi = db.ambil_satu_transaksi(id_transaksi, session['user_id'])
+    if transaksi is None:
+        return respons_json({'error': 'Not found'}, 404)
+    return respons_json(transaksi_api(transaksi))
+
+@app.route(f'{API_V1}/transaksi/hapus', methods=['POST'])
+@login_required
+def api_v1_hapus_transaksi():
+    """Menghapus banyak transaksi sekaligus: body {"id": [..]}, satu commit.
+    id yang tidak ada atau milik user lain dilewati; respons berisi jumlah
+    yang benar-benar terhapus."""
+    if is_admin():
+        return respons_json({'error': 'Admin tidak diizinkan menghapus data user.'}, 403)
+    data = request.get_json(silent=True)
+    ids = data.get('id') if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return respons_json({'error': 'Body JSON harus berupa {"id": [integer, ...]}.'}, 400)
+    if len(ids) > MAX_HAPUS_BATCH:
+        return respons_json({'error': f'Maksimal {MAX_HAPUS_BATCH} id per request.'}, 400)
+    dihapus = db.hapus_transaksi_banyak(ids, session['user_id'])
+    return respons_json({'dihapus': dihapus})
 
 @app.route('/kelola-user')
 @login_required
 def kelola_user():
-    if session.get('username') != 'admin':
+    if not is_admin():
         flash('Halaman ini hanya untuk admin.', 'danger')
         return redirect(url_for('dashboard'))
     
@@ -247,19 +870,13 @@ def kelola_user():
 @app.route('/hapus-user/<int:user_id>')
 @login_required
 def hapus_user(user_id):
-    if session.get('username') != 'admin':
+    if not is_admin():
         flash('Halaman ini hanya untuk admin.', 'danger')
         return redirect(url_for('dashboard'))
     
-    # Get user info
-    users = db.admin_get_all_users()
-    target_user = None
-    for u in users:
-        if u['id'] == user_id:
-            target_user = u
-            break
+    target_user = db.get_user_by_id(user_id)
     
-    if not target_user:
+    if not target_user or target_user['role'] == 'admin':
         flash('User tidak ditemukan.', 'danger')
         return redirect(url_for('kelola_user'))
     
@@ -267,6 +884,15 @@ def hapus_user(user_id):
     flash(f'User "{target_user["username"]}" berhasil dihapus!', 'warning')
     return redirect(url_for('kelola_user'))
 
+def rehash_password(user_id, password):
+    """Menyimpan ulang hash dengan parameter terbaru, di latar belakang."""
+    try:
+        future = passwords.get_hasher().hash_async(password)
+    except passwords.PoolPenuh:
+        # Coba lagi di login berikutnya
+        return
+    future.add_done_callback(lambda f: db.update_password(user_id, f.result()))
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if 'user_id' in session:
@@ -277,9 +903,12 @@ def login():
         password = request.form['password']
         
         user = db.cek_user(username)
-        if user and check_password_hash(user['password'], password):
+        if user and passwords.verify_password(user['password'], password):
+            if passwords.perlu_rehash(user['password']):
+                rehash_password(user['id'], password)
             session['user_id'] = user['id']
             session['username'] = user['username']
+            session['role'] = user['role']
             flash('Berhasil login!', 'success')
             return redirect(url_for('dashboard'))
         else:
@@ -306,7 +935,7 @@ def register():
             flash('Password minimal 8 karakter.', 'danger')
             return render_template('register.html', active_page='register')
         
-        hashed_password = generate_password_hash(password)
+        hashed_password = passwords.hash_password(password)
         
         if db.tambah_user(username, hashed_password):
             flash('Registrasi berhasil! Silakan login.', 'success')
@@ -0,0 +1,331 @@
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import urllib.request
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # opsional: tanpa brotli hanya varian .gz yang dibuat
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:  # opsional: tanpa rjsmin file JS hanya digabung
+    rjsmin = None
+
+STATIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+# Hasil build (nama berisi hash konten) dan salinan library dari CDN,
+# relatif terhadap folder static
+DIST = 'dist'
+VENDOR = 'vendor'
+MANIFEST = 'manifest.json'
+
+# File library pihak ketiga: path di static/vendor -> URL CDN yang dipakai
+# template sebelum ada salinan lokal. python aset.py unduh mengisi static/vendor.
+CDN = {
+    'jquery/jquery.min.js': 'https://code.jquery.com/jquery-3.6.0.min.js',
+    'select2/select2.min.js': 'https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/js/select2.min.js',
+    'select2/select2.min.css': 'https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/css/select2.min.css',
+    'sweetalert2/sweetalert2.all.min.js':
+        'https://cdn.jsdelivr.net/npm/sweetalert2@11/dist/sweetalert2.all.min.js',
+    'chartjs/chart.umd.js': 'https://cdn.jsdelivr.net/npm/chart.js@4/dist/chart.umd.js',
+    'fontawesome/css/all.min.css':
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+}
+# Font yang dirujuk url(../webfonts/...) di all.min.css; tidak dimuat template secara langsung
+_FONT_AWESOME = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/webfonts/'
+UNDUHAN = dict(CDN, **{
+    f'fontawesome/webfonts/{nama}.{ext}': f'{_FONT_AWESOME}{nama}.{ext}'
+    for nama in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility')
+    for ext in ('woff2', 'ttf')
+})
+
+# Bundel yang dimuat template lewat aset('nama'), berurutan. ikon.css dan
+# dasar.js dipakai halaman login juga, jadi setelah login keduanya sudah
+# ada di cache browser.
+BUNDEL = {
+    'ikon.css': ['vendor/fontawesome/css/all.min.css'],
+    'vendor.css': ['vendor/select2/select2.min.css'],
+    'dasar.js': ['vendor/jquery/jquery.min.js', 'vendor/sweetalert2/sweetalert2.all.min.js'],
+    'vendor.js': ['vendor/select2/select2.min.js', 'vendor/chartjs/chart.umd.js'],
+}
+# File milik aplikasi yang tetap dirujuk lewat url_for('static', filename=...)
+FILE = ['style.css', 'grafik.js', 'favicon.png']
+
+# Varian .br/.gz hanya dibuat untuk tipe yang bisa dikompresi (bukan woff2/gambar)
+EKSTENSI_TEKS = ('.css', '.js', '.svg', '.ttf', '.json', '.map')
+CACHE_IMMUTABLE = 'public, max-age=31536000, immutable'
+# Content-Encoding per varian, urutan = prioritas saat browser menerima keduanya
+ENCODING = (('br', '.br'), ('gzip', '.gz'))
+
+_manifest = None
+_static = STATIC
+_terpasang = False
+
+
+def unduh(static=STATIC, timpa=False):
+    """Mengunduh library dari CDN ke static/vendor (sekali, lalu commit atau
+    salin ke server tanpa internet). Mengembalikan path yang diunduh."""
+    hasil = []
+    for path, url in UNDUHAN.items():
+        tujuan = os.path.join(static, VENDOR, path)
+        if os.path.exists(tujuan) and not timpa:
+            continue
+        os.makedirs(os.path.dirname(tujuan), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as respons:
+            data = respons.read()
+        with open(tujuan + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(tujuan + '.tmp', tujuan)
+        hasil.append(path)
+    return hasil
+
+
+# String CSS dicocokkan lebih dulu dan dikembalikan utuh, jadi komentar
+# atau spasi di dalam string tidak pernah disentuh
+_STRING_CSS = r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')'''
+_KOMENTAR_CSS = re.compile(_STRING_CSS + r'|/\*(?!!).*?\*/', re.S)
+_SPASI_CSS = re.compile(_STRING_CSS + r'''
+  | \s*;?\s*(\})\s*     # ; terakhir sebelum } tidak perlu
+  | \s*([{;,>])\s*      # spasi di sekitar tanda baca
+  | (:)\s+              # spasi setelah ':' (bukan sebelumnya: 'a :hover')
+  | (\s+)               # spasi lain cukup satu
+''', re.X)
+
+
+def minify_css(css):
+    """Minifikasi CSS konservatif: membuang komentar (kecuali /*! lisensi */)
+    dan spasi yang tidak bermakna. Spasi sebelum ':' (selector seperti
+    'a :hover') dan di sekitar '+'/'-' (calc) tidak diubah."""
+    css = _KOMENTAR_CSS.sub(lambda m: m.group(1) or '', css)
+    return _SPASI_CSS.sub(lambda m: next((g for g in m.groups()[:4] if g), ' '), css).strip()
+
+
+def minify_js(js):
+    if rjsmin is None:
+        return js
+    return rjsmin.jsmin(js, keep_bang_comments=True)
+
+
+def _hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _tulis(dist, nama, data, kompresi):
+    """Menulis data sebagai dist/<nama>.<hash>.<ext> (beserta .br/.gz jika
+    lebih kecil); mengembalikan path relatif terhadap folder static."""
+    dasar, ext = os.path.splitext(os.path.basename(nama))
+    nama_dist = f'{dasar}.{_hash(data)}{ext}'
+    path = os.path.join(dist, nama_dist)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+    varian = []
+    if ext in EKSTENSI_TEKS:
+        for encoding, akhiran in ENCODING:
+            if encoding == 'br':
+                if brotli is None:
+                    continue
+                padat = brotli.compress(data, quality=11)
+            else:
+                # mtime=0: hasil build yang sama menghasilkan byte yang sama
+                padat = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(padat) < len(data):
+                with open(path + akhiran, 'wb') as f:
+                    f.write(padat)
+                varian.append(encoding)
+    relatif = f'{DIST}/{nama_dist}'
+    kompresi[relatif] = varian
+    return relatif
+
+
+_URL_CSS = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def _url_css(css, asal, static, dist, kompresi):
+    """Menyalin file yang dirujuk url(...) relatif di CSS vendor (font) ke
+    dist dengan nama ber-hash, dan menulis ulang rujukannya: CSS hasil
+    build berada di folder lain dari sumbernya."""
+    folder = os.path.dirname(os.path.join(static, asal))
+
+    def ganti(m):
+        url = m.group(2)
+        if re.match(r'^(?:[a-z]+:|/|#)', url, re.I):
+            return m.group(0)
+        path, akhiran = re.match(r'([^?#]*)(.*)', url).groups()
+        sumber = os.path.normpath(os.path.join(folder, path))
+        if not os.path.isfile(sumber):
+            return m.group(0)
+        with open(sumber, 'rb') as f:
+            relatif = _tulis(dist, sumber, f.read(), kompresi)
+        return f'url({os.path.basename(relatif)}{akhiran})'
+    return _URL_CSS.sub(ganti, css)
+
+
+def _gabung(sumber, static, dist, kompresi):
+    """Isi satu bundel: file digabung berurutan, yang belum .min di-minify."""
+    bagian = []
+    for path in sumber:
+        with open(os.path.join(static, path), encoding='utf-8') as f:
+            isi = f.read()
+        if path.endswith('.css'):
+            if '.min.' not in path:
+                isi = minify_css(isi)
+            isi = _url_css(isi, path, static, dist, kompresi)
+        elif '.min.' not in path:
+            isi = minify_js(isi)
+        bagian.append(isi.strip())
+    # ';' di antara file JS: file yang tidak diakhiri ';' tidak menyambung ke file berikutnya
+    pemisah = '\n' if sumber[0].endswith('.css') else ';\n'
+    return (pemisah.join(bagian) + '\n').encode('utf-8')
+
+
+def build(static=STATIC, bersihkan=False):
+    """Membuat static/dist: bundel dan file aplikasi yang di-minify, diberi
+    hash konten di namanya, beserta varian .br/.gz, lalu manifest.json.
+
+    Bundel yang sumber vendornya belum lengkap (belum python aset.py unduh)
+    tidak dibuat; file vendor yang ada dibuild satu per satu dan sisanya
+    dimuat template dari CDN. File lama di dist dibiarkan
+    (browser dengan HTML lama masih bisa memuatnya) kecuali bersihkan=True.
+    """
+    dist = os.path.join(static, DIST)
+    os.makedirs(dist, exist_ok=True)
+    manifest = {'file': {}, 'bundel': {}, 'kompresi': {}}
+    kompresi = manifest['kompresi']
+    for nama in FILE:
+        path = os.path.join(static, nama)
+        if not os.path.isfile(path):
+            continue
+        if nama.endswith('.css') or nama.endswith('.js'):
+            data = _gabung([nama], static, dist, kompresi)
+        else:
+            with open(path, 'rb') as f:
+                data = f.read()
+        manifest['file'][nama] = _tulis(dist, nama, data, kompresi)
+    for nama, sumber in BUNDEL.items():
+        ada = [path for path in sumber if os.path.isfile(os.path.join(static, path))]
+        if ada == sumber:
+            manifest['bundel'][nama] = _tulis(dist, nama, _gabung(sumber, static, dist, kompresi), kompresi)
+        else:
+            # Bundel tidak lengkap: file vendor yang ada tetap diberi hash dan dikompresi satu per satu
+            for path in ada:
+                manifest['file'][path] = _tulis(dist, path, _gabung([path], static, dist, kompresi), kompresi)
+    if bersihkan:
+        dipakai = {os.path.basename(path) + akhiran
+                   for path in kompresi for akhiran in ('',) + tuple(a for _, a in ENCODING)}
+        for nama in os.listdir(dist):
+            if nama not in dipakai and nama != MANIFEST:
+                os.remove(os.path.join(dist, nama))
+    with open(os.path.join(dist, MANIFEST + '.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(os.path.join(dist, MANIFEST + '.tmp'), os.path.join(dist, MANIFEST))
+    return manifest
+
+
+def muat_manifest(static=STATIC):
+    try:
+        with open(os.path.join(static, DIST, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def aset(nama):
+    """URL untuk satu bundel di BUNDEL, dipakai template:
+    {% for url in aset('vendor.js') %}<script src="{{ url }}"></script>{% endfor %}
+
+    Hasil build jika ada; jika belum, file static/vendor satu per satu; jika
+    belum diunduh, URL CDN-nya.
+    """
+    if _manifest and nama in _manifest['bundel']:
+        return [url_for('static', filename=_manifest['bundel'][nama])]
+    urls = []
+    for path in BUNDEL[nama]:
+        if (_manifest and path in _manifest['file']) or os.path.isfile(os.path.join(_static, path)):
+            urls.append(url_for('static', filename=path))
+        else:
+            urls.append(CDN[path[len(VENDOR) + 1:]])
+    return urls
+
+
+def _url_defaults(endpoint, values):
+    # url_for('static', filename='style.css') -> /static/dist/style.<hash>.css
+    if endpoint == 'static' and _manifest:
+        nama = _manifest['file'].get(values.get('filename'))
+        if nama is not None:
+            values['filename'] = nama
+
+
+def kirim_static(filename):
+    """Pengganti view 'static' Flask. File di dist/ tidak pernah berubah
+    isinya (nama = hash), jadi disajikan dengan cache immutable setahun dan
+    varian .br/.gz sesuai Accept-Encoding. File lain seperti biasa."""
+    varian = _manifest['kompresi'].get(filename) if _manifest else None
+    if varian is None:
+        return current_app.send_static_file(filename)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    for encoding, akhiran in ENCODING:
+        if encoding in varian and request.accept_encodings[encoding] > 0:
+            respons = send_from_directory(_static, filename + akhiran, mimetype=mimetype,
+                                          download_name=os.path.basename(filename))
+            respons.headers['Content-Encoding'] = encoding
+            break
+    else:
+        respons = send_from_directory(_static, filename, mimetype=mimetype)
+    if varian:
+        respons.vary.add('Accept-Encoding')
+    respons.headers['Cache-Control'] = CACHE_IMMUTABLE
+    return respons
+
+
+def configure(app, aktif=True):
+    """Memasang aset() di template dan, jika static/dist/manifest.json ada
+    dan aktif, URL ber-hash untuk url_for('static', ...) beserta view
+    static yang menyajikan varian terkompresi."""
+    global _manifest, _static, _terpasang
+    _static = app.static_folder
+    _manifest = muat_manifest(_static) if aktif else None
+    if not _terpasang:
+        _terpasang = True
+        app.jinja_env.globals['aset'] = aset
+        app.url_defaults(_url_defaults)
+        app.view_functions['static'] = kirim_static
+    return _manifest
+
+
+def configure_from_app(app):
+    """Membaca ASET dari app.config (default dari environment; default aktif).
+    ASET=0 mengabaikan hasil build, mis. saat mengubah style.css di development."""
+    app.config.setdefault('ASET', os.environ.get('ASET', '1') not in ('', '0'))
+    return configure(app, app.config['ASET'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build aset static (bundel, minify, hash, gzip/brotli).')
+    sub = parser.add_subparsers(dest='perintah', required=True)
+    p_unduh = sub.add_parser('unduh', help='unduh library dari CDN ke static/vendor')
+    p_unduh.add_argument('--timpa', action='store_true', help='unduh ulang file yang sudah ada')
+    p_build = sub.add_parser('build', help='buat static/dist dan manifest.json')
+    p_build.add_argument('--bersihkan', action='store_true', help='hapus file dist yang tidak ada di manifest baru')
+    parser.add_argument('--static', default=STATIC)
+    args = parser.parse_args()
+    if args.perintah == 'unduh':
+        for path in unduh(args.static, args.timpa):
+            print(f'{VENDOR}/{path}')
+    else:
+        manifest = build(args.static, args.bersihkan)
+        for nama, path in sorted({**manifest['file'], **manifest['bundel']}.items()):
+            ukuran = os.path.getsize(os.path.join(args.static, path))
+            varian = ', '.join(f'{e} {os.path.getsize(os.path.join(args.static, path + a))}'
+                               for e, a in ENCODING if e in manifest['kompresi'][path])
+            print(f'{nama} -> {path}  {ukuran} byte' + (f' ({varian})' if varian else ''))
+        kurang = sorted(set(BUNDEL) - set(manifest['bundel']))
+        if kurang:
+            print(f"bundel {', '.join(kurang)} tidak lengkap (sebagian dari CDN): jalankan python aset.py unduh")
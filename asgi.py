@@ -0,0 +1,81 @@
+# Entry point untuk mode async (ASGI):
+#
+#     uvicorn asgi:application --workers 4
+#
+# Setiap request Flask berjalan di thread sendiri, jadi view sync
+# tidak memblok event loop. Untuk GET dashboard, transaksi, laporan dan
+# kelola_user file ini memasang varian async yang menjalankan query
+# halamannya bersamaan di executor db_async (dijadwalkan Flask/asgiref ke
+# event loop server). Entry point WSGI (app:app) tidak memuat file ini dan
+# tetap memakai view sync.
+from functools import wraps
+
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from flask import flash, redirect, render_template, request, session, url_for
+
+import app as aplikasi
+import db_async as adb
+
+app = aplikasi.app
+adb.configure_from_env()
+
+
+def varian_async(endpoint):
+    """Memasang view async untuk GET `endpoint`; method lain tetap ke view sync."""
+    view_sync = app.view_functions[endpoint]
+
+    def pasang(f):
+        view_async = app.ensure_sync(aplikasi.login_required(f))
+
+        @wraps(view_sync)
+        def view(*args, **kwargs):
+            if request.method in ('GET', 'HEAD'):
+                return view_async(*args, **kwargs)
+            return view_sync(*args, **kwargs)
+        app.view_functions[endpoint] = view
+        return f
+    return pasang
+
+
+@varian_async('dashboard')
+async def dashboard():
+    return aplikasi.render_dashboard(*await adb.jalankan_query(aplikasi.query_dashboard(session['user_id'])))
+
+
+@varian_async('transaksi')
+async def transaksi():
+    user_id = session['user_id']
+    filter_ = aplikasi.filter_transaksi()
+    halaman, agregasi, berulang = await adb.jalankan_query(aplikasi.query_transaksi(user_id, filter_))
+    saldo = await adb.saldo_berjalan(user_id, halaman['transaksi'])
+    return aplikasi.render_transaksi(filter_, halaman, agregasi, berulang, saldo)
+
+
+@varian_async('laporan')
+async def laporan():
+    if not aplikasi.is_admin():
+        flash('Halaman ini hanya untuk admin.', 'danger')
+        return redirect(url_for('dashboard'))
+    filter_ = aplikasi.filter_laporan()
+    return aplikasi.render_laporan(filter_, *await adb.jalankan_query(aplikasi.query_laporan(filter_)))
+
+
+@varian_async('kelola_user')
+async def kelola_user():
+    if not aplikasi.is_admin():
+        flash('Halaman ini hanya untuk admin.', 'danger')
+        return redirect(url_for('dashboard'))
+    users = await adb.admin_get_all_users_detail()
+    return render_template('admin_kelola_user.html', users=users, active_page='kelola_user')
+
+
+_wsgi = WsgiToAsgi(app)
+
+
+async def application(scope, receive, send):
+    # WsgiToAsgi menjalankan app di sync_to_async(thread_sensitive=True).
+    # Tanpa konteks, semua request satu proses antre di satu thread yang
+    # sama; ThreadSensitiveContext memberi setiap request thread sendiri.
+    async with ThreadSensitiveContext():
+        await _wsgi(scope, receive, send)
@@ -0,0 +1,117 @@
+import sqlite3
+import sys
+from operator import itemgetter
+
+# Kolom teks yang nilainya sedikit dan berulang di banyak baris (tanggal,
+# tipe, kategori, ...). Pada hasil query besar setiap nilai di-intern,
+# sehingga 100k baris berbagi satu objek 'Pengeluaran' alih-alih 100k salinan.
+KOLOM_INTERN = frozenset({'tanggal', 'tipe', 'kategori', 'username', 'role', 'frekuensi'})
+
+# Hasil query yang lebih kecil dari ini tidak di-intern (tidak sebanding
+# dengan biaya transpose untuk satu halaman).
+MIN_BARIS_INTERN = 256
+
+
+class Baris(tuple):
+    """Satu baris hasil query: tuple biasa (tanpa dict per baris) yang juga
+    bisa dibaca per nama kolom seperti sqlite3.Row.
+
+    row[0], row['tanggal'], dan row.tanggal semuanya valid; keys() dan
+    dict(row) mengikuti urutan kolom query. Satu subclass dibuat per
+    susunan kolom (lihat kelas_baris), jadi nama kolom disimpan sekali per
+    query, bukan per baris.
+    """
+    __slots__ = ()
+    _kolom = ()
+    _indeks = {}
+    _intern = ()
+
+    def __getitem__(self, kunci, _ambil=tuple.__getitem__):
+        if kunci.__class__ is str:
+            return _ambil(self, self._indeks[kunci])
+        return _ambil(self, kunci)
+
+    def keys(self):
+        return self._kolom
+
+    def _asdict(self):
+        return dict(zip(self._kolom, self))
+
+    def __repr__(self):
+        isi = ', '.join(f'{k}={v!r}' for k, v in zip(self._kolom, self))
+        return f'Baris({isi})'
+
+
+_kelas = {}
+
+
+def kelas_baris(description):
+    """Subclass Baris untuk cursor.description (di-cache per susunan kolom)."""
+    kelas = _kelas.get(description)
+    if kelas is not None:
+        return kelas
+    kolom = tuple(d[0] for d in description)
+    atribut = {
+        '__slots__': (),
+        '_kolom': kolom,
+        # Nama kolom ganda (mis. JOIN dengan SELECT *) menunjuk ke yang pertama, seperti sqlite3.Row
+        '_indeks': {nama: i for i, nama in reversed(list(enumerate(kolom)))},
+        '_intern': tuple(i for i, nama in enumerate(kolom) if nama in KOLOM_INTERN),
+    }
+    for i, nama in enumerate(kolom):
+        # Akses atribut (row.tanggal, juga dipakai Jinja) lewat itemgetter, tanpa frame Python
+        if nama.isidentifier() and not nama.startswith('_') and nama not in Baris.__dict__:
+            atribut.setdefault(nama, property(itemgetter(i)))
+    kelas = _kelas[description] = type('Baris', (Baris,), atribut)
+    return kelas
+
+
+def _bungkus(kelas, rows, intern=False):
+    if intern and kelas._intern and len(rows) >= MIN_BARIS_INTERN:
+        kolom = list(zip(*rows))
+        for i in kelas._intern:
+            try:
+                kolom[i] = tuple(map(sys.intern, kolom[i]))
+            except TypeError:
+                # Ada NULL/angka di kolom ini; biarkan apa adanya
+                pass
+        rows = zip(*kolom)
+    return list(map(kelas, rows))
+
+
+class Kursor(sqlite3.Cursor):
+    """Cursor yang mengembalikan Baris. Baris dibaca sebagai tuple oleh
+    sqlite3 lalu dibungkus per batch (map di C), bukan lewat row_factory
+    Python yang dipanggil sekali per baris."""
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is None:
+            return None
+        return kelas_baris(self.description)(row)
+
+    def fetchmany(self, size=None):
+        # Batch streaming (export) cepat dibuang, jadi tidak di-intern
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if not rows:
+            return rows
+        return _bungkus(kelas_baris(self.description), rows)
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if not rows:
+            return rows
+        return _bungkus(kelas_baris(self.description), rows, intern=True)
+
+    def __iter__(self):
+        if self.description is None:
+            return super().__iter__()
+        # __next__ bawaan sqlite3 (tuple) lewat callable-iterator, tetap tanpa frame Python per baris
+        return map(kelas_baris(self.description), iter(super().__next__, None))
+
+
+class Koneksi(sqlite3.Connection):
+    """Koneksi yang conn.execute()-nya memakai Kursor (sqlite3.connect(factory=Koneksi))."""
+
+    def execute(self, sql, parameters=()):
+        return self.cursor(Kursor).execute(sql, parameters)
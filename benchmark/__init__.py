@@ -0,0 +1 @@
+"""Benchmark scripts. Run from the repository root, e.g. ``python -m benchmark.bench_export``."""
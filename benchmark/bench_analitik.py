@@ -0,0 +1,185 @@
+"""Columnar analytics (analitik.py) vs the equivalent SQL.
+
+Fills a scratch database with benchmark.data_sintetis, loads the NumPy
+snapshot, and times admin-style questions both ways: the SQL that
+database.py runs today (admin_laporan, admin_get_stats_per_user) or would
+need (ad-hoc GROUP BY over transaksi), and the vectorized snapshot query.
+Every pair is checked for identical results. Also reports the snapshot's
+load time, memory, and the cost of an incremental refresh after writes.
+
+    python -m benchmark.bench_analitik
+    python -m benchmark.bench_analitik --transaksi 1000000 --users 500 --bulan 24
+
+Needs NumPy (pip install numpy).
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+import analitik
+import cache
+import database as db
+from benchmark import data_sintetis
+
+# Rentang yang tidak selaras batas bulan, jadi rollup ringkasan_bulanan tidak bisa dipakai
+PERIODE = ('2025-02-10', '2025-11-20')
+
+
+def ukur(fungsi, ulang):
+    fungsi()
+    durasi = []
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        hasil = fungsi()
+        durasi.append(time.perf_counter() - mulai)
+    return statistics.median(durasi) * 1000, hasil
+
+
+def sql_gabung(query, params=(), kunci=2):
+    """Menjalankan GROUP BY di semua shard dan menjumlahkan kolom setelah
+    `kunci` kolom pertama (setiap shard memegang user berbeda, tetapi
+    kategori/bulan yang sama bisa muncul di beberapa shard)."""
+    hasil = defaultdict(lambda: [0] * 2)
+    for rows in db._sebar(db._fetchall, query, params):
+        for row in rows:
+            nilai = hasil[tuple(row[:kunci])]
+            for i, v in enumerate(row[kunci:]):
+                nilai[i] += v
+    return {k: tuple(v) for k, v in hasil.items()}
+
+
+def kasus(start, end):
+    """(nama, fungsi SQL, fungsi analitik); keduanya mengembalikan dict yang sebanding."""
+
+    def laporan_sql():
+        # Pola /laporan hari ini: materialisasi semua baris lalu dijumlah di Python
+        hasil = defaultdict(lambda: [0, 0])
+        for row in db.admin_laporan(start, end):
+            nilai = hasil[(row['tipe'], row['kategori'])]
+            nilai[0] += row['jumlah']
+            nilai[1] += 1
+        return {k: tuple(v) for k, v in hasil.items()}
+
+    def stats_sql():
+        return {row['username']: (row['pemasukan'], row['pengeluaran'])
+                for row in db.admin_get_stats_per_user()
+                if row['pemasukan'] or row['pengeluaran']}
+
+    username = {row['id']: row['username'] for row in db.admin_get_all_users()}
+
+    def stats_analitik(*rentang):
+        return {username[row['user_id']]: (row['pemasukan'], row['pengeluaran'])
+                for row in analitik.stats_per_user(*rentang)}
+
+    per_user_sql = '''
+        SELECT user_id, NULL,
+               SUM(CASE WHEN tipe = 'Pemasukan' THEN jumlah ELSE 0 END),
+               SUM(CASE WHEN tipe = 'Pengeluaran' THEN jumlah ELSE 0 END)
+        FROM transaksi WHERE tanggal >= ? AND tanggal <= ?
+        GROUP BY user_id
+    '''
+
+    def top_sql():
+        rows = [row for rows in db._sebar(db._fetchall, '''
+            SELECT user_id, SUM(jumlah) AS total FROM transaksi
+            WHERE tipe = 'Pengeluaran' AND tanggal >= ? AND tanggal <= ?
+            GROUP BY user_id ORDER BY total DESC, user_id LIMIT 10
+        ''', (start, end)) for row in rows]
+        return [(r[0], r[1]) for r in sorted(rows, key=lambda r: (-r[1], r[0]))[:10]]
+
+    def top_analitik():
+        rows = analitik.agregasi(('user',), start, end, tipe='Pengeluaran', urut_total=True)
+        return sorted(((r['user'], r['total']) for r in rows), key=lambda r: (-r[1], r[0]))[:10]
+
+    return [
+        ('laporan per kategori (admin_laporan)', laporan_sql,
+         lambda: {(r['tipe'], r['kategori']): (r['total'], r['n'])
+                  for r in analitik.agregasi(('tipe', 'kategori'), start, end)}),
+        ('stats per user (admin_get_stats_per_user)', stats_sql, stats_analitik),
+        ('stats per user, rentang bebas',
+         lambda: {k[0]: v for k, v in sql_gabung(per_user_sql, (start, end)).items()},
+         lambda: {row['user_id']: (row['pemasukan'], row['pengeluaran'])
+                  for row in analitik.stats_per_user(start, end)}),
+        ('pivot user x kategori',
+         lambda: sql_gabung('SELECT user_id, kategori, SUM(jumlah), COUNT(*) FROM transaksi '
+                            'WHERE tanggal >= ? AND tanggal <= ? GROUP BY user_id, kategori', (start, end)),
+         lambda: {(r['user'], r['kategori']): (r['total'], r['n'])
+                  for r in analitik.agregasi(('user', 'kategori'), start, end)}),
+        ('top 10 pengeluaran', top_sql, top_analitik),
+        ('per bulan x kategori, semua data',
+         lambda: sql_gabung("SELECT substr(tanggal, 1, 7), kategori, SUM(jumlah), COUNT(*) "
+                            "FROM transaksi GROUP BY 1, 2"),
+         lambda: {(r['bulan'], r['kategori']): (r['total'], r['n'])
+                  for r in analitik.agregasi(('bulan', 'kategori'))}),
+    ]
+
+
+def tulis_acak(rng, user_ids, n):
+    """n transaksi baru, n/5 diubah, n/5 dihapus."""
+    for _ in range(n):
+        db.tambah_transaksi(rng.choice(user_ids), '2025-06-15', 'Pengeluaran', 'Belanja', 5_000_000, 'bench')
+    for _ in range(n // 5):
+        uid = rng.choice(user_ids)
+        row = db.ambil_transaksi_limit(uid, 1)
+        if row:
+            t = row[0]
+            db.edit_transaksi(t['id'], uid, t['tanggal'], t['tipe'], 'Hiburan', t['jumlah'] + 100, t['catatan'])
+    for _ in range(n // 5):
+        uid = rng.choice(user_ids)
+        row = db.ambil_transaksi_limit(uid, 1)
+        if row:
+            db.hapus_transaksi(row[0]['id'], uid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transaksi', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--bulan', type=int, default=24)
+    parser.add_argument('--shards', type=int, default=1)
+    parser.add_argument('--ulang', type=int, default=5)
+    parser.add_argument('--tulis', type=int, default=1000, help='transaksi baru sebelum refresh bertahap')
+    args = parser.parse_args()
+
+    cache.configure(None)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME, db.DB_SHARDS = os.path.join(tmp, 'bench_analitik.db'), args.shards
+        db.init_db()
+        user_ids = data_sintetis.isi(args.users, args.transaksi, bulan=args.bulan, password_hash='x')
+
+        mulai = time.perf_counter()
+        snapshot = analitik.snapshot()
+        kolom = snapshot.kolom()
+        muat = time.perf_counter() - mulai
+        ukuran = sum(getattr(kolom, nama).nbytes
+                     for nama in ('id', 'user', 'tipe', 'kategori', 'tanggal', 'jumlah', 'hidup'))
+        print(f"{len(kolom)} transaksi, {args.users} user, DB_SHARDS={args.shards}: "
+              f"muat snapshot {muat * 1000:.0f} ms, {ukuran / 2**20:.1f} MiB")
+
+        cek_ms, _ = ukur(snapshot.kolom, args.ulang)
+        tulis_acak(random.Random(0), user_ids, args.tulis)
+        mulai = time.perf_counter()
+        snapshot.kolom()
+        bertahap = (time.perf_counter() - mulai) * 1000
+        print(f"cek tanpa perubahan {cek_ms:.2f} ms, refresh setelah {args.tulis} tambah + "
+              f"{args.tulis // 5} edit + {args.tulis // 5} hapus {bertahap:.1f} ms")
+
+        print(f"\n{'kasus':<44} {'SQL ms':>10} {'analitik ms':>12} {'x':>7}")
+        gagal = False
+        for nama, sql, kolomnar in kasus(*PERIODE):
+            sql_ms, hasil_sql = ukur(sql, args.ulang)
+            analitik_ms, hasil_analitik = ukur(kolomnar, args.ulang)
+            sama = hasil_sql == hasil_analitik
+            gagal = gagal or not sama
+            print(f"{nama:<44} {sql_ms:10.2f} {analitik_ms:12.2f} {sql_ms / analitik_ms:7.1f}"
+                  + ("" if sama else "  HASIL BERBEDA"))
+        db.close_connection()
+    raise SystemExit(1 if gagal else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Bytes transferred per page view: CDN + plain static vs aset.py build.
+
+Copies static/ into a temporary folder and renders pages through the Flask
+test client the way a browser would load them: the HTML, every script,
+stylesheet and icon it references, and every woff2 font referenced by those
+stylesheets (an upper bound: browsers only fetch the faces a page uses). A
+small browser cache keeps each response; a cached response with a max-age
+is reused without a request, one without is revalidated (If-None-Match,
+304). Requests send Accept-Encoding: gzip, deflate, br.
+
+Three setups, each for the same sequence of page views:
+
+    CDN          the previous templates: vendor libraries from CDNs,
+                 style.css/grafik.js/favicon.png served as-is
+    vendor       static/vendor copies (python aset.py unduh), not built
+    build        python aset.py build: bundles, minified, fingerprinted,
+                 .br/.gz variants, immutable caching
+
+Page views: /login, then the dashboard right after logging in, then the
+dashboard again. CDN responses cannot be fetched here; their size is
+estimated as the gzip -9 size of the matching static/vendor file (as
+CDNs serve it compressed) and they are assumed cacheable. Without that file
+they are counted as requests of unknown size. Google Fonts is external in
+every setup and not counted.
+
+    python -m benchmark.bench_aset
+    python -m benchmark.bench_aset --vendor /path/to/static/vendor
+"""
+import argparse
+import gzip
+import os
+import re
+import shutil
+import tempfile
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+import aset
+import cache
+import database as db
+from benchmark import data_sintetis
+
+HEADERS = {'Accept-Encoding': 'gzip, deflate, br'}
+_URL_CSS = re.compile(r'''url\(\s*['"]?([^'")]+?\.woff2)(?:[?#][^'")]*)?['"]?\s*\)''')
+# URL CDN -> path di static/vendor (termasuk font yang dirujuk CSS Font Awesome)
+_CDN = {url: path for path, url in aset.UNDUHAN.items()}
+
+
+class _Rujukan(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        rel = (attrs.get('rel') or '').split()
+        if tag == 'script' and attrs.get('src'):
+            self.urls.append(attrs['src'])
+        elif tag == 'link' and ('stylesheet' in rel or 'icon' in rel) and attrs.get('href'):
+            if not attrs['href'].startswith('https://fonts.googleapis.com/'):
+                self.urls.append(attrs['href'])
+
+
+class Browser:
+    """Cache HTTP sederhana di atas test client; mencatat request dan byte."""
+
+    def __init__(self, client, vendor):
+        self.client = client
+        self.vendor = vendor
+        self.cache = {}
+
+    def muat(self, path):
+        """Satu page view: (request, byte lokal, byte CDN perkiraan, request CDN tanpa ukuran)."""
+        self.hitung = [0, 0, 0, 0]
+        respons = self.client.get(path, headers=HEADERS)
+        assert respons.status_code == 200, (path, respons.status_code)
+        self.hitung[0] += 1
+        self.hitung[1] += len(respons.get_data())
+        parser = _Rujukan()
+        parser.feed(respons.get_data(as_text=True))
+        for url in parser.urls:
+            self.ambil(urljoin('http://localhost' + path, url))
+        return self.hitung
+
+    def ambil(self, url):
+        if url in self.cache:
+            cache_control, etag = self.cache[url]
+            if 'max-age' in cache_control and 'max-age=0' not in cache_control:
+                return
+        else:
+            etag = None
+        self.hitung[0] += 1
+        if urlsplit(url).hostname != 'localhost':
+            path = os.path.join(self.vendor, _CDN.get(url, '-'))
+            if not os.path.isfile(path):
+                self.hitung[3] += 1
+                return
+            with open(path, 'rb') as f:
+                data = f.read()
+            self.cache[url] = ('max-age=604800', None)
+            if path.endswith('.woff2'):
+                self.hitung[2] += len(data)
+            else:
+                self.hitung[2] += len(gzip.compress(data, 9))
+                data = data.decode('utf-8')
+                if path.endswith('.css'):
+                    for font in dict.fromkeys(_URL_CSS.findall(data)):
+                        self.ambil(urljoin(url, font))
+            return
+        headers = dict(HEADERS, **({'If-None-Match': etag} if etag else {}))
+        respons = self.client.get(urlsplit(url).path, headers=headers)
+        assert respons.status_code in (200, 304), (url, respons.status_code)
+        self.hitung[1] += len(respons.get_data())
+        if respons.status_code == 304:
+            return
+        self.cache[url] = (respons.headers.get('Cache-Control', ''), respons.headers.get('ETag'))
+        if respons.mimetype == 'text/css':
+            data = respons.get_data()
+            if respons.content_encoding == 'br':
+                data = aset.brotli.decompress(data)
+            elif respons.content_encoding == 'gzip':
+                data = gzip.decompress(data)
+            for font in dict.fromkeys(_URL_CSS.findall(data.decode('utf-8'))):
+                self.ambil(urljoin(url, font))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vendor', default=os.path.join(aset.STATIC, aset.VENDOR),
+                        help='folder hasil python aset.py unduh')
+    args = parser.parse_args()
+
+    cache.configure(None)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, 'bench_aset.db')
+        db.init_db()
+        user_id = data_sintetis.isi(1, 1000, password_hash='x')[0]
+        import app as aplikasi
+
+        static = os.path.join(tmp, 'static')
+        shutil.copytree(aset.STATIC, static, ignore=shutil.ignore_patterns(aset.DIST, aset.VENDOR))
+        vendor = os.path.join(static, aset.VENDOR)
+        ada = os.path.isdir(args.vendor)
+        print(f"vendor: {args.vendor if ada else 'tidak ada (jalankan python aset.py unduh)'}")
+        aplikasi.app.static_folder = static
+
+        halaman = (('/login', '/login', False), ('dashboard', '/', True), ('dashboard lagi', '/', True))
+        hasil = {}
+        for nama in ('CDN', 'vendor', 'build'):
+            if nama == 'vendor':
+                if not ada:
+                    continue
+                shutil.copytree(args.vendor, vendor)
+            elif nama == 'build':
+                aset.build(static)
+            aset.configure(aplikasi.app, aktif=nama == 'build')
+            client = aplikasi.app.test_client()
+            browser = Browser(client, args.vendor)
+            hasil[nama] = []
+            for judul, path, login in halaman:
+                if login:
+                    with client.session_transaction() as session:
+                        session['user_id'] = user_id
+                hasil[nama].append(browser.muat(path))
+
+        print(f"\n{'page view':<16} {'setup':<8} {'request':>8} {'lokal KiB':>10} {'CDN KiB':>9} {'total KiB':>10}")
+        for i, (judul, _, _) in enumerate(halaman):
+            for nama, per_halaman in hasil.items():
+                n, lokal, cdn, tanpa_ukuran = per_halaman[i]
+                catatan = f"  + {tanpa_ukuran} request CDN tanpa ukuran" if tanpa_ukuran else ""
+                print(f"{judul:<16} {nama:<8} {n:>8} {lokal / 1024:>10.1f} {cdn / 1024:>9.1f} "
+                      f"{(lokal + cdn) / 1024:>10.1f}{catatan}")
+        db.close_connection()
+
+
+if __name__ == '__main__':
+    main()
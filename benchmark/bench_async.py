@@ -0,0 +1,182 @@
+"""Load test: sync (gunicorn) vs async (uvicorn + asgi.py) serving modes.
+
+Builds a scratch database, starts each server pinned to the same CPU cores
+with one worker per core, then drives it with keep-alive HTTP clients (half
+logged in as a user, half as admin) hitting /, /transaksi, /laporan and
+/kelola-user. Reports requests/sec and latency percentiles per mode.
+
+    python -m benchmark.bench_async
+    python -m benchmark.bench_async --cores 2 --klien 32 --detik 20
+
+Needs gunicorn and uvicorn installed (pip install gunicorn uvicorn).
+"""
+import argparse
+import http.client
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PASSWORD = 'rahasia123'
+HALAMAN_USER = ('/', '/transaksi?start_date=2025-01-01&end_date=2025-12-31')
+HALAMAN_ADMIN = ('/', '/laporan?start_date=2025-06-01&end_date=2025-06-30', '/kelola-user')
+
+
+def siapkan_db(path, users, transaksi_per_user):
+    sys.path.insert(0, REPO)
+    import database as db
+    from werkzeug.security import generate_password_hash
+
+    db.DB_NAME = path
+    db.init_db()
+    hash_murah = generate_password_hash(PASSWORD, 'pbkdf2:sha256:1000')
+    db.tambah_user('admin', hash_murah, role='admin')
+    conn = db.get_connection()
+    with conn:
+        conn.executemany('INSERT INTO users (username, password) VALUES (?, ?)',
+                         ((f'user{i}', hash_murah) for i in range(users)))
+    rng = random.Random(0)
+    for uid in range(2, users + 2):
+        db.tambah_transaksi_bulk(uid, (
+            (f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+             rng.choice(('Pemasukan', 'Pengeluaran')), rng.choice(('Makan', 'Gaji', 'Transport')),
+             rng.randint(1, 500) * 100000, '') for _ in range(transaksi_per_user)))
+    db.close_connection()
+
+
+def port_bebas():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def jalankan_server(mode, cwd, port, cores):
+    workers = str(len(cores))
+    if mode == 'sync':
+        cmd = [sys.executable, '-m', 'gunicorn', '-w', workers, '--threads', '4',
+               '-b', f'127.0.0.1:{port}', 'app:app']
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', '--workers', workers, '--port', str(port),
+               '--log-level', 'warning', 'asgi:application']
+    env = dict(os.environ, PYTHONPATH=REPO, SECRET_KEY='bench', CACHE_BACKEND='sqlite',
+               PASSWORD_HASH_METHOD='pbkdf2:sha256:1000')
+    # Log ke file: pipe yang tidak dibaca akan penuh dan membekukan server
+    log = open(os.path.join(cwd, f'{mode}.log'), 'wb')
+    proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT,
+                            preexec_fn=lambda: os.sched_setaffinity(0, cores))
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                with open(log.name) as f:
+                    raise RuntimeError(f.read())
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f'{mode} server did not start')
+
+
+def login(conn, username):
+    body = urllib.parse.urlencode({'username': username, 'password': PASSWORD})
+    conn.request('POST', '/login', body, {'Content-Type': 'application/x-www-form-urlencoded'})
+    resp = conn.getresponse()
+    resp.read()
+    cookie = resp.getheader('Set-Cookie').split(';', 1)[0]
+    return {'Cookie': cookie}
+
+
+def klien(port, username, halaman, berhenti, latensi, error):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    headers = login(conn, username)
+    i = 0
+    while not berhenti.is_set():
+        path = halaman[i % len(halaman)]
+        i += 1
+        mulai = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                error.append(resp.status)
+        except (OSError, http.client.HTTPException) as e:
+            error.append(repr(e))
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latensi.append(time.perf_counter() - mulai)
+    conn.close()
+
+
+def ukur(mode, cwd, cores, jumlah_klien, detik, users):
+    port = port_bebas()
+    proc = jalankan_server(mode, cwd, port, cores)
+    try:
+        berhenti = threading.Event()
+        latensi, error = [], []
+        threads = []
+        for i in range(jumlah_klien):
+            admin = i % 2 == 1
+            username = 'admin' if admin else f'user{i % users}'
+            t = threading.Thread(target=klien, args=(port, username, HALAMAN_ADMIN if admin else HALAMAN_USER,
+                                                     berhenti, latensi, error))
+            t.start()
+            threads.append(t)
+        # Pemanasan: buang latensi detik pertama (cache dingin, koneksi baru)
+        time.sleep(1)
+        latensi.clear()
+        mulai = time.perf_counter()
+        time.sleep(detik)
+        n = len(latensi)
+        durasi = time.perf_counter() - mulai
+        berhenti.set()
+        for t in threads:
+            t.join()
+        hasil = sorted(latensi[:n])
+    finally:
+        proc.terminate()
+        proc.wait()
+    ms = [x * 1000 for x in hasil]
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))] if ms else float('nan')
+    print(f"{mode:<6} {n / durasi:9.1f} req/s  p50={statistics.median(ms) if ms else float('nan'):7.2f}ms "
+          f"p99={p99:7.2f}ms  error={len(error)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cores', type=int, default=min(2, os.cpu_count() or 1))
+    parser.add_argument('--klien', type=int, default=16)
+    parser.add_argument('--detik', type=float, default=10)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--transaksi', type=int, default=2000, help='transaksi per user')
+    parser.add_argument('--mode', nargs='+', choices=('sync', 'async'), default=('sync', 'async'))
+    parser.add_argument('--simpan-log', action='store_true', help='jangan hapus direktori sementara')
+    args = parser.parse_args()
+
+    cores = set(sorted(os.sched_getaffinity(0))[:args.cores])
+    tmp = tempfile.mkdtemp()
+    try:
+        siapkan_db(os.path.join(tmp, 'keuangan.db'), args.users, args.transaksi)
+        print(f"{len(cores)} core, {args.klien} klien, {args.detik:g}s, "
+              f"{args.users} user x {args.transaksi} transaksi")
+        for mode in args.mode:
+            ukur(mode, tmp, cores, args.klien, args.detik, args.users)
+    finally:
+        if args.simpan_log:
+            print(f"log server: {tmp}")
+        else:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Row objects and JSON listing: baris.Baris vs sqlite3.Row + jsonify.
+
+Fills one user with --transaksi rows and reads them all with the query of
+database.ambil_semua_transaksi, once through a connection with
+row_factory = sqlite3.Row (the previous setup) and through
+database.get_connection (baris.Koneksi), both with SELECT * and with only
+the API v1 columns. For each it reports fetch time and the memory held by
+the result list (tracemalloc), then serializes the rows to JSON:
+
+    Row + jsonify   SELECT * rows, dict built field by field, flask.jsonify
+    Baris + API v1  KOLOM_API rows as arrays via app.respons_json, as
+                    /api/v1/transaksi does
+
+Both payloads must decode to the same values. Throughput is rows/s over the
+whole result; --per-page also times one page the size the API serves.
+
+    python -m benchmark.bench_baris
+    python -m benchmark.bench_baris --transaksi 500000
+"""
+import argparse
+import gc
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import cache
+import database as db
+from benchmark import data_sintetis
+
+QUERY = 'SELECT {} FROM transaksi WHERE user_id = ? ORDER BY tanggal DESC, id DESC'
+
+
+def ukur(fungsi, ulang):
+    fungsi()
+    durasi = []
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        hasil = fungsi()
+        durasi.append(time.perf_counter() - mulai)
+    return statistics.median(durasi), hasil
+
+
+def memori(fungsi):
+    """Byte yang masih dipegang hasil fungsi() (setelah hasil sementara dibebaskan)."""
+    gc.collect()
+    tracemalloc.start()
+    hasil = fungsi()
+    gc.collect()
+    dipakai = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return dipakai, hasil
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transaksi', type=int, default=100_000)
+    parser.add_argument('--per-page', type=int, default=200)
+    parser.add_argument('--ulang', type=int, default=5)
+    args = parser.parse_args()
+
+    cache.configure(None)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, 'bench_baris.db')
+        db.init_db()
+        user_id = data_sintetis.isi(1, args.transaksi, password_hash='x')[0]
+        # app membaca skema saat import, jadi diimpor setelah database siap
+        import app as aplikasi
+
+        conn_row = sqlite3.connect(db.DB_NAME)
+        conn_row.row_factory = sqlite3.Row
+        conn_baris = db.get_connection(user_id)
+
+        print(f"1 user, {args.transaksi} transaksi\n")
+        print(f"{'baris':<22} {'fetch ms':>9} {'MiB':>7} {'byte/baris':>11}")
+        hasil = {}
+        for nama, conn, kolom in (('sqlite3.Row', conn_row, '*'),
+                                  ('baris.Baris', conn_baris, '*'),
+                                  ('baris.Baris, KOLOM_API', conn_baris, aplikasi._SELECT_API)):
+            query = QUERY.format(kolom)
+            fetch, _ = ukur(lambda: conn.execute(query, (user_id,)).fetchall(), args.ulang)
+            dipakai, rows = memori(lambda: conn.execute(query, (user_id,)).fetchall())
+            hasil[nama] = rows
+            print(f"{nama:<22} {fetch * 1000:9.1f} {dipakai / 2**20:7.1f} {dipakai / len(rows):11.0f}")
+
+        def lama(rows):
+            # Pola get_transaksi sebelumnya: dict per baris, field demi field
+            return aplikasi.jsonify([{
+                'id': t['id'],
+                'tanggal': t['tanggal'],
+                'tipe': t['tipe'],
+                'kategori': t['kategori'],
+                'jumlah': t['jumlah'],
+                'catatan': t['catatan'],
+            } for t in rows]).get_data()
+
+        def baru(rows):
+            # Seperti /api/v1/transaksi: baris yang hanya berisi KOLOM_API langsung menjadi array
+            return aplikasi.respons_json({'kolom': aplikasi.KOLOM_API, 'transaksi': rows}).get_data()
+
+        print(f"\n{'serialisasi':<16} {'baris':>7} {'ms':>9} {'baris/s':>10} {'KiB':>8}")
+        gagal = False
+        with aplikasi.app.test_request_context():
+            for n in (len(hasil['sqlite3.Row']), args.per_page):
+                detik_lama, body_lama = ukur(lambda: lama(hasil['sqlite3.Row'][:n]), args.ulang)
+                detik_baru, body_baru = ukur(lambda: baru(hasil['baris.Baris, KOLOM_API'][:n]), args.ulang)
+                data = json.loads(body_baru)
+                sama = json.loads(body_lama) == [dict(zip(data['kolom'], t)) for t in data['transaksi']]
+                gagal = gagal or not sama
+                for nama, detik, body in (('Row + jsonify', detik_lama, body_lama),
+                                          ('Baris + API v1', detik_baru, body_baru)):
+                    print(f"{nama:<16} {n:>7} {detik * 1000:9.2f} {n / detik:10.0f} {len(body) / 1024:8.0f}"
+                          + ("" if sama else "  HASIL BERBEDA"))
+        conn_row.close()
+        db.close_connection()
+    raise SystemExit(1 if gagal else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Recurring transactions: scheduler tick and catch-up cost.
+
+Gives every user a monthly salary and rent (random day of month), a weekly
+subscription, and every tenth user a daily expense, then runs
+database.materialisasi_berulang the way penjadwal.py does:
+
+    idle       a tick with nothing due (must not grow with --users)
+    1 hari     one day of occurrences
+    catch-up   --downtime more days at once, as after an outage
+    ulang      the same run again (must create nothing)
+
+For each run it reports transactions created, batches, batch time
+(median/max), lag, and rows/s, and checks the count against the rules. The
+one-day workload is also inserted with a per-row tambah_transaksi loop, the
+way users entered these rows by hand through /transaksi.
+
+    python -m benchmark.bench_berulang
+    python -m benchmark.bench_berulang --users 100000 --downtime 30 --shards 4
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+import cache
+import database as db
+from benchmark import data_sintetis
+
+MULAI = date(2025, 1, 1)
+# Semua kejadian sampai tanggal ini dianggap sudah dibuat
+TERAKHIR = date(2025, 5, 31)
+
+
+def buat_aturan(rng, user_ids):
+    """(user_id, frekuensi, mulai, tipe, kategori, jumlah sen) untuk setiap aturan."""
+    for i, uid in enumerate(user_ids):
+        yield uid, 'bulanan', MULAI.replace(day=rng.randint(1, 28)), 'Pemasukan', 'Gaji', 800_000_000
+        yield uid, 'bulanan', MULAI.replace(day=rng.randint(1, 28)), 'Pengeluaran', 'Tagihan', 250_000_000
+        yield uid, 'mingguan', MULAI + timedelta(days=rng.randrange(7)), 'Pengeluaran', 'Hiburan', 5_500_000
+        if i % 10 == 0:
+            yield uid, 'harian', MULAI, 'Pengeluaran', 'Transportasi', 2_000_000
+
+
+def kejadian(frekuensi, mulai, setelah, sampai):
+    """Tanggal kejadian aturan di rentang (setelah, sampai]."""
+    tanggal = mulai
+    while tanggal <= sampai:
+        if tanggal > setelah:
+            yield tanggal
+        tanggal = db.kejadian_berikutnya(frekuensi, mulai, tanggal)
+
+
+def isi_aturan(aturan):
+    """Menyimpan aturan langsung dengan berikutnya = kejadian pertama setelah
+    TERAKHIR, seolah penjadwal sudah berjalan sampai tanggal itu."""
+    per_file = {}
+    for uid, frekuensi, mulai, tipe, kategori, jumlah in aturan:
+        berikutnya = next(kejadian(frekuensi, mulai, TERAKHIR, date.max))
+        per_file.setdefault(db.shard_untuk(uid) if db.DB_SHARDS > 1 else 0, (uid, []))[1].append(
+            (uid, frekuensi, mulai.isoformat(), berikutnya.isoformat(), tipe, kategori, jumlah))
+    for uid, rows in per_file.values():
+        conn = db.get_connection(uid)
+        with conn:
+            conn.executemany('''
+                INSERT INTO transaksi_berulang
+                    (user_id, frekuensi, mulai, berikutnya, tipe, kategori, jumlah, catatan)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'bench')
+            ''', rows)
+
+
+def jumlah_transaksi():
+    return sum(conn.execute('SELECT COUNT(*) FROM transaksi').fetchone()[0] for conn in db.koneksi_shard())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20_000)
+    parser.add_argument('--downtime', type=int, default=7, help='hari tanpa penjadwal sebelum catch-up')
+    parser.add_argument('--shards', type=int, default=1)
+    parser.add_argument('--batch', type=int, default=db.UKURAN_BATCH_BERULANG)
+    parser.add_argument('--ulang', type=int, default=20, help='pengulangan tick idle')
+    args = parser.parse_args()
+
+    cache.configure(None)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME, db.DB_SHARDS = os.path.join(tmp, 'bench_berulang.db'), args.shards
+        db.init_db()
+        user_ids = data_sintetis.isi(args.users, 0, password_hash='x')
+        aturan = list(buat_aturan(random.Random(0), user_ids))
+        isi_aturan(aturan)
+        print(f"{args.users} user, {len(aturan)} aturan, DB_SHARDS={args.shards}, batch {args.batch}")
+
+        idle = []
+        for _ in range(args.ulang):
+            mulai = time.perf_counter()
+            db.materialisasi_berulang(TERAKHIR.isoformat(), batch=args.batch)
+            idle.append(time.perf_counter() - mulai)
+        print(f"tick idle: {statistics.median(idle) * 1000:.3f} ms")
+
+        print(f"\n{'putaran':<10} {'transaksi':>10} {'harapan':>9} {'batch':>6} {'median ms':>10} "
+              f"{'maks ms':>9} {'total ms':>9} {'baris/s':>9}")
+        gagal = False
+        sebelum = TERAKHIR
+        satu_hari = 0
+        for nama, sampai in (('1 hari', TERAKHIR + timedelta(days=1)),
+                             ('catch-up', TERAKHIR + timedelta(days=1 + args.downtime)),
+                             ('ulang', TERAKHIR + timedelta(days=1 + args.downtime))):
+            harapan = sum(1 for a in aturan for _ in kejadian(a[1], a[2], sebelum, sampai))
+            mulai = time.perf_counter()
+            hasil = db.materialisasi_berulang(sampai.isoformat(), batch=args.batch)
+            total = time.perf_counter() - mulai
+            durasi = hasil['durasi_batch'] or [0.0]
+            gagal = gagal or hasil['transaksi'] != harapan
+            print(f"{nama:<10} {hasil['transaksi']:>10} {harapan:>9} {len(hasil['durasi_batch']):>6} "
+                  f"{statistics.median(durasi) * 1000:>10.2f} {max(durasi) * 1000:>9.2f} "
+                  f"{total * 1000:>9.1f} {hasil['transaksi'] / total:>9.0f}")
+            satu_hari = satu_hari or hasil['transaksi']
+            sebelum = sampai
+
+        n = jumlah_transaksi()
+        rng = random.Random(1)
+        mulai = time.perf_counter()
+        for _ in range(satu_hari):
+            db.tambah_transaksi(rng.choice(user_ids), TERAKHIR.isoformat(), 'Pengeluaran', 'Tagihan',
+                                250_000_000, 'bench')
+        total = time.perf_counter() - mulai
+        print(f"\ntambah_transaksi per baris, {satu_hari} transaksi: {total * 1000:.1f} ms, "
+              f"{satu_hari / total:.0f} baris/s")
+        gagal = gagal or jumlah_transaksi() != n + satu_hari
+        db.close_connection()
+    if gagal:
+        print("JUMLAH TRANSAKSI TIDAK SESUAI")
+    raise SystemExit(1 if gagal else 0)
+
+
+if __name__ == '__main__':
+    main()
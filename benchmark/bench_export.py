@@ -0,0 +1,69 @@
+"""Memory benchmark for the streaming /laporan/export path.
+
+Fills a scratch database with N transactions, then consumes the CSV
+generator the route returns and reports peak traced memory. Peak memory
+should stay flat as N grows.
+
+    python -m benchmark.bench_export            # 10k, 100k, 300k rows
+    python -m benchmark.bench_export 1000000    # custom sizes
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import database as db
+
+
+def isi_data(n, users=20):
+    conn = db.get_connection()
+    with conn:
+        conn.executemany('INSERT INTO users (username, password) VALUES (?, ?)',
+                         [(f'user{i}', 'x') for i in range(users)])
+        rng = random.Random(n)
+        batch = []
+        for i in range(n):
+            batch.append((rng.randint(1, users), f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                          rng.choice(('Pemasukan', 'Pengeluaran')), 'Makan', rng.randint(1, 500) * 100000,
+                          'catatan transaksi'))
+            if len(batch) == 10000:
+                conn.executemany('INSERT INTO transaksi (user_id, tanggal, tipe, kategori, jumlah, catatan) '
+                                 'VALUES (?, ?, ?, ?, ?, ?)', batch)
+                batch.clear()
+        conn.executemany('INSERT INTO transaksi (user_id, tanggal, tipe, kategori, jumlah, catatan) '
+                         'VALUES (?, ?, ?, ?, ?, ?)', batch)
+
+
+def ukur(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, 'bench_export.db')
+        # app checks the schema version at import time, so migrate first
+        db.init_db()
+        from app import stream_csv
+        isi_data(n)
+
+        tracemalloc.start()
+        mulai = time.perf_counter()
+        total_bytes = 0
+        for chunk in stream_csv(db.admin_laporan_iter('2025-01-01', '2025-12-31')):
+            total_bytes += len(chunk)
+        durasi = time.perf_counter() - mulai
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        db.close_connection()
+    return total_bytes, durasi, peak
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'csv MB':>10} {'seconds':>10} {'peak KiB':>10}")
+    for n in sizes:
+        total_bytes, durasi, peak = ukur(n)
+        print(f"{n:>10} {total_bytes / 1e6:>10.1f} {durasi:>10.2f} {peak / 1024:>10.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=[10_000, 100_000, 300_000])
+    main(parser.parse_args().sizes)
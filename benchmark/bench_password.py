@@ -0,0 +1,69 @@
+"""Throughput benchmark for password verification (the cost of one login).
+
+For each hashing parameter set, verifies a password for a few seconds on a
+single thread (logins/sec per core), then through the bounded hashing pool
+with one worker per CPU to show how the KDF scales across cores.
+
+    python -m benchmark.bench_password
+    python -m benchmark.bench_password scrypt:16384:8:1 pbkdf2:sha256:600000 --detik 5
+"""
+import argparse
+import os
+import time
+from concurrent.futures import wait
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import passwords
+
+METODE = (
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:600000',
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',   # default Werkzeug
+)
+
+PASSWORD = 'rahasia-benchmark'
+
+
+def per_core(pwhash, detik):
+    jumlah = 0
+    mulai = time.perf_counter()
+    while time.perf_counter() - mulai < detik:
+        assert check_password_hash(pwhash, PASSWORD)
+        jumlah += 1
+    return jumlah / (time.perf_counter() - mulai)
+
+
+def lewat_pool(hasher, pwhash, detik):
+    jumlah = 0
+    mulai = time.perf_counter()
+    while time.perf_counter() - mulai < detik:
+        futures = [hasher.verify_async(pwhash, PASSWORD) for _ in range(hasher.workers)]
+        wait(futures)
+        assert all(f.result() for f in futures)
+        jumlah += len(futures)
+    return jumlah / (time.perf_counter() - mulai)
+
+
+def main(daftar_metode, detik):
+    cpu = os.cpu_count() or 1
+    print(f"{cpu} CPU, {detik:g}s per pengukuran")
+    print(f"{'metode':<24} {'login/s/core':>13} {'login/s pool':>13} {'skala':>6}")
+    for metode in daftar_metode:
+        pwhash = generate_password_hash(PASSWORD, metode)
+        satu = per_core(pwhash, detik)
+        hasher = passwords.PasswordHasher(metode, workers=cpu)
+        try:
+            pool = lewat_pool(hasher, pwhash, detik)
+        finally:
+            hasher.shutdown()
+        print(f"{metode:<24} {satu:13.1f} {pool:13.1f} {pool / satu:5.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('metode', nargs='*', default=METODE)
+    parser.add_argument('--detik', type=float, default=2.0)
+    args = parser.parse_args()
+    main(args.metode, args.detik)
@@ -0,0 +1,109 @@
+"""Running balance on /transaksi pages: checkpoints vs a window function.
+
+Fills one user with --transaksi rows spread over --bulan months, then times
+the saldo column for pages at the start, middle and end of the history
+(keyset paging, newest first):
+
+    window      SUM(...) OVER (ORDER BY tanggal, id) over the user's history
+    checkpoint  database.saldo_berjalan (saldo_bulanan + the page's month)
+
+Both must agree on every row. Also times edit_transaksi on a row from the
+current month and from the first month, which shifts every later
+checkpoint, to show the write-side cost of the saldo_bulanan triggers.
+
+    python -m benchmark.bench_saldo
+    python -m benchmark.bench_saldo --transaksi 500000 --bulan 120
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import cache
+import database as db
+from benchmark import data_sintetis
+
+WINDOW_SQL = '''
+    SELECT id, saldo FROM (
+        SELECT id, tanggal, SUM(CASE tipe WHEN 'Pemasukan' THEN jumlah
+                                          WHEN 'Pengeluaran' THEN -jumlah ELSE 0 END)
+               OVER (ORDER BY tanggal, id) AS saldo
+        FROM transaksi WHERE user_id = ?
+    ) WHERE (tanggal, id) BETWEEN (?, ?) AND (?, ?)
+'''
+
+
+def saldo_window(user_id, rows):
+    """Saldo setiap baris dengan window function atas seluruh riwayat user."""
+    awal, akhir = min((r['tanggal'], r['id']) for r in rows), max((r['tanggal'], r['id']) for r in rows)
+    saldo = dict(db.get_connection(user_id).execute(WINDOW_SQL, (user_id, *awal, *akhir)).fetchall())
+    return [saldo[r['id']] for r in rows]
+
+
+def ukur(fungsi, ulang):
+    fungsi()
+    durasi = []
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        hasil = fungsi()
+        durasi.append(time.perf_counter() - mulai)
+    return statistics.median(durasi) * 1000, hasil
+
+
+def halaman_ke(user_id, posisi, per_page):
+    """Halaman yang dimulai di baris ke-`posisi` (0 = terbaru) riwayat user."""
+    row = db.get_connection(user_id).execute(
+        'SELECT tanggal, id FROM transaksi WHERE user_id = ? ORDER BY tanggal DESC, id DESC LIMIT 1 OFFSET ?',
+        (user_id, posisi)).fetchone()
+    cursor = db.encode_cursor(row) if posisi else None
+    return db.ambil_transaksi_halaman(user_id, per_page=per_page, after=cursor)['transaksi']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transaksi', type=int, default=200_000)
+    parser.add_argument('--bulan', type=int, default=60)
+    parser.add_argument('--per-page', type=int, default=db.DEFAULT_PER_PAGE)
+    parser.add_argument('--ulang', type=int, default=20)
+    args = parser.parse_args()
+
+    cache.configure(None)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, 'bench_saldo.db')
+        db.init_db()
+        user_id = data_sintetis.isi(1, args.transaksi, bulan=args.bulan, password_hash='x')[0]
+        print(f"1 user, {args.transaksi} transaksi, {args.bulan} bulan, {args.per_page} per halaman")
+
+        print(f"\n{'halaman':<12} {'window ms':>10} {'checkpoint ms':>14} {'x':>7}")
+        gagal = False
+        for nama, posisi in (('terbaru', 0), ('tengah', args.transaksi // 2),
+                             ('terlama', args.transaksi - args.per_page)):
+            rows = halaman_ke(user_id, posisi, args.per_page)
+            window_ms, hasil_window = ukur(lambda: saldo_window(user_id, rows), args.ulang)
+            checkpoint_ms, hasil = ukur(lambda: db.saldo_berjalan(user_id, rows), args.ulang)
+            sama = hasil == hasil_window
+            gagal = gagal or not sama
+            print(f"{nama:<12} {window_ms:10.2f} {checkpoint_ms:14.3f} {window_ms / checkpoint_ms:7.0f}"
+                  + ("" if sama else "  HASIL BERBEDA"))
+
+        conn = db.get_connection(user_id)
+        pertama, terakhir = (conn.execute(
+            f'SELECT * FROM transaksi WHERE user_id = ? ORDER BY tanggal {arah}, id LIMIT 1',
+            (user_id,)).fetchone() for arah in ('DESC', 'ASC'))
+        checkpoint = conn.execute('SELECT COUNT(*) FROM saldo_bulanan WHERE user_id = ?', (user_id,)).fetchone()[0]
+        print(f"\nedit_transaksi ({checkpoint} checkpoint bulanan)")
+        rng = random.Random(0)
+        for nama, t in (('bulan terbaru', pertama), ('bulan pertama', terakhir)):
+            ms, _ = ukur(lambda: db.edit_transaksi(t['id'], user_id, t['tanggal'], t['tipe'], t['kategori'],
+                                                  rng.randint(1, 10**8), t['catatan']), args.ulang)
+            print(f"  {nama:<14} {ms:.3f} ms")
+        selisih = db.verifikasi_ringkasan()
+        gagal = gagal or bool(selisih)
+        db.close_connection()
+    raise SystemExit(1 if gagal else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Write throughput vs DB_SHARDS.
+
+Starts --penulis writer processes that each insert single transactions
+(one commit per insert, like POST /transaksi) for random users, and reports
+total commits/sec for every shard count. With one file every writer queues
+on SQLite's single write lock; with N shards writers of different users
+commit in parallel.
+
+    python -m benchmark.bench_shard
+    python -m benchmark.bench_shard --shards 1 2 4 8 --penulis 8 --synchronous FULL
+
+Scaling shows best with several cores, or with --synchronous FULL where
+each commit waits for fsync while holding the lock.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+import database as db
+
+USERS = 200
+
+
+def penulis(path, shards, synchronous, detik, mulai, hasil):
+    db.DB_NAME = path
+    db.DB_SHARDS = shards
+    db.PRAGMAS = tuple((k, synchronous if k == 'synchronous' else v) for k, v in db.PRAGMAS)
+    rng = random.Random(os.getpid())
+    mulai.wait()
+    n = 0
+    batas = time.perf_counter() + detik
+    while time.perf_counter() < batas:
+        user_id = rng.randint(1, USERS)
+        db.tambah_transaksi(user_id, f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                            'Pengeluaran', 'Makan & Minum', rng.randint(1, 500) * 100000, '')
+        n += 1
+    hasil.put(n)
+
+
+def ukur(shards, jumlah_penulis, detik, synchronous):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench_shard.db')
+        db.DB_NAME, db.DB_SHARDS = path, shards
+        db.init_db()
+        conn = db.get_connection()
+        with conn:
+            conn.executemany('INSERT INTO users (username, password) VALUES (?, ?)',
+                             ((f'user{i}', 'x') for i in range(USERS)))
+        db.close_connection()
+
+        ctx = multiprocessing.get_context('fork')
+        mulai, hasil = ctx.Barrier(jumlah_penulis + 1), ctx.Queue()
+        proses = [ctx.Process(target=penulis, args=(path, shards, synchronous, detik, mulai, hasil))
+                  for _ in range(jumlah_penulis)]
+        for p in proses:
+            p.start()
+        mulai.wait()
+        total = sum(hasil.get() for _ in proses)
+        for p in proses:
+            p.join()
+    return total / detik
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--penulis', type=int, default=4, help='jumlah proses penulis')
+    parser.add_argument('--detik', type=float, default=5)
+    parser.add_argument('--synchronous', choices=('OFF', 'NORMAL', 'FULL'), default='NORMAL')
+    args = parser.parse_args()
+
+    print(f"{args.penulis} penulis, {args.detik:g}s, synchronous={args.synchronous}, {os.cpu_count()} CPU")
+    dasar = None
+    for shards in args.shards:
+        tps = ukur(shards, args.penulis, args.detik, args.synchronous)
+        dasar = dasar or tps
+        print(f"DB_SHARDS={shards:<3} {tps:9.0f} commit/s  x{tps / dasar:.2f}")
+
+
+if __name__ == '__main__':
+    main()
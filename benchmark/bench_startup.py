@@ -0,0 +1,107 @@
+"""Worker cold start: time to import app against a migrated database.
+
+Runs `import app` in fresh Python processes (one at a time, then --workers
+at once like gunicorn booting without --preload) and reports the median
+import time, the time spent in the schema step alone, and the wall time
+until every concurrent worker is ready. Each mode is measured separately:
+
+    cek      default boot, db.cek_schema() (PRAGMA user_version only)
+    migrasi  AUTO_MIGRATE=1, db.init_db() in every worker
+
+    python -m benchmark.bench_startup
+    python -m benchmark.bench_startup --workers 8 --shards 4 --transaksi 200000
+
+--repo runs the children against another checkout (e.g. a git worktree of
+an older commit) with the same database, to compare boot cost across commits.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import database as db
+from benchmark import data_sintetis
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dijalankan di proses baru: mengukur import app dan langkah skemanya saja
+ANAK = '''
+import sys, time
+mulai = time.perf_counter()
+import database as db
+db.DB_NAME = sys.argv[1]
+skema = [0.0]
+for nama in ('init_db', 'cek_schema'):
+    if not hasattr(db, nama):
+        continue
+    def bungkus(fungsi):
+        def ukur():
+            t = time.perf_counter()
+            fungsi()
+            skema[0] += time.perf_counter() - t
+        return ukur
+    setattr(db, nama, bungkus(getattr(db, nama)))
+import app
+print(time.perf_counter() - mulai, skema[0])
+'''
+
+MODE = {
+    'cek': {},
+    'migrasi': {'AUTO_MIGRATE': '1'},
+}
+
+
+def jalankan_anak(repo, path, env):
+    return subprocess.Popen([sys.executable, '-c', ANAK, path], cwd=repo, env=env,
+                            stdout=subprocess.PIPE, text=True)
+
+
+def ukur(repo, path, mode, ulang, workers, shards):
+    env = dict(os.environ, DB_SHARDS=str(shards))
+    env.pop('AUTO_MIGRATE', None)
+    env.update(MODE[mode])
+    hasil = []
+    for _ in range(ulang):
+        keluaran, _ = jalankan_anak(repo, path, env).communicate()
+        hasil.append(tuple(map(float, keluaran.split())))
+
+    t0 = time.perf_counter()
+    proses = [jalankan_anak(repo, path, env) for _ in range(workers)]
+    for p in proses:
+        p.communicate()
+    serentak = time.perf_counter() - t0
+    return (statistics.median(h[0] for h in hasil) * 1000,
+            statistics.median(h[1] for h in hasil) * 1000,
+            serentak * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transaksi', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--shards', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=4, help='proses yang boot bersamaan')
+    parser.add_argument('--ulang', type=int, default=10)
+    parser.add_argument('--repo', default=ROOT, help='checkout yang app-nya diimport (default: repo ini)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench_startup.db')
+        db.DB_NAME, db.DB_SHARDS = path, args.shards
+        db.init_db()
+        data_sintetis.isi(args.users, args.transaksi, password_hash='x')
+        db.close_connection()
+
+        print(f"{args.transaksi} transaksi, DB_SHARDS={args.shards}, {args.workers} worker serentak, "
+              f"{os.cpu_count()} CPU")
+        print(f"{'mode':<9} {'import app ms':>14} {'skema ms':>10} {'semua worker siap ms':>21}")
+        for mode in MODE:
+            impor, skema, serentak = ukur(args.repo, path, mode, args.ulang, args.workers, args.shards)
+            print(f"{mode:<9} {impor:14.1f} {skema:10.2f} {serentak:21.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,426 @@
+"""Timing suite: every database.py function and every route, at several data sizes.
+
+For each size a scratch database is filled by benchmark.data_sintetis, then
+each case is run --ulang times (after one warm-up call) and min/median/p95
+are reported. Routes go through Flask's test client, logged in as a user or
+as the admin. The application cache is off by default so cached functions
+measure the query itself.
+
+    python -m benchmark.bench_suite
+    python -m benchmark.bench_suite --ukuran 10000 100000 --output hasil.json
+    python -m benchmark.bench_suite --bandingkan hasil-main.json   # exit 1 on regression
+
+Results are written as JSON (--output) with the git commit, Python and
+SQLite versions, so runs from different commits can be compared.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fungsi database.py yang bukan operasi data (koneksi, skema, util cursor)
+TIDAK_DIUKUR = {'get_connection', 'close_connection', 'connection_stats', 'init_db',
+                'upgrade_schema', 'encode_cursor', 'decode_cursor', 'init_shard', 'koneksi_shard',
+                'path_shard', 'shard_untuk', 'ekspresi_cari', 'cek_schema', 'versi_schema',
+                'kejadian_berikutnya'}
+TAHUN = ('2025-01-01', '2025-12-31')
+BULAN = ('2025-06-01', '2025-06-30')
+BARIS_CONTOH = ('2025-06-15', 'Pengeluaran', 'Makan & Minum', 2_500_000, 'bench')
+# Aturan berulang yang mulai hari ini: satu transaksi langsung dibuat
+ATURAN_CONTOH = ('mingguan', date.today().isoformat(), 'Pengeluaran', 'Tagihan', 10_000_000, 'bench')
+
+
+def siapkan_env(args):
+    # Harus di-set sebelum app diimport (app membaca konfigurasi saat import)
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    os.environ['CACHE_BACKEND'] = args.cache
+    os.environ['DB_SHARDS'] = str(args.shards)
+    if not args.hash_asli:
+        os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+
+
+class Konteks:
+    """Id dan data contoh di database sintetis yang dipakai oleh kasus uji."""
+
+    def __init__(self, db, user_ids):
+        # User paling aktif: kasus terburuk untuk query per user
+        terbanyak = max(db.admin_get_all_users_detail(), key=lambda u: u['total_transaksi'])
+        self.user_id = terbanyak['id']
+        user = db.get_user_by_id(self.user_id)
+        self.username, self.password_hash = user['username'], user['password']
+        self.transaksi = db.get_connection(self.user_id).execute(
+            'SELECT * FROM transaksi WHERE user_id = ? ORDER BY id LIMIT 1', (self.user_id,)).fetchone()
+        self.user_ids = user_ids
+        self._urut = itertools.count()
+        # Anggaran untuk setiap kategori pengeluaran user; separuhnya terlampaui
+        per_kategori = db.hitung_agregasi(self.user_id, bulan=6, tahun=2025)['per_kategori']
+        for i, row in enumerate(r for r in per_kategori if r['tipe'] == 'Pengeluaran'):
+            db.simpan_anggaran(self.user_id, row['kategori'], row['total'] // (1 + i % 2) or 1)
+
+    def nama_baru(self):
+        return f'bench{os.getpid()}_{next(self._urut)}'
+
+
+def kasus_db(db, ctx):
+    """(nama fungsi, pembuat pemanggilan). Pembuat dipanggil di luar
+    pengukuran dan mengembalikan callable tanpa argumen yang diukur."""
+    uid, t = ctx.user_id, ctx.transaksi
+
+    def tetap(fungsi, *args, **kwargs):
+        return lambda: lambda: fungsi(*args, **kwargs)
+
+    def hapus_transaksi():
+        db.tambah_transaksi(uid, *BARIS_CONTOH)
+        id_baru = db.get_connection(uid).execute('SELECT MAX(id) FROM transaksi').fetchone()[0]
+        return lambda: db.hapus_transaksi(id_baru, uid)
+
+    def hapus_transaksi_banyak():
+        ids = [db.tambah_transaksi_id(uid, *BARIS_CONTOH) for _ in range(100)]
+        return lambda: db.hapus_transaksi_banyak(ids, uid)
+
+    def hapus_user():
+        db.tambah_user(ctx.nama_baru(), 'x')
+        id_baru = db.get_connection().execute('SELECT MAX(id) FROM users').fetchone()[0]
+        db.tambah_transaksi_bulk(id_baru, [BARIS_CONTOH] * 20)
+        return lambda: db.hapus_user(id_baru)
+
+    def hapus_transaksi_berulang():
+        id_aturan = db.tambah_transaksi_berulang(uid, *ATURAN_CONTOH)
+        return lambda: db.hapus_transaksi_berulang(id_aturan, uid)
+
+    return [
+        ('tambah_transaksi', tetap(db.tambah_transaksi, uid, *BARIS_CONTOH)),
+        ('tambah_transaksi_id', tetap(db.tambah_transaksi_id, uid, *BARIS_CONTOH)),
+        ('tambah_transaksi_bulk', tetap(db.tambah_transaksi_bulk, uid, [BARIS_CONTOH] * 100)),
+        ('tambah_user', lambda: (lambda nama: lambda: db.tambah_user(nama, 'x'))(ctx.nama_baru())),
+        ('cek_user', tetap(db.cek_user, ctx.username)),
+        ('update_password', tetap(db.update_password, uid, ctx.password_hash)),
+        ('hapus_user', hapus_user),
+        ('update_user', tetap(db.update_user, uid, ctx.username)),
+        ('get_user_by_id', tetap(db.get_user_by_id, uid)),
+        ('get_identitas_user', tetap(db.get_identitas_user, uid)),
+        ('ambil_semua_transaksi', tetap(db.ambil_semua_transaksi, uid, *BULAN)),
+        ('ambil_transaksi_halaman', tetap(db.ambil_transaksi_halaman, uid, *TAHUN)),
+        ('ambil_transaksi_limit', tetap(db.ambil_transaksi_limit, uid, 5)),
+        ('saldo_berjalan', lambda: (lambda rows: lambda: db.saldo_berjalan(uid, rows))(
+            db.ambil_transaksi_halaman(uid, *TAHUN)['transaksi'])),
+        ('hapus_transaksi', hapus_transaksi),
+        ('hapus_transaksi_banyak', hapus_transaksi_banyak),
+        ('ambil_satu_transaksi', tetap(db.ambil_satu_transaksi, t['id'], uid)),
+        ('edit_transaksi', tetap(db.edit_transaksi, t['id'], uid, t['tanggal'], t['tipe'],
+                                 t['kategori'], t['jumlah'], t['catatan'])),
+        ('get_available_months', tetap(db.get_available_months, uid)),
+        ('hitung_agregasi', tetap(db.hitung_agregasi, uid, *TAHUN)),
+        ('hitung_agregasi[semua]', tetap(db.hitung_agregasi, None, *BULAN)),
+        ('hitung_agregasi[cari]', tetap(db.hitung_agregasi, uid, cari='makan')),
+        ('cari_transaksi', tetap(db.cari_transaksi, 'makan', uid)),
+        ('cari_transaksi[semua]', tetap(db.cari_transaksi, 'bensin', None, *TAHUN)),
+        ('hitung_ringkasan', tetap(db.hitung_ringkasan, uid, 6, 2025)),
+        ('simpan_anggaran', tetap(db.simpan_anggaran, uid, 'bench', 1_000_000)),
+        ('hapus_anggaran', lambda: (db.simpan_anggaran(uid, 'bench', 1_000_000),
+                                    lambda: db.hapus_anggaran(uid, 'bench'))[1]),
+        ('status_anggaran', tetap(db.status_anggaran, uid, 6, 2025)),
+        ('ambil_peringatan_anggaran', tetap(db.ambil_peringatan_anggaran, uid, 6, 2025)),
+        ('tambah_transaksi_berulang', tetap(db.tambah_transaksi_berulang, uid, *ATURAN_CONTOH)),
+        ('ambil_transaksi_berulang', tetap(db.ambil_transaksi_berulang, uid)),
+        ('hapus_transaksi_berulang', hapus_transaksi_berulang),
+        # Putaran penjadwal tanpa aturan jatuh tempo (kasus paling sering)
+        ('materialisasi_berulang', tetap(db.materialisasi_berulang)),
+        ('admin_hitung_ringkasan', tetap(db.admin_hitung_ringkasan)),
+        ('admin_ambil_transaksi_limit', tetap(db.admin_ambil_transaksi_limit, 10)),
+        ('admin_get_stats_per_user', tetap(db.admin_get_stats_per_user)),
+        ('admin_top_user', tetap(db.admin_top_user, 10)),
+        ('ambil_deret_waktu[harian]', tetap(db.ambil_deret_waktu, uid, 'harian', *BULAN)),
+        ('ambil_deret_waktu[mingguan]', tetap(db.ambil_deret_waktu, uid, 'mingguan', *TAHUN)),
+        ('ambil_deret_waktu[bulanan]', tetap(db.ambil_deret_waktu, uid, 'bulanan', *TAHUN)),
+        ('admin_get_all_users', tetap(db.admin_get_all_users)),
+        ('admin_get_all_users_detail', tetap(db.admin_get_all_users_detail)),
+        ('rebuild_ringkasan', tetap(db.rebuild_ringkasan)),
+        ('verifikasi_ringkasan', tetap(db.verifikasi_ringkasan)),
+        ('rebuild_index_cari', tetap(db.rebuild_index_cari)),
+        ('admin_laporan', tetap(db.admin_laporan, *BULAN)),
+        ('admin_laporan_halaman', tetap(db.admin_laporan_halaman, *TAHUN)),
+        ('admin_laporan_iter', tetap(lambda: sum(1 for _ in db.admin_laporan_iter(*BULAN)))),
+    ]
+
+
+def login(app, username, password):
+    client = app.test_client()
+    resp = client.post('/login', data={'username': username, 'password': password})
+    if resp.status_code != 302:
+        raise RuntimeError(f'login {username} gagal')
+    return client
+
+
+def kasus_route(app, db, ctx, password):
+    """(nama, endpoint, pembuat pemanggilan) untuk setiap route."""
+    user = login(app, ctx.username, password)
+    admin = login(app, 'admin', password)
+    anonim = app.test_client()
+    uid, t = ctx.user_id, ctx.transaksi
+    tahun = f'start_date={TAHUN[0]}&end_date={TAHUN[1]}'
+    bulan = f'start_date={BULAN[0]}&end_date={BULAN[1]}'
+    form_transaksi = dict(zip(('tanggal', 'tipe', 'kategori'), BARIS_CONTOH[:3]), jumlah='25000', catatan='bench')
+    baris_import = [dict(zip(('tanggal', 'tipe', 'kategori', 'jumlah', 'catatan'), BARIS_CONTOH[:3] + ('25000', '')))] * 100
+
+    def get(client, url):
+        return lambda: lambda: client.get(url)
+
+    def post(client, url, **kwargs):
+        return lambda: lambda: client.post(url, **kwargs)
+
+    def hapus():
+        db.tambah_transaksi(uid, *BARIS_CONTOH)
+        id_baru = db.get_connection(uid).execute('SELECT MAX(id) FROM transaksi').fetchone()[0]
+        return lambda: user.get(f'/hapus/{id_baru}')
+
+    def hapus_user():
+        db.tambah_user(ctx.nama_baru(), 'x')
+        id_baru = db.get_connection().execute('SELECT MAX(id) FROM users').fetchone()[0]
+        return lambda: admin.get(f'/hapus-user/{id_baru}')
+
+    def api_hapus():
+        ids = [db.tambah_transaksi_id(uid, *BARIS_CONTOH) for _ in range(100)]
+        return lambda: user.post('/api/v1/transaksi/hapus', json={'id': ids})
+
+    def hapus_berulang():
+        id_aturan = db.tambah_transaksi_berulang(uid, *ATURAN_CONTOH)
+        return lambda: user.post(f'/hapus-berulang/{id_aturan}')
+
+    # Client baru setiap kali: client yang sudah login hanya di-redirect
+    def login_baru():
+        client = app.test_client()
+        return lambda: client.post('/login', data={'username': ctx.username, 'password': password})
+
+    def register():
+        client, data = app.test_client(), {'username': ctx.nama_baru(), 'password': password}
+        return lambda: client.post('/register', data=data)
+
+    def logout():
+        client = login(app, ctx.username, password)
+        return lambda: client.get('/logout')
+
+    return [
+        ('GET / (user)', 'dashboard', get(user, '/')),
+        ('GET / (admin)', 'dashboard', get(admin, '/')),
+        ('GET /transaksi', 'transaksi', get(user, '/transaksi')),
+        ('GET /transaksi?tahun', 'transaksi', get(user, f'/transaksi?{tahun}')),
+        ('GET /transaksi?tahun&tipe', 'transaksi', get(user, f'/transaksi?{tahun}&tipe=Pengeluaran')),
+        ('GET /transaksi?q', 'transaksi', get(user, '/transaksi?q=makan')),
+        ('POST /transaksi tambah', 'transaksi', post(user, '/transaksi', data=dict(form_transaksi, aksi='tambah'))),
+        ('POST /transaksi edit', 'transaksi', post(user, '/transaksi', data=dict(
+            form_transaksi, aksi='edit', id_transaksi=t['id']))),
+        ('POST /transaksi tambah berulang', 'transaksi', post(user, '/transaksi', data=dict(
+            form_transaksi, aksi='tambah', tanggal=ATURAN_CONTOH[1], ulangi='mingguan'))),
+        ('POST /hapus-berulang', 'hapus_berulang', hapus_berulang),
+        ('POST /transaksi/import', 'import_transaksi', post(user, '/transaksi/import', json=baris_import)),
+        ('POST /anggaran', 'anggaran', post(user, '/anggaran', data={'kategori': 'bench', 'batas': '50000'})),
+        ('GET /api/anggaran', 'api_anggaran', get(user, '/api/anggaran?bulan=6&tahun=2025')),
+        ('GET /get_transaksi', 'get_transaksi', get(user, f'/get_transaksi/{t["id"]}')),
+        ('GET /hapus', 'hapus', hapus),
+        ('GET /api/v1/transaksi', 'api_v1_transaksi', get(user, f'/api/v1/transaksi?{tahun}&per_page=200')),
+        ('GET /api/v1/transaksi?q', 'api_v1_transaksi', get(user, '/api/v1/transaksi?q=makan')),
+        ('POST /api/v1/transaksi', 'api_v1_transaksi', post(user, '/api/v1/transaksi', json=dict(
+            zip(('tanggal', 'tipe', 'kategori', 'jumlah', 'catatan'), BARIS_CONTOH)))),
+        ('GET /api/v1/transaksi/<id>', 'api_v1_satu_transaksi', get(user, f'/api/v1/transaksi/{t["id"]}')),
+        ('POST /api/v1/transaksi/hapus (100)', 'api_v1_hapus_transaksi', api_hapus),
+        ('GET /laporan?bulan', 'laporan', get(admin, f'/laporan?{bulan}')),
+        ('GET /laporan?tahun', 'laporan', get(admin, f'/laporan?{tahun}')),
+        ('GET /laporan?q', 'laporan', get(admin, f'/laporan?{tahun}&q=bensin')),
+        ('GET /laporan/export?bulan', 'export_laporan',
+         lambda: lambda: admin.get(f'/laporan/export?{bulan}').get_data()),
+        ('GET /api/grafik/deret harian', 'api_grafik_deret',
+         get(user, f'/api/grafik/deret?granularitas=harian&{bulan}')),
+        ('GET /api/grafik/deret mingguan', 'api_grafik_deret',
+         get(user, f'/api/grafik/deret?granularitas=mingguan&{tahun}')),
+        ('GET /api/grafik/deret bulanan (admin)', 'api_grafik_deret',
+         get(admin, f'/api/grafik/deret?granularitas=bulanan&{tahun}&user_id={uid}')),
+        ('GET /api/grafik/ringkasan (user)', 'api_grafik_ringkasan', get(user, '/api/grafik/ringkasan')),
+        ('GET /api/grafik/ringkasan (admin)', 'api_grafik_ringkasan', get(admin, '/api/grafik/ringkasan')),
+        ('GET /api/grafik/top-user', 'api_grafik_top_user', get(admin, '/api/grafik/top-user?n=10')),
+        ('GET /api/stats', 'api_stats', get(admin, '/api/stats')),
+        ('GET /kelola-user', 'kelola_user', get(admin, '/kelola-user')),
+        ('POST /api/edit-user', 'api_edit_user', post(admin, '/api/edit-user', json={
+            'user_id': uid, 'username': ctx.username})),
+        ('GET /hapus-user', 'hapus_user', hapus_user),
+        ('GET /login', 'login', get(anonim, '/login')),
+        ('POST /login', 'login', login_baru),
+        ('GET /register', 'register', get(anonim, '/register')),
+        ('POST /register', 'register', register),
+        ('GET /logout', 'logout', logout),
+    ]
+
+
+def ukur(pembuat, ulang):
+    """Durasi (detik) `ulang` pemanggilan, setelah satu kali pemanasan."""
+    def satu():
+        fungsi = pembuat()
+        mulai = time.perf_counter()
+        hasil = fungsi()
+        durasi = time.perf_counter() - mulai
+        status = getattr(hasil, 'status_code', 200)
+        if status >= 400:
+            raise RuntimeError(f'status {status}')
+        return durasi
+
+    satu()
+    return [satu() for _ in range(ulang)]
+
+
+def ringkas(durasi):
+    ms = sorted(d * 1000 for d in durasi)
+    return {
+        'n': len(ms),
+        'min_ms': round(ms[0], 4),
+        'median_ms': round(statistics.median(ms), 4),
+        'p95_ms': round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 4),
+    }
+
+
+def jalankan_ukuran(n, args, hasil):
+    import database as db
+
+    users = args.users or max(10, n // 2000)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, 'keuangan.db')
+        # app memeriksa versi skema saat diimport, jadi migrasi dulu
+        db.init_db()
+        import app as app_module
+        import passwords
+        from benchmark import data_sintetis
+
+        mulai = time.perf_counter()
+        user_ids = data_sintetis.isi(users, n, args.seed,
+                                     password_hash=passwords.hash_password(data_sintetis.PASSWORD))
+        print(f"\n== {n} transaksi, {users} user (generate {time.perf_counter() - mulai:.1f}s)")
+        ctx = Konteks(db, user_ids)
+
+        jenis_kasus = []
+        if 'db' in args.jenis:
+            jenis_kasus.append(('db', [(nama, nama.split('[')[0], p) for nama, p in kasus_db(db, ctx)]))
+        if 'route' in args.jenis:
+            jenis_kasus.append(('route', kasus_route(app_module.app, db, ctx, data_sintetis.PASSWORD)))
+
+        for jenis, daftar in jenis_kasus:
+            for nama, _, pembuat in daftar:
+                if args.filter and args.filter not in nama:
+                    continue
+                r = ringkas(ukur(pembuat, args.ulang))
+                hasil.append({'ukuran': n, 'jenis': jenis, 'nama': nama, **r})
+                print(f"{jenis:<5} {nama:<40} {r['median_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['min_ms']:>10.3f}")
+        cakupan(db, app_module.app, jenis_kasus)
+        db.close_connection()
+
+
+def cakupan(db, app, jenis_kasus):
+    """Memberi tahu fungsi/route baru yang belum punya kasus di suite ini."""
+    diukur = {jenis: {endpoint for _, endpoint, _ in daftar} for jenis, daftar in jenis_kasus}
+    if 'db' in diukur:
+        publik = {nama for nama, f in vars(db).items()
+                  if callable(f) and not nama.startswith('_') and getattr(f, '__module__', None) == db.__name__}
+        kurang = sorted(publik - diukur['db'] - TIDAK_DIUKUR)
+        if kurang:
+            print(f"   belum diukur (database.py): {', '.join(kurang)}")
+    if 'route' in diukur:
+        endpoints = {rule.endpoint for rule in app.url_map.iter_rules()} - {'static'}
+        kurang = sorted(endpoints - diukur['route'])
+        if kurang:
+            print(f"   belum diukur (route): {', '.join(kurang)}")
+
+
+def meta(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        kotor = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, kotor = None, None
+    return {
+        'commit': commit,
+        'perubahan_lokal': kotor,
+        'waktu': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpu': os.cpu_count(),
+        'cache': args.cache,
+        'shards': args.shards,
+        'ulang': args.ulang,
+        'seed': args.seed,
+    }
+
+
+def bandingkan(lama, hasil, ambang, minimum_ms):
+    """Mencetak kasus yang median-nya naik lebih dari `ambang` (relatif) dan
+    `minimum_ms` (absolut). Mengembalikan jumlah regresi."""
+    sebelum = {(r['ukuran'], r['jenis'], r['nama']): r for r in lama['hasil']}
+    regresi = 0
+    print(f"\nDibandingkan dengan {lama['meta'].get('commit')} ({lama['meta'].get('waktu')}):")
+    for r in hasil:
+        s = sebelum.get((r['ukuran'], r['jenis'], r['nama']))
+        if s is None:
+            continue
+        rasio = r['median_ms'] / s['median_ms'] if s['median_ms'] else float('inf')
+        selisih = r['median_ms'] - s['median_ms']
+        if abs(rasio - 1) > ambang and abs(selisih) > minimum_ms:
+            tanda = 'LEBIH LAMBAT' if selisih > 0 else 'lebih cepat'
+            regresi += selisih > 0
+            print(f"  {r['ukuran']:>8} {r['jenis']:<5} {r['nama']:<40} "
+                  f"{s['median_ms']:>9.3f} -> {r['median_ms']:>9.3f} ms  x{rasio:.2f} {tanda}")
+    if not regresi:
+        print('  tidak ada regresi')
+    return regresi
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ukuran', type=int, nargs='+', default=[10_000, 100_000],
+                        help='total transaksi per putaran')
+    parser.add_argument('--users', type=int, help='jumlah user (default: ukuran / 2000, minimal 10)')
+    parser.add_argument('--ulang', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jenis', nargs='+', choices=('db', 'route'), default=('db', 'route'))
+    parser.add_argument('--filter', help='hanya kasus yang namanya memuat teks ini')
+    parser.add_argument('--cache', choices=('none', 'memory', 'sqlite'), default='none')
+    parser.add_argument('--shards', type=int, default=1, help='DB_SHARDS untuk database sementara')
+    parser.add_argument('--hash-asli', action='store_true',
+                        help='pakai PASSWORD_HASH_METHOD default (login/register jadi lambat)')
+    parser.add_argument('--output', help='tulis hasil JSON ke file ini')
+    parser.add_argument('--bandingkan', help='hasil JSON sebelumnya; exit 1 jika ada regresi')
+    parser.add_argument('--ambang', type=float, default=0.25, help='kenaikan median relatif (default 0.25)')
+    parser.add_argument('--minimum-ms', type=float, default=0.05, help='kenaikan median absolut minimum')
+    args = parser.parse_args()
+
+    siapkan_env(args)
+    sys.path.insert(0, REPO)
+
+    hasil = []
+    print(f"{'jenis':<5} {'kasus':<40} {'median ms':>10} {'p95 ms':>10} {'min ms':>10}")
+    for n in args.ukuran:
+        jalankan_ukuran(n, args, hasil)
+
+    data = {'meta': meta(args), 'hasil': hasil}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(data, f, indent=1)
+        print(f"\nhasil: {args.output}")
+    if args.bandingkan:
+        with open(args.bandingkan) as f:
+            lama = json.load(f)
+        if bandingkan(lama, hasil, args.ambang, args.minimum_ms):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
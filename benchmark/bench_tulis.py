@@ -0,0 +1,118 @@
+"""Write throughput and durability with and without the write queue.
+
+Starts --thread request-like threads that each insert --per-thread
+transactions (catatan 'bench <thread>-<i>') for random users and wait for
+each write to be committed, first with direct commits and then with
+antrian_tulis group commits. Afterwards every expected row is checked in
+the database, so a lost or duplicated write fails the run (exit code 1).
+
+    python -m benchmark.bench_tulis
+    python -m benchmark.bench_tulis --thread 32 --per-thread 500 --synchronous FULL
+
+With direct commits every thread takes SQLite's write lock and syncs on its
+own; errors such as "database is locked" are counted, not retried.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import antrian_tulis
+import database as db
+
+USERS = 200
+
+
+def siapkan(path, synchronous):
+    db.DB_NAME = path
+    db.PRAGMAS = tuple((k, synchronous if k == 'synchronous' else v) for k, v in db.PRAGMAS)
+    db.init_db()
+    conn = db.get_connection()
+    with conn:
+        conn.executemany('INSERT INTO users (username, password) VALUES (?, ?)',
+                         ((f'user{i}', 'x') for i in range(USERS)))
+
+
+def ukur(mode, jumlah_thread, per_thread):
+    """Mengembalikan (tulis/detik, jumlah error, set catatan yang sukses)."""
+    sukses, error = set(), []
+    lock = threading.Lock()
+    mulai = threading.Barrier(jumlah_thread + 1)
+
+    def kerja(nomor):
+        rng = random.Random(nomor)
+        mulai.wait()
+        for i in range(per_thread):
+            catatan = f'bench {mode} {nomor}-{i}'
+            try:
+                db.tambah_transaksi(rng.randint(1, USERS), '2025-06-15', 'Pengeluaran',
+                                    'Makan & Minum', 2_500_000, catatan)
+            except Exception as e:
+                with lock:
+                    error.append(str(e))
+            else:
+                with lock:
+                    sukses.add(catatan)
+        db.close_connection()
+
+    thread = [threading.Thread(target=kerja, args=(n,)) for n in range(jumlah_thread)]
+    for t in thread:
+        t.start()
+    mulai.wait()
+    t0 = time.perf_counter()
+    for t in thread:
+        t.join()
+    detik = time.perf_counter() - t0
+    return len(sukses) / detik, error, sukses
+
+
+def cek_tersimpan(mode, sukses):
+    """Catatan yang sukses tetapi tidak ada di database, atau tersimpan dobel."""
+    rows = db.get_connection().execute(
+        "SELECT catatan, COUNT(*) FROM transaksi WHERE catatan LIKE ? GROUP BY catatan",
+        (f'bench {mode} %',)).fetchall()
+    tersimpan = {catatan: n for catatan, n in rows}
+    hilang = sukses - tersimpan.keys()
+    dobel = [c for c, n in tersimpan.items() if n > 1]
+    return hilang, dobel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--thread', type=int, default=16)
+    parser.add_argument('--per-thread', type=int, default=300)
+    parser.add_argument('--synchronous', choices=('OFF', 'NORMAL', 'FULL'), default='NORMAL')
+    parser.add_argument('--batch', type=int, default=antrian_tulis.DEFAULT_MAX_BATCH)
+    parser.add_argument('--tunda-ms', type=float, default=antrian_tulis.DEFAULT_MAX_TUNDA_MS)
+    args = parser.parse_args()
+
+    print(f"{args.thread} thread x {args.per_thread} tulis, synchronous={args.synchronous}, "
+          f"{os.cpu_count()} CPU")
+    gagal = False
+    dasar = None
+    with tempfile.TemporaryDirectory() as tmp:
+        siapkan(os.path.join(tmp, 'bench_tulis.db'), args.synchronous)
+        for mode in ('langsung', 'antrian'):
+            antrian_tulis.configure(mode == 'antrian', args.batch, args.tunda_ms)
+            tps, error, sukses = ukur(mode, args.thread, args.per_thread)
+            antrian_tulis.configure(False)
+            hilang, dobel = cek_tersimpan(mode, sukses)
+            dasar = dasar or tps
+            print(f"{mode:<9} {tps:9.0f} tulis/s  x{tps / dasar:.2f}  error={len(error)}  "
+                  f"hilang={len(hilang)}  dobel={len(dobel)}")
+            if mode == 'antrian':
+                stats = antrian_tulis.stats()
+                print(f"          {stats['commit']} commit, rata-rata {stats['perintah'] / max(1, stats['commit']):.1f} "
+                      f"perintah per commit")
+            for pesan in sorted(set(error))[:3]:
+                print(f"          {pesan}")
+            gagal = gagal or bool(hilang or dobel)
+        db.close_connection()
+    sys.exit(1 if gagal else 0)
+
+
+if __name__ == '__main__':
+    main()
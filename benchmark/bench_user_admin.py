@@ -0,0 +1,73 @@
+"""Latency benchmark for the admin user-management routes.
+
+Registers N users (default 100k) in a scratch database, logs in as admin
+through Flask's test client and times /api/edit-user and /hapus-user/<id>.
+
+    python -m benchmark.bench_user_admin
+    python -m benchmark.bench_user_admin 500000 --requests 500
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from werkzeug.security import generate_password_hash
+
+import database as db
+
+
+def persentil(nilai, p):
+    nilai = sorted(nilai)
+    return nilai[min(len(nilai) - 1, int(len(nilai) * p))]
+
+
+def laporan(nama, durasi):
+    ms = [d * 1000 for d in durasi]
+    print(f"{nama:<16} n={len(ms):<5} mean={statistics.mean(ms):7.3f}ms "
+          f"p50={persentil(ms, 0.50):7.3f}ms p99={persentil(ms, 0.99):7.3f}ms")
+
+
+def main(jumlah_user, jumlah_request):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, 'bench_user_admin.db')
+        # app checks the schema version at import time, so migrate first
+        db.init_db()
+        from app import app
+
+        db.tambah_user('admin', generate_password_hash('admin123'), role='admin')
+        conn = db.get_connection()
+        with conn:
+            conn.executemany('INSERT INTO users (username, password) VALUES (?, ?)',
+                             ((f'user{i}', 'x') for i in range(jumlah_user)))
+        ids = [row[0] for row in conn.execute(
+            "SELECT id FROM users WHERE role != 'admin' ORDER BY id LIMIT ?", (jumlah_request,))]
+
+        client = app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+        durasi = []
+        for user_id in ids:
+            mulai = time.perf_counter()
+            resp = client.post('/api/edit-user', json={'user_id': user_id, 'username': f'renamed{user_id}'})
+            durasi.append(time.perf_counter() - mulai)
+            assert resp.get_json()['success'], resp.get_json()
+        laporan('/api/edit-user', durasi)
+
+        durasi = []
+        for user_id in ids:
+            mulai = time.perf_counter()
+            resp = client.get(f'/hapus-user/{user_id}')
+            durasi.append(time.perf_counter() - mulai)
+            assert resp.status_code == 302
+        laporan('/hapus-user', durasi)
+        db.close_connection()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('users', nargs='?', type=int, default=100_000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    print(f"{args.users} registered users")
+    main(args.users, args.requests)
@@ -0,0 +1,139 @@
+"""Synthetic data generator for keuangan.db.
+
+Creates N users plus one admin and fills their transactions with the
+tipe/kategori mix and amount ranges of a typical household ledger, using
+the category lists from templates/tambah.html. Output is deterministic for
+a given --seed, so benchmark runs on different commits see the same data.
+
+    python -m benchmark.data_sintetis --db keuangan.db --users 100 --transaksi 200000
+"""
+import argparse
+import math
+import random
+import sys
+from datetime import date, timedelta
+
+import database as db
+
+PASSWORD = 'rahasia123'
+AKHIR = date(2025, 12, 31)
+
+# Sama dengan kategoriPengeluaran/kategoriPemasukan di templates/tambah.html:
+# (kategori, bobot, nominal minimum, nominal maksimum dalam rupiah)
+KATEGORI_PENGELUARAN = (
+    ('Makan & Minum', 35, 15_000, 150_000),
+    ('Transportasi', 20, 10_000, 100_000),
+    ('Belanja', 15, 50_000, 1_500_000),
+    ('Tagihan', 10, 100_000, 2_000_000),
+    ('Hiburan', 8, 25_000, 500_000),
+    ('Kesehatan', 5, 50_000, 1_000_000),
+    ('Pendidikan', 3, 100_000, 5_000_000),
+    ('Lainnya', 4, 10_000, 500_000),
+)
+KATEGORI_PEMASUKAN = (
+    ('Gaji', 50, 4_000_000, 20_000_000),
+    ('Bonus', 10, 1_000_000, 10_000_000),
+    ('Hadiah', 8, 50_000, 1_000_000),
+    ('Penjualan', 15, 100_000, 5_000_000),
+    ('Investasi', 10, 100_000, 3_000_000),
+    ('Lainnya', 7, 50_000, 1_000_000),
+)
+# Porsi baris pemasukan; sisanya pengeluaran
+PORSI_PEMASUKAN = 0.2
+PORSI_CATATAN = 0.3
+CATATAN = ('', 'makan siang kantor', 'bensin motor', 'listrik bulan ini', 'belanja bulanan',
+           'nonton bioskop', 'transfer dari klien', 'cashback', 'obat flu', 'SPP')
+
+BATCH = 10_000
+
+
+def _pilih_kategori(daftar):
+    return [k for k, *_ in daftar], [b for _, b, *_ in daftar], {k: (lo, hi) for k, _, lo, hi in daftar}
+
+
+_PENGELUARAN = _pilih_kategori(KATEGORI_PENGELUARAN)
+_PEMASUKAN = _pilih_kategori(KATEGORI_PEMASUKAN)
+
+
+def buat_transaksi(rng, n, bulan=12, akhir=AKHIR):
+    """Generator n baris (tanggal, tipe, kategori, jumlah sen, catatan) dalam
+    `bulan` bulan terakhir sampai `akhir`."""
+    hari = bulan * 30
+    for _ in range(n):
+        if rng.random() < PORSI_PEMASUKAN:
+            tipe, (nama, bobot, rentang) = 'Pemasukan', _PEMASUKAN
+        else:
+            tipe, (nama, bobot, rentang) = 'Pengeluaran', _PENGELUARAN
+        kategori = rng.choices(nama, bobot)[0]
+        lo, hi = rentang[kategori]
+        # Log-uniform: nominal kecil jauh lebih sering daripada nominal besar
+        rupiah = math.exp(rng.uniform(math.log(lo), math.log(hi)))
+        jumlah = int(round(rupiah / 500)) * 500 * 100
+        tanggal = (akhir - timedelta(days=rng.randrange(hari))).isoformat()
+        catatan = rng.choice(CATATAN) if rng.random() < PORSI_CATATAN else ''
+        yield tanggal, tipe, kategori, jumlah, catatan
+
+
+def bagi_per_user(rng, total, users):
+    """Membagi total transaksi ke user dengan sebaran miring (sebagian kecil
+    user sangat aktif), jumlahnya tetap tepat `total`."""
+    bobot = [rng.paretovariate(1.5) for _ in range(users)]
+    skala = total / sum(bobot)
+    jumlah = [int(b * skala) for b in bobot]
+    for i in range(total - sum(jumlah)):
+        jumlah[i % users] += 1
+    return jumlah
+
+
+def isi(users, transaksi, seed=0, bulan=12, password_hash=None):
+    """Mengisi database aktif (db.DB_NAME) dengan `users` user ('user0'...),
+    satu admin ('admin'), dan total `transaksi` transaksi.
+
+    Semua akun memakai password PASSWORD. Mengembalikan daftar user_id
+    berurutan sesuai 'user0'...
+    """
+    from werkzeug.security import generate_password_hash
+
+    rng = random.Random(seed)
+    password_hash = password_hash or generate_password_hash(PASSWORD)
+    conn = db.get_connection()
+    if conn.execute("SELECT 1 FROM users WHERE username IN ('admin', 'user0')").fetchone():
+        raise ValueError(f'{db.DB_NAME} sudah berisi data sintetis')
+
+    db.tambah_user('admin', password_hash, role='admin')
+    with conn:
+        conn.executemany('INSERT INTO users (username, password) VALUES (?, ?)',
+                         ((f'user{i}', password_hash) for i in range(users)))
+    user_ids = [row[0] for row in conn.execute(
+        "SELECT id FROM users WHERE role = 'user' AND username GLOB 'user[0-9]*' ORDER BY id")]
+
+    for user_id, n in zip(user_ids, bagi_per_user(rng, transaksi, users)):
+        rows = buat_transaksi(rng, n, bulan)
+        while True:
+            batch = [row for _, row in zip(range(BATCH), rows)]
+            if not batch:
+                break
+            db.tambah_transaksi_bulk(user_id, batch)
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=db.DB_NAME)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--transaksi', type=int, default=100_000, help='total transaksi semua user')
+    parser.add_argument('--bulan', type=int, default=12, help='rentang data sampai 2025-12-31')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    db.DB_NAME = args.db
+    db.init_db()
+    try:
+        isi(args.users, args.transaksi, args.seed, args.bulan)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f"{args.db}: {args.users} user + admin, {args.transaksi} transaksi (password: {PASSWORD})")
+
+
+if __name__ == '__main__':
+    main()
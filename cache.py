@@ -0,0 +1,308 @@
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import baris
+
+# Default ukuran dan umur entri cache
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 300  # detik
+
+# Versi "global" dinaikkan setiap ada penulisan, dipakai oleh fungsi admin
+# yang membaca data semua user.
+GLOBAL = '*'
+# Scope yang dinaikkan oleh invalidate_all; versinya ikut di setiap key.
+SEMUA = '**'
+
+# Batas bawah "terakhir diubah": perubahan sebelum proses ini start tidak tercatat
+_MULAI = time.time()
+
+
+class MemoryBackend:
+    """Cache in-process: LRU dengan batas ukuran dan TTL per entri.
+
+    Hanya berlaku di satu proses; dengan beberapa worker gunicorn, data basi
+    di worker lain dibatasi oleh TTL. Gunakan SQLiteBackend agar invalidasi
+    terlihat oleh semua worker.
+
+    Seperti SQLiteBackend, nilai disimpan sebagai JSON dan setiap get()
+    mengembalikan salinan baru, jadi pemanggil yang mengubah hasilnya tidak
+    merusak entri untuk request berikutnya.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        # Versi disimpan terpisah agar tidak ikut tergusur oleh LRU
+        self._versi = {}
+        self._diubah = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+        return json.loads(value)
+
+    def set(self, key, value):
+        value = json.dumps(value)
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_versi(self, scope):
+        with self._lock:
+            return self._versi.get(scope, 0)
+
+    def naikkan_versi(self, scope):
+        with self._lock:
+            self._versi[scope] = self._versi.get(scope, 0) + 1
+            self._diubah[scope] = time.time()
+
+    def get_diubah(self, scope):
+        with self._lock:
+            return self._diubah.get(scope)
+
+    def clear(self):
+        # Versi sengaja tidak di-reset: entri yang sedang dihitung oleh thread
+        # lain dengan versi lama tidak boleh menjadi "baru" lagi.
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """Cache bersama berbasis file SQLite, bisa dipakai banyak worker di satu host.
+
+    Nilai disimpan sebagai JSON. LRU diperkirakan lewat kolom `accessed`;
+    entri tertua digusur saat jumlahnya melewati maxsize.
+    """
+
+    def __init__(self, path='cache.db', maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache_versi (
+                    scope TEXT PRIMARY KEY,
+                    versi INTEGER NOT NULL,
+                    diubah REAL
+                )
+            ''')
+            try:
+                conn.execute('ALTER TABLE cache_versi ADD COLUMN diubah REAL')
+            except sqlite3.OperationalError:
+                pass  # kolom sudah ada
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute('PRAGMA busy_timeout = 5000')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        with conn:
+            if row[1] < now:
+                conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                return None
+            conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                         (key, json.dumps(value), now + self.ttl, now))
+            conn.execute('''
+                DELETE FROM cache WHERE key IN (
+                    SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.maxsize,))
+
+    def get_versi(self, scope):
+        row = self._conn().execute('SELECT versi FROM cache_versi WHERE scope = ?', (scope,)).fetchone()
+        return row[0] if row else 0
+
+    def naikkan_versi(self, scope):
+        conn = self._conn()
+        with conn:
+            conn.execute('''
+                INSERT INTO cache_versi (scope, versi, diubah) VALUES (?, 1, ?)
+                ON CONFLICT (scope) DO UPDATE SET versi = versi + 1, diubah = excluded.diubah
+            ''', (scope, time.time()))
+
+    def get_diubah(self, scope):
+        row = self._conn().execute('SELECT diubah FROM cache_versi WHERE scope = ?', (scope,)).fetchone()
+        return row[0] if row else None
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute('DELETE FROM cache')
+
+    def __len__(self):
+        return self._conn().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+_backend = MemoryBackend()
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def configure(backend):
+    """Mengganti backend cache (MemoryBackend, SQLiteBackend, atau None untuk menonaktifkan)."""
+    global _backend
+    _backend = backend
+
+
+def configure_from_env(path='cache.db'):
+    """Memilih backend dari environment: CACHE_BACKEND=sqlite|memory|none,
+    CACHE_PATH (default: path), CACHE_MAXSIZE, dan CACHE_TTL.
+
+    Default sqlite: invalidasi dari satu worker langsung terlihat oleh
+    worker lain. memory lebih cepat, tetapi worker lain bisa menyajikan
+    data basi sampai CACHE_TTL.
+    """
+    jenis = os.environ.get('CACHE_BACKEND', 'sqlite')
+    maxsize = int(os.environ.get('CACHE_MAXSIZE', DEFAULT_MAXSIZE))
+    ttl = float(os.environ.get('CACHE_TTL', DEFAULT_TTL))
+    if jenis == 'none':
+        configure(None)
+    elif jenis == 'sqlite':
+        configure(SQLiteBackend(os.environ.get('CACHE_PATH', path), maxsize, ttl))
+    else:
+        configure(MemoryBackend(maxsize, ttl))
+
+
+def _catat(nama):
+    with _stats_lock:
+        _stats[nama] += 1
+
+
+def stats():
+    """Counter hit/miss/invalidasi proses ini, plus ukuran cache saat ini."""
+    with _stats_lock:
+        hasil = dict(_stats)
+    hasil['size'] = len(_backend) if _backend is not None else 0
+    hasil['backend'] = type(_backend).__name__ if _backend is not None else None
+    return hasil
+
+
+def invalidate(user_id=None):
+    """Membuang cache milik user_id (dan cache admin lintas user).
+
+    Dipanggil oleh fungsi tulis di database.py setelah commit. Invalidasi
+    dilakukan dengan menaikkan nomor versi, sehingga entri lama tidak pernah
+    terbaca lagi dan akan tergusur oleh LRU/TTL.
+    """
+    if _backend is None:
+        return
+    if user_id is not None:
+        _backend.naikkan_versi(str(user_id))
+    _backend.naikkan_versi(GLOBAL)
+    _catat('invalidations')
+
+
+def invalidate_all():
+    """Membuang seluruh cache (misalnya setelah rebuild_ringkasan).
+
+    Versi SEMUA dinaikkan dulu: hasil yang sedang dihitung dengan versi lama
+    tetap tersimpan di key lama dan tidak pernah terbaca lagi. clear() hanya
+    membebaskan tempat.
+    """
+    if _backend is None:
+        return
+    _backend.naikkan_versi(SEMUA)
+    _backend.clear()
+    _catat('invalidations')
+
+
+def terakhir_diubah(user_id=None):
+    """Waktu (epoch) invalidasi terakhir untuk data user_id, atau data
+    lintas user jika user_id None. Dipakai sebagai header Last-Modified.
+
+    Tanpa backend, atau dengan MemoryBackend di worker yang tidak melihat
+    penulisan, nilainya bisa lebih tua dari data sebenarnya; karena itu
+    respons tetap membawa ETag berbasis isi yang selalu diutamakan browser.
+    """
+    if _backend is None:
+        return time.time()
+    scope = str(user_id) if user_id is not None else GLOBAL
+    waktu = [_backend.get_diubah(scope), _backend.get_diubah(SEMUA), _MULAI]
+    return max(w for w in waktu if w is not None)
+
+
+def _ke_json(value):
+    """Mengubah hasil query (baris.Baris, list of Baris) menjadi dict/list biasa."""
+    if isinstance(value, baris.Baris):
+        return value._asdict()
+    if isinstance(value, (list, tuple)):
+        return [_ke_json(v) for v in value]
+    return value
+
+
+def cached(per_user=True):
+    """Decorator cache untuk fungsi baca di database.py.
+
+    per_user=True: argumen pertama adalah user_id, entri ikut versi user itu.
+    per_user=False: entri ikut versi GLOBAL (fungsi admin lintas user).
+    Hasil selalu dikembalikan sebagai dict/list biasa agar bisa disimpan di
+    backend bersama.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _backend is None:
+                return _ke_json(func(*args, **kwargs))
+            scope = str(args[0] if args else kwargs.get('user_id')) if per_user else GLOBAL
+            versi = [_backend.get_versi(scope), _backend.get_versi(SEMUA)]
+            key = json.dumps([func.__name__, versi, args, sorted(kwargs.items())], default=str)
+            value = _backend.get(key)
+            if value is not None:
+                _catat('hits')
+                return value
+            _catat('misses')
+            value = _ke_json(func(*args, **kwargs))
+            _backend.set(key, value)
+            return value
+        wrapper.uncached = func
+        return wrapper
+    return decorator
@@ -0,0 +1,33 @@
+# Root conftest: pytest menambahkan folder ini ke sys.path, jadi test di
+# tests/ bisa mengimpor modul aplikasi (database, app, ...) langsung.
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def aplikasi(tmp_path_factory):
+    """Modul app di atas database sementara (app memeriksa skema saat diimpor)."""
+    import cache
+    import database as db
+    cache.configure(None)
+    db.DB_NAME = os.path.join(tmp_path_factory.mktemp('db'), 'test.db')
+    db.init_db()
+    import app
+    app.app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def login(aplikasi):
+    """login(client, username, role='user'): membuat user dan memasang sesinya."""
+    import database as db
+
+    def masuk(client, username, role='user'):
+        if db.cek_user(username) is None:
+            db.tambah_user(username, 'x', role)
+        user_id = db.cek_user(username)['id']
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        return user_id
+    return masuk
@@ -1,122 +1,935 @@
+import calendar
+import heapq
+import os
+import re
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from itertools import islice
+from operator import attrgetter
+
+import antrian_tulis
+import baris
+import cache
 
 DB_NAME = 'keuangan.db'
 
+# Jumlah file shard untuk transaksi. 1 = satu file (DB_NAME) untuk semua data.
+# Dengan N > 1, users tetap di DB_NAME sementara transaksi dan
+# ringkasan_bulanan setiap user disimpan di shard user_id % N, sehingga
+# penulisan user di shard berbeda tidak saling menunggu lock SQLite.
+DB_SHARDS = int(os.environ.get('DB_SHARDS') or 1)
+
+# Pragma yang dipasang sekali setiap kali koneksi baru dibuka.
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -16000),        # ~16 MB page cache
+    ('mmap_size', 134217728),      # 128 MB memory-mapped I/O
+    ('busy_timeout', 5000),        # ms, tunggu lock sebelum "database is locked"
+    ('temp_store', 'MEMORY'),
+)
+
+# Jumlah prepared statement yang di-cache per koneksi oleh modul sqlite3.
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {'opened': 0, 'reused': 0}
+
+
+def _open_connection(path=None):
+    """Membuka koneksi baru dan menerapkan PRAGMAS.
+
+    Koneksi shard juga meng-ATTACH DB_NAME sebagai 'utama', sehingga query
+    yang JOIN ke tabel users tetap berjalan di shard.
+    """
+    # Hasil query berupa baris.Baris (tuple dengan akses per nama kolom)
+    conn = sqlite3.connect(path or DB_NAME, cached_statements=STATEMENT_CACHE_SIZE, factory=baris.Koneksi)
+    for name, value in PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
+    if path and path != DB_NAME:
+        conn.execute('ATTACH DATABASE ? AS utama', (DB_NAME,))
+    return conn
+
+
+def path_shard(indeks):
+    """Nama file shard ke-`indeks`, di samping DB_NAME (keuangan.shard0.db, ...)."""
+    root, ext = os.path.splitext(DB_NAME)
+    return f'{root}.shard{indeks}{ext or ".db"}'
+
+
+def shard_untuk(user_id):
+    """Indeks shard yang menyimpan transaksi user_id."""
+    return int(user_id) % DB_SHARDS
+
+
+def get_connection(user_id=None):
+    """Mengambil koneksi milik thread ini, membuka yang baru jika belum ada.
+
+    Koneksi disimpan per thread (dan per proses, agar aman setelah fork
+    worker gunicorn) sehingga satu request hanya membayar biaya connect sekali.
+    Dengan DB_SHARDS > 1, user_id memilih koneksi ke shard milik user itu;
+    tanpa user_id (atau tanpa sharding) koneksi ke DB_NAME.
+    """
+    if user_id is not None and DB_SHARDS > 1:
+        return _koneksi(path_shard(shard_untuk(user_id)))
+    return _koneksi(DB_NAME)
+
+
+def _koneksi(path):
+    pid = os.getpid()
+    if getattr(_local, 'pid', None) != pid:
+        # Koneksi warisan proses induk (sebelum fork) tidak boleh dipakai
+        _local.conns = {}
+        _local.pid = pid
+    conn = _local.conns.get(path)
+    if conn is not None:
+        with _stats_lock:
+            _stats['reused'] += 1
+        return conn
+
+    conn = _local.conns[path] = _open_connection(path)
+    with _stats_lock:
+        _stats['opened'] += 1
+    return conn
+
+
+def koneksi_shard():
+    """Koneksi thread ini ke setiap shard, urut indeks (atau [DB_NAME] tanpa sharding)."""
+    if DB_SHARDS <= 1:
+        return [get_connection()]
+    return [_koneksi(path_shard(i)) for i in range(DB_SHARDS)]
+
+
+_executor_shard = None
+_executor_lock = threading.Lock()
+
+
+def _sebar(fungsi, *args):
+    """Scatter: menjalankan fungsi(conn, *args) di setiap shard secara paralel
+    (sqlite3 melepas GIL selama query) dan mengembalikan list hasil per shard."""
+    global _executor_shard
+    if DB_SHARDS <= 1:
+        return [fungsi(get_connection(), *args)]
+    with _executor_lock:
+        if _executor_shard is None or _executor_shard._max_workers != DB_SHARDS:
+            _executor_shard = ThreadPoolExecutor(max_workers=DB_SHARDS, thread_name_prefix='shard')
+        executor = _executor_shard
+    futures = [executor.submit(lambda i: fungsi(_koneksi(path_shard(i)), *args), i)
+               for i in range(DB_SHARDS)]
+    return [f.result() for f in futures]
+
+
+def close_connection():
+    """Menutup koneksi milik thread ini (misalnya saat worker berhenti)."""
+    if getattr(_local, 'pid', None) == os.getpid():
+        for conn in _local.conns.values():
+            conn.close()
+    _local.conns = {}
+    _local.pid = os.getpid()
+
+
+def connection_stats():
+    """Mengembalikan jumlah koneksi yang dibuka vs dipakai ulang."""
+    with _stats_lock:
+        return dict(_stats)
+
+
 def init_db():
-    """Inisialisasi database dan tabel transaksi jika belum ada."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS transaksi (
+    """Menerapkan semua migrasi yang belum dijalankan, di DB_NAME dan (jika
+    DB_SHARDS > 1) setiap shard. Aman dijalankan berulang.
+
+    Dipanggil sekali oleh python migrate_db.py sebelum worker start; worker
+    sendiri hanya menjalankan cek_schema().
+    """
+    conn = get_connection()
+    versi_lama = versi_schema(conn)
+    berubah = upgrade_schema(conn) != versi_lama
+    if DB_SHARDS > 1:
+        berubah = init_shard() or berubah
+    if berubah:
+        # Cache bersama (SQLiteBackend) bisa masih menyimpan hasil skema lama
+        cache.invalidate_all()
+
+def cek_schema():
+    """Pemeriksaan saat worker start: hanya membaca user_version (dan
+    info_shard), tanpa DDL dan tanpa lock tulis.
+
+    Melempar RuntimeError jika database belum dimigrasi ke versi yang
+    dibutuhkan kode ini (atau sudah lebih baru).
+    """
+    _cek_versi(DB_NAME, versi_schema(get_connection()), SCHEMA_VERSION)
+    if DB_SHARDS > 1:
+        _cek_utama_kosong()
+        for i, conn in enumerate(koneksi_shard()):
+            _cek_versi(path_shard(i), versi_schema(conn), SHARD_SCHEMA_VERSION)
+            _cek_info_shard(i, conn.execute('SELECT indeks, jumlah FROM info_shard').fetchone())
+
+def versi_schema(conn):
+    """Versi skema file utama koneksi ini (PRAGMA user_version)."""
+    return conn.execute('PRAGMA main.user_version').fetchone()[0]
+
+def _cek_versi(path, versi, dibutuhkan):
+    if versi < dibutuhkan:
+        raise RuntimeError(f'{path} masih skema versi {versi}, aplikasi butuh versi {dibutuhkan}; '
+                           f'jalankan python migrate_db.py')
+    if versi > dibutuhkan:
+        raise RuntimeError(f'{path} sudah skema versi {versi}, lebih baru dari aplikasi ini '
+                           f'(versi {dibutuhkan}); perbarui kode aplikasi')
+
+# Agregasi bulanan dari data mentah, dipakai untuk mengisi dan memverifikasi
+# tabel ringkasan_bulanan.
+_AGREGASI_BULANAN_SQL = '''
+    SELECT COALESCE(user_id, 0), CAST(substr(tanggal, 1, 4) AS INTEGER),
+           CAST(substr(tanggal, 6, 2) AS INTEGER), tipe, kategori, SUM(jumlah), COUNT(*)
+    FROM transaksi
+    GROUP BY 1, 2, 3, 4, 5
+'''
+
+_ISI_RINGKASAN_SQL = '''
+    INSERT INTO ringkasan_bulanan (user_id, tahun, bulan, tipe, kategori, total, jumlah_transaksi)
+''' + _AGREGASI_BULANAN_SQL
+
+# Tabel rollup; tipe kolom total diisi saat dipakai (REAL di v3, INTEGER sen sejak v5).
+_TABEL_RINGKASAN_SQL = '''
+    CREATE TABLE IF NOT EXISTS ringkasan_bulanan (
+        user_id INTEGER NOT NULL,
+        tahun INTEGER NOT NULL,
+        bulan INTEGER NOT NULL,
+        tipe TEXT NOT NULL,
+        kategori TEXT NOT NULL,
+        total %s NOT NULL,
+        jumlah_transaksi INTEGER NOT NULL,
+        PRIMARY KEY (user_id, tahun, bulan, tipe, kategori)
+    ) WITHOUT ROWID'''
+
+_INDEX_RINGKASAN_SQL = ('CREATE INDEX IF NOT EXISTS idx_ringkasan_tipe_kategori '
+                        'ON ringkasan_bulanan (tipe, kategori, total, jumlah_transaksi)')
+
+# Trigger yang menjaga ringkasan_bulanan ikut setiap INSERT/UPDATE/DELETE transaksi.
+_TRIGGER_RINGKASAN_SQL = (
+    '''CREATE TRIGGER IF NOT EXISTS trg_transaksi_insert_ringkasan
+    AFTER INSERT ON transaksi
+    BEGIN
+        INSERT INTO ringkasan_bulanan (user_id, tahun, bulan, tipe, kategori, total, jumlah_transaksi)
+        VALUES (COALESCE(NEW.user_id, 0), CAST(substr(NEW.tanggal, 1, 4) AS INTEGER),
+                CAST(substr(NEW.tanggal, 6, 2) AS INTEGER), NEW.tipe, NEW.kategori, NEW.jumlah, 1)
+        ON CONFLICT (user_id, tahun, bulan, tipe, kategori) DO UPDATE
+        SET total = total + excluded.total, jumlah_transaksi = jumlah_transaksi + 1;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_transaksi_delete_ringkasan
+    AFTER DELETE ON transaksi
+    BEGIN
+        UPDATE ringkasan_bulanan
+        SET total = total - OLD.jumlah, jumlah_transaksi = jumlah_transaksi - 1
+        WHERE user_id = COALESCE(OLD.user_id, 0)
+          AND tahun = CAST(substr(OLD.tanggal, 1, 4) AS INTEGER)
+          AND bulan = CAST(substr(OLD.tanggal, 6, 2) AS INTEGER)
+          AND tipe = OLD.tipe AND kategori = OLD.kategori;
+        DELETE FROM ringkasan_bulanan
+        WHERE user_id = COALESCE(OLD.user_id, 0)
+          AND tahun = CAST(substr(OLD.tanggal, 1, 4) AS INTEGER)
+          AND bulan = CAST(substr(OLD.tanggal, 6, 2) AS INTEGER)
+          AND tipe = OLD.tipe AND kategori = OLD.kategori
+          AND jumlah_transaksi <= 0;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_transaksi_update_ringkasan
+    AFTER UPDATE OF user_id, tanggal, tipe, kategori, jumlah ON transaksi
+    BEGIN
+        UPDATE ringkasan_bulanan
+        SET total = total - OLD.jumlah, jumlah_transaksi = jumlah_transaksi - 1
+        WHERE user_id = COALESCE(OLD.user_id, 0)
+          AND tahun = CAST(substr(OLD.tanggal, 1, 4) AS INTEGER)
+          AND bulan = CAST(substr(OLD.tanggal, 6, 2) AS INTEGER)
+          AND tipe = OLD.tipe AND kategori = OLD.kategori;
+        DELETE FROM ringkasan_bulanan
+        WHERE user_id = COALESCE(OLD.user_id, 0)
+          AND tahun = CAST(substr(OLD.tanggal, 1, 4) AS INTEGER)
+          AND bulan = CAST(substr(OLD.tanggal, 6, 2) AS INTEGER)
+          AND tipe = OLD.tipe AND kategori = OLD.kategori
+          AND jumlah_transaksi <= 0;
+        INSERT INTO ringkasan_bulanan (user_id, tahun, bulan, tipe, kategori, total, jumlah_transaksi)
+        VALUES (COALESCE(NEW.user_id, 0), CAST(substr(NEW.tanggal, 1, 4) AS INTEGER),
+                CAST(substr(NEW.tanggal, 6, 2) AS INTEGER), NEW.tipe, NEW.kategori, NEW.jumlah, 1)
+        ON CONFLICT (user_id, tahun, bulan, tipe, kategori) DO UPDATE
+        SET total = total + excluded.total, jumlah_transaksi = jumlah_transaksi + 1;
+    END''',
+)
+
+# Index pencarian teks atas catatan dan kategori. Contentless (teks tidak
+# disimpan dua kali); kolom pengguna berisi token 'u<user_id>' agar pencarian
+# satu user cukup memotong doclist miliknya, bukan menyaring hasil semua user.
+_FTS_SQL = (
+    # detail=column: tanpa posisi kata (tidak ada query frasa), index lebih
+    # kecil dan bm25 per hasil sekitar dua kali lebih cepat
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transaksi_fts USING fts5(
+        catatan, kategori, pengguna, content='', detail=column,
+        tokenize='unicode61 remove_diacritics 2')""",
+    '''CREATE TRIGGER IF NOT EXISTS trg_transaksi_insert_fts
+    AFTER INSERT ON transaksi
+    BEGIN
+        INSERT INTO transaksi_fts (rowid, catatan, kategori, pengguna)
+        VALUES (NEW.id, NEW.catatan, NEW.kategori, 'u' || NEW.user_id);
+    END''',
+    # Tabel contentless hanya bisa dihapus dengan menyebut ulang nilai yang di-index
+    '''CREATE TRIGGER IF NOT EXISTS trg_transaksi_delete_fts
+    AFTER DELETE ON transaksi
+    BEGIN
+        INSERT INTO transaksi_fts (transaksi_fts, rowid, catatan, kategori, pengguna)
+        VALUES ('delete', OLD.id, OLD.catatan, OLD.kategori, 'u' || OLD.user_id);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_transaksi_update_fts
+    AFTER UPDATE OF user_id, kategori, catatan ON transaksi
+    BEGIN
+        INSERT INTO transaksi_fts (transaksi_fts, rowid, catatan, kategori, pengguna)
+        VALUES ('delete', OLD.id, OLD.catatan, OLD.kategori, 'u' || OLD.user_id);
+        INSERT INTO transaksi_fts (rowid, catatan, kategori, pengguna)
+        VALUES (NEW.id, NEW.catatan, NEW.kategori, 'u' || NEW.user_id);
+    END''',
+)
+
+_ISI_FTS_SQL = ('''INSERT INTO transaksi_fts (rowid, catatan, kategori, pengguna)
+    SELECT id, catatan, kategori, 'u' || user_id FROM transaksi''')
+
+# Anggaran bulanan per kategori pengeluaran. Pemakaian dibaca langsung dari
+# ringkasan_bulanan (sudah diperbarui trigger di setiap tulis transaksi), jadi
+# status anggaran hanya membaca satu baris rollup per kategori. Peringatan
+# melebihi anggaran dihitung oleh trigger di transaksi tulis yang sama, bukan
+# saat dibaca. Tabel ini ada di file yang sama dengan ringkasan_bulanan
+# (shard milik user), karena trigger tidak bisa menyentuh database lain.
+_ANGGARAN_SQL = (
+    '''CREATE TABLE IF NOT EXISTS anggaran (
+        user_id INTEGER NOT NULL,
+        kategori TEXT NOT NULL,
+        batas INTEGER NOT NULL,  -- sen per bulan
+        PRIMARY KEY (user_id, kategori)
+    ) WITHOUT ROWID''',
+    # Satu baris per (user, bulan, kategori) yang pengeluarannya melebihi batas
+    '''CREATE TABLE IF NOT EXISTS peringatan_anggaran (
+        user_id INTEGER NOT NULL,
+        tahun INTEGER NOT NULL,
+        bulan INTEGER NOT NULL,
+        kategori TEXT NOT NULL,
+        terpakai INTEGER NOT NULL,
+        batas INTEGER NOT NULL,
+        PRIMARY KEY (user_id, tahun, bulan, kategori)
+    ) WITHOUT ROWID''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_ringkasan_insert_anggaran
+    AFTER INSERT ON ringkasan_bulanan WHEN NEW.tipe = 'Pengeluaran'
+    BEGIN
+        INSERT OR REPLACE INTO peringatan_anggaran (user_id, tahun, bulan, kategori, terpakai, batas)
+        SELECT NEW.user_id, NEW.tahun, NEW.bulan, NEW.kategori, NEW.total, batas FROM anggaran
+        WHERE user_id = NEW.user_id AND kategori = NEW.kategori AND NEW.total > batas;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_ringkasan_update_anggaran
+    AFTER UPDATE OF total ON ringkasan_bulanan WHEN NEW.tipe = 'Pengeluaran'
+    BEGIN
+        DELETE FROM peringatan_anggaran
+        WHERE user_id = NEW.user_id AND tahun = NEW.tahun AND bulan = NEW.bulan
+          AND kategori = NEW.kategori;
+        INSERT INTO peringatan_anggaran (user_id, tahun, bulan, kategori, terpakai, batas)
+        SELECT NEW.user_id, NEW.tahun, NEW.bulan, NEW.kategori, NEW.total, batas FROM anggaran
+        WHERE user_id = NEW.user_id AND kategori = NEW.kategori AND NEW.total > batas;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_ringkasan_delete_anggaran
+    AFTER DELETE ON ringkasan_bulanan WHEN OLD.tipe = 'Pengeluaran'
+    BEGIN
+        DELETE FROM peringatan_anggaran
+        WHERE user_id = OLD.user_id AND tahun = OLD.tahun AND bulan = OLD.bulan
+          AND kategori = OLD.kategori;
+    END''',
+    # Batas baru berlaku untuk semua bulan yang sudah tercatat
+    '''CREATE TRIGGER IF NOT EXISTS trg_anggaran_insert
+    AFTER INSERT ON anggaran
+    BEGIN
+        INSERT OR REPLACE INTO peringatan_anggaran (user_id, tahun, bulan, kategori, terpakai, batas)
+        SELECT user_id, tahun, bulan, kategori, total, NEW.batas FROM ringkasan_bulanan
+        WHERE user_id = NEW.user_id AND tipe = 'Pengeluaran' AND kategori = NEW.kategori
+          AND total > NEW.batas;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_anggaran_update
+    AFTER UPDATE OF batas ON anggaran
+    BEGIN
+        DELETE FROM peringatan_anggaran WHERE user_id = OLD.user_id AND kategori = OLD.kategori;
+        INSERT INTO peringatan_anggaran (user_id, tahun, bulan, kategori, terpakai, batas)
+        SELECT user_id, tahun, bulan, kategori, total, NEW.batas FROM ringkasan_bulanan
+        WHERE user_id = NEW.user_id AND tipe = 'Pengeluaran' AND kategori = NEW.kategori
+          AND total > NEW.batas;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_anggaran_delete
+    AFTER DELETE ON anggaran
+    BEGIN
+        DELETE FROM peringatan_anggaran WHERE user_id = OLD.user_id AND kategori = OLD.kategori;
+    END''',
+)
+
+# Jumlah baris perubahan_transaksi yang disimpan. Pembaca yang tertinggal
+# lebih jauh dari ini (lihat analitik.py) memuat ulang semua transaksi.
+BATAS_LOG_PERUBAHAN = 100_000
+
+# Log id transaksi yang diubah atau dihapus, agar salinan data di luar SQLite
+# (snapshot analitik.py) bisa diperbarui bertahap: baris baru dikenali dari
+# id > id terakhir yang dimuat, baris lama dari seq > seq terakhir.
+_LOG_PERUBAHAN_SQL = (
+    '''CREATE TABLE IF NOT EXISTS perubahan_transaksi (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        id INTEGER NOT NULL
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_transaksi_update_log
+    AFTER UPDATE ON transaksi
+    BEGIN
+        INSERT INTO perubahan_transaksi (id) VALUES (OLD.id);
+        DELETE FROM perubahan_transaksi WHERE seq <= last_insert_rowid() - {BATAS_LOG_PERUBAHAN};
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_transaksi_delete_log
+    AFTER DELETE ON transaksi
+    BEGIN
+        INSERT INTO perubahan_transaksi (id) VALUES (OLD.id);
+        DELETE FROM perubahan_transaksi WHERE seq <= last_insert_rowid() - {BATAS_LOG_PERUBAHAN};
+    END''',
+)
+
+# Aturan transaksi berulang (gaji, sewa, langganan). Kolom berikutnya adalah
+# kejadian pertama yang belum dibuat; materialisasi_berulang menambah
+# transaksinya dan memajukan kolom ini dalam satu transaksi database, jadi
+# menjalankannya ulang (juga setelah crash) tidak pernah membuat duplikat.
+# Index parsial hanya berisi aturan yang masih aktif: mencari yang jatuh
+# tempo sebanding dengan jumlah yang jatuh tempo, bukan jumlah user.
+_BERULANG_SQL = (
+    '''CREATE TABLE IF NOT EXISTS transaksi_berulang (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        frekuensi TEXT NOT NULL,  -- harian, mingguan, bulanan
+        mulai TEXT NOT NULL,  -- kejadian pertama; bulanan mengikuti tanggalnya
+        selesai TEXT,  -- kejadian terakhir yang boleh dibuat, NULL = tanpa batas
+        berikutnya TEXT,  -- NULL setelah melewati selesai
+        tipe TEXT NOT NULL,
+        kategori TEXT NOT NULL,
+        jumlah INTEGER NOT NULL,  -- sen
+        catatan TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_berulang_user ON transaksi_berulang (user_id)',
+    'CREATE INDEX IF NOT EXISTS idx_berulang_berikutnya ON transaksi_berulang (berikutnya) '
+    'WHERE berikutnya IS NOT NULL',
+)
+
+# Checkpoint saldo: saldo akhir setiap bulan per user (semua pemasukan
+# dikurangi semua pengeluaran sampai akhir bulan itu), untuk saldo_berjalan.
+# Dijaga trigger pada ringkasan_bulanan: perubahan total satu bulan hanya
+# menggeser checkpoint bulan itu dan bulan-bulan sesudahnya; bulan sebelum
+# tanggal transaksi yang diubah tidak disentuh. Baris tetap ada walaupun
+# bulannya menjadi kosong (nilainya tetap benar).
+_SALDO_SQL = (
+    '''CREATE TABLE IF NOT EXISTS saldo_bulanan (
+        user_id INTEGER NOT NULL,
+        tahun INTEGER NOT NULL,
+        bulan INTEGER NOT NULL,
+        saldo INTEGER NOT NULL,  -- sen, saldo akhir bulan
+        PRIMARY KEY (user_id, tahun, bulan)
+    ) WITHOUT ROWID''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_ringkasan_insert_saldo
+    AFTER INSERT ON ringkasan_bulanan WHEN NEW.tipe IN ('Pemasukan', 'Pengeluaran')
+    BEGIN
+        INSERT OR IGNORE INTO saldo_bulanan (user_id, tahun, bulan, saldo)
+        VALUES (NEW.user_id, NEW.tahun, NEW.bulan, COALESCE((
+            SELECT saldo FROM saldo_bulanan
+            WHERE user_id = NEW.user_id AND (tahun, bulan) < (NEW.tahun, NEW.bulan)
+            ORDER BY tahun DESC, bulan DESC LIMIT 1), 0));
+        UPDATE saldo_bulanan
+        SET saldo = saldo + CASE NEW.tipe WHEN 'Pemasukan' THEN NEW.total ELSE -NEW.total END
+        WHERE user_id = NEW.user_id AND (tahun, bulan) >= (NEW.tahun, NEW.bulan);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_ringkasan_update_saldo
+    AFTER UPDATE OF total ON ringkasan_bulanan WHEN NEW.tipe IN ('Pemasukan', 'Pengeluaran')
+    BEGIN
+        UPDATE saldo_bulanan
+        SET saldo = saldo + CASE NEW.tipe WHEN 'Pemasukan' THEN NEW.total - OLD.total
+                                          ELSE OLD.total - NEW.total END
+        WHERE user_id = NEW.user_id AND (tahun, bulan) >= (NEW.tahun, NEW.bulan);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_ringkasan_delete_saldo
+    AFTER DELETE ON ringkasan_bulanan WHEN OLD.tipe IN ('Pemasukan', 'Pengeluaran')
+    BEGIN
+        UPDATE saldo_bulanan
+        SET saldo = saldo - CASE OLD.tipe WHEN 'Pemasukan' THEN OLD.total ELSE -OLD.total END
+        WHERE user_id = OLD.user_id AND (tahun, bulan) >= (OLD.tahun, OLD.bulan);
+    END''',
+)
+
+# Mengisi saldo_bulanan dari ringkasan_bulanan (kumulatif per user)
+_ISI_SALDO_SQL = '''
+    INSERT INTO saldo_bulanan (user_id, tahun, bulan, saldo)
+    SELECT user_id, tahun, bulan, SUM(neto) OVER (PARTITION BY user_id ORDER BY tahun, bulan)
+    FROM (SELECT user_id, tahun, bulan,
+                 SUM(CASE tipe WHEN 'Pemasukan' THEN total ELSE -total END) AS neto
+          FROM ringkasan_bulanan WHERE tipe IN ('Pemasukan', 'Pengeluaran')
+          GROUP BY user_id, tahun, bulan)
+'''
+
+def _tambah_kolom_user_id(conn):
+    """Database dari sebelum multi-user: transaksi tanpa user_id menjadi milik user 1."""
+    kolom = [row[1] for row in conn.execute('PRAGMA table_info(transaksi)')]
+    if 'user_id' not in kolom:
+        conn.execute('ALTER TABLE transaksi ADD COLUMN user_id INTEGER')
+        conn.execute('UPDATE transaksi SET user_id = 1 WHERE user_id IS NULL')
+
+# Upgrade skema berversi, dicatat lewat PRAGMA user_version. Setiap langkah
+# berupa SQL atau fungsi(conn). Tambahkan entri baru di akhir; jangan ubah
+# entri yang sudah dirilis.
+MIGRATIONS = [
+    (1, [
+        # Skema awal (dulu dibuat ulang oleh init_db di setiap start)
+        '''CREATE TABLE IF NOT EXISTS transaksi (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER,
             tanggal TEXT NOT NULL,
             tipe TEXT NOT NULL,
             kategori TEXT NOT NULL,
-            jumlah REAL NOT NULL,
+            jumlah REAL NOT NULL,  -- rupiah; menjadi sen di versi 5
             catatan TEXT
-        )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
+        )''',
+        '''CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT UNIQUE NOT NULL,
             password TEXT NOT NULL
-        )
-    ''')
-    # Cek kolom user_id manual untuk memastikan (double check)
+        )''',
+        _tambah_kolom_user_id,
+        # Daftar transaksi per user, urut tanggal DESC, id DESC
+        'CREATE INDEX IF NOT EXISTS idx_transaksi_user_tanggal ON transaksi (user_id, tanggal, id)',
+        # Ringkasan per user per tipe (covering: jumlah ikut di index)
+        'CREATE INDEX IF NOT EXISTS idx_transaksi_user_tipe_tanggal ON transaksi (user_id, tipe, tanggal, jumlah)',
+        # Laporan admin lintas user berdasarkan rentang tanggal
+        'CREATE INDEX IF NOT EXISTS idx_transaksi_tanggal ON transaksi (tanggal, id)',
+        # Ringkasan admin per tipe
+        'CREATE INDEX IF NOT EXISTS idx_transaksi_tipe ON transaksi (tipe, jumlah)',
+    ]),
+    (2, [
+        # hitung_agregasi mengelompokkan per (tipe, kategori); index covering
+        # ini menggantikan idx_transaksi_tipe untuk agregasi semua user
+        'CREATE INDEX IF NOT EXISTS idx_transaksi_tipe_kategori ON transaksi (tipe, kategori, jumlah)',
+        'DROP INDEX IF EXISTS idx_transaksi_tipe',
+    ]),
+    (3, [
+        # Rollup bulanan per (user, tahun, bulan, tipe, kategori). Dijaga oleh
+        # _TRIGGER_RINGKASAN_SQL, jadi selalu ikut transaksi yang sama dengan
+        # INSERT/UPDATE/DELETE pada tabel transaksi (termasuk hapus_user).
+        _TABEL_RINGKASAN_SQL % 'REAL',
+        _INDEX_RINGKASAN_SQL,
+        *_TRIGGER_RINGKASAN_SQL,
+        'DELETE FROM ringkasan_bulanan',
+        _ISI_RINGKASAN_SQL,
+    ]),
+    (4, [
+        # Role eksplisit menggantikan pengecekan username == 'admin'
+        "ALTER TABLE users ADD COLUMN role TEXT NOT NULL DEFAULT 'user'",
+        "UPDATE users SET role = 'admin' WHERE username = 'admin'",
+        # Covering index untuk daftar user non-admin di halaman admin
+        'CREATE INDEX IF NOT EXISTS idx_users_role ON users (role, username)',
+    ]),
+    (5, [
+        # Nominal disimpan sebagai INTEGER sen (lihat uang.py) agar SUM eksak.
+        # SQLite tidak bisa mengubah tipe kolom, jadi tabel dibangun ulang;
+        # DROP TABLE ikut membuang index dan trigger lama.
+        '''CREATE TABLE transaksi_baru (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            tanggal TEXT NOT NULL,
+            tipe TEXT NOT NULL,
+            kategori TEXT NOT NULL,
+            jumlah INTEGER NOT NULL,
+            catatan TEXT
+        )''',
+        '''INSERT INTO transaksi_baru (id, user_id, tanggal, tipe, kategori, jumlah, catatan)
+        SELECT id, user_id, tanggal, tipe, kategori, CAST(ROUND(jumlah * 100) AS INTEGER), catatan
+        FROM transaksi''',
+        # Pertahankan counter AUTOINCREMENT agar id transaksi yang dihapus tidak dipakai ulang
+        """UPDATE sqlite_sequence SET seq = MAX(seq, COALESCE(
+            (SELECT seq FROM sqlite_sequence WHERE name = 'transaksi'), 0))
+        WHERE name = 'transaksi_baru'""",
+        'DROP TABLE transaksi',
+        'ALTER TABLE transaksi_baru RENAME TO transaksi',
+        'CREATE INDEX idx_transaksi_user_tanggal ON transaksi (user_id, tanggal, id)',
+        'CREATE INDEX idx_transaksi_user_tipe_tanggal ON transaksi (user_id, tipe, tanggal, jumlah)',
+        'CREATE INDEX idx_transaksi_tanggal ON transaksi (tanggal, id)',
+        'CREATE INDEX idx_transaksi_tipe_kategori ON transaksi (tipe, kategori, jumlah)',
+        'DROP TABLE ringkasan_bulanan',
+        _TABEL_RINGKASAN_SQL % 'INTEGER',
+        _INDEX_RINGKASAN_SQL,
+        *_TRIGGER_RINGKASAN_SQL,
+        _ISI_RINGKASAN_SQL,
+    ]),
+    (6, [
+        # Pencarian catatan/kategori (cari_transaksi) tanpa LIKE '%...%'
+        *_FTS_SQL,
+        _ISI_FTS_SQL,
+    ]),
+    (7, [
+        # Anggaran bulanan per kategori (status_anggaran)
+        *_ANGGARAN_SQL,
+    ]),
+    (8, [
+        # Pembaruan bertahap snapshot kolumnar analitik.py
+        *_LOG_PERUBAHAN_SQL,
+    ]),
+    (9, [
+        # Transaksi berulang (materialisasi_berulang)
+        *_BERULANG_SQL,
+    ]),
+    (10, [
+        # Checkpoint saldo bulanan (saldo_berjalan)
+        *_SALDO_SQL,
+        _ISI_SALDO_SQL,
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def upgrade_schema(conn, migrations=MIGRATIONS):
+    """Menjalankan migrasi yang belum diterapkan, berdasarkan PRAGMA user_version.
+
+    Setiap versi berjalan dalam satu transaksi bersama user_version-nya:
+    migrasi yang gagal di tengah tidak meninggalkan skema setengah jadi, dan
+    proses lain yang menjalankan migrasi bersamaan menunggu lalu melewatinya.
+    """
+    versi = versi_schema(conn)
+    for versi_baru, langkah in migrations:
+        if versi_baru <= versi:
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            versi = versi_schema(conn)
+            if versi_baru > versi:
+                for sql in langkah:
+                    if callable(sql):
+                        sql(conn)
+                    else:
+                        conn.execute(sql)
+                conn.execute(f'PRAGMA main.user_version = {versi_baru}')
+                versi = versi_baru
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return versi
+
+# Setiap shard memakai rentang id transaksi sendiri (shard i mulai dari
+# i << 40), sehingga id tetap unik lintas shard dan (tanggal, id) tetap
+# urutan total untuk merge laporan admin dan cursor keyset.
+ID_PER_SHARD = 1 << 40
+
+# Skema file shard: hanya tabel data per user, dalam bentuk terbaru MIGRATIONS.
+# Migrasi yang mengubah transaksi/ringkasan_bulanan juga perlu entri di sini.
+SHARD_MIGRATIONS = [
+    (1, [
+        """CREATE TABLE IF NOT EXISTS transaksi (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            tanggal TEXT NOT NULL,
+            tipe TEXT NOT NULL,
+            kategori TEXT NOT NULL,
+            jumlah INTEGER NOT NULL,  -- sen, lihat uang.py
+            catatan TEXT
+        )""",
+        'CREATE INDEX IF NOT EXISTS idx_transaksi_user_tanggal ON transaksi (user_id, tanggal, id)',
+        'CREATE INDEX IF NOT EXISTS idx_transaksi_user_tipe_tanggal ON transaksi (user_id, tipe, tanggal, jumlah)',
+        'CREATE INDEX IF NOT EXISTS idx_transaksi_tanggal ON transaksi (tanggal, id)',
+        'CREATE INDEX IF NOT EXISTS idx_transaksi_tipe_kategori ON transaksi (tipe, kategori, jumlah)',
+        _TABEL_RINGKASAN_SQL % 'INTEGER',
+        _INDEX_RINGKASAN_SQL,
+        *_TRIGGER_RINGKASAN_SQL,
+        # Jumlah shard saat file dibuat; pemetaan user_id % N hanya benar
+        # selama DB_SHARDS tidak berubah (pindahkan data dengan migrate_db.py --shard)
+        'CREATE TABLE IF NOT EXISTS info_shard (indeks INTEGER NOT NULL, jumlah INTEGER NOT NULL)',
+    ]),
+    (2, [
+        *_FTS_SQL,
+        _ISI_FTS_SQL,
+    ]),
+    (3, [
+        *_ANGGARAN_SQL,
+    ]),
+    (4, [
+        *_LOG_PERUBAHAN_SQL,
+    ]),
+    (5, [
+        *_BERULANG_SQL,
+        # Rentang id sendiri per shard, seperti transaksi (lihat init_shard)
+        f"""INSERT INTO sqlite_sequence (name, seq)
+        SELECT 'transaksi_berulang', indeks * {ID_PER_SHARD} FROM info_shard
+        WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'transaksi_berulang')""",
+    ]),
+    (6, [
+        *_SALDO_SQL,
+        _ISI_SALDO_SQL,
+    ]),
+]
+
+SHARD_SCHEMA_VERSION = SHARD_MIGRATIONS[-1][0]
+
+
+def init_shard(cek_utama=True):
+    """Membuat/upgrade file shard dan memastikan DB_SHARDS cocok dengan data.
+
+    Mengembalikan True jika ada skema shard yang berubah.
+    """
+    berubah = False
+    if cek_utama:
+        _cek_utama_kosong()
+    for i, conn in enumerate(koneksi_shard()):
+        versi_lama = versi_schema(conn)
+        berubah = upgrade_schema(conn, SHARD_MIGRATIONS) != versi_lama or berubah
+        with conn:
+            info = conn.execute('SELECT indeks, jumlah FROM info_shard').fetchone()
+            if info is None:
+                conn.execute('INSERT INTO info_shard (indeks, jumlah) VALUES (?, ?)', (i, DB_SHARDS))
+                for tabel in ('transaksi', 'transaksi_berulang'):
+                    conn.execute("INSERT INTO sqlite_sequence (name, seq) SELECT ?, ? "
+                                 "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)",
+                                 (tabel, i * ID_PER_SHARD, tabel))
+            else:
+                _cek_info_shard(i, info)
+    return berubah
+
+def _cek_utama_kosong():
+    if get_connection().execute('SELECT 1 FROM transaksi LIMIT 1').fetchone():
+        raise RuntimeError(f'{DB_NAME} masih berisi transaksi; pindahkan dulu dengan '
+                           f'python migrate_db.py --shard {DB_SHARDS}')
+
+def _cek_info_shard(indeks, info):
+    if info is None or tuple(info) != (indeks, DB_SHARDS):
+        dibuat = f'dibuat untuk shard {info[0]} dari {info[1]}' if info else 'belum diinisialisasi'
+        raise RuntimeError(f'{path_shard(indeks)} {dibuat}, bukan {indeks} dari {DB_SHARDS}; '
+                           f'jalankan python migrate_db.py --shard {DB_SHARDS}')
+
+# Ukuran halaman default untuk daftar transaksi / laporan.
+DEFAULT_PER_PAGE = 50
+
+def encode_cursor(row):
+    """Membuat cursor keyset 'YYYY-MM-DD_id' dari satu baris transaksi."""
+    return f"{row['tanggal']}_{row['id']}"
+
+def decode_cursor(cursor):
+    """Kebalikan encode_cursor; mengembalikan None jika cursor tidak valid."""
+    if not cursor:
+        return None
+    tanggal, _, id_transaksi = cursor.rpartition('_')
     try:
-        c.execute('SELECT user_id FROM transaksi LIMIT 1')
-    except sqlite3.OperationalError:
-         c.execute('ALTER TABLE transaksi ADD COLUMN user_id INTEGER')
-         
-    conn.commit()
-    conn.close()
-
-def tambah_transaksi(user_id, tanggal, tipe, kategori, jumlah, catatan):
-    """Menambahkan transaksi baru."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''
+        return tanggal, int(id_transaksi)
+    except ValueError:
+        return None
+
+def _ambil_halaman(conn, query, params, per_page, after=None, before=None, alias=''):
+    """Menjalankan query (tanpa ORDER BY) sebagai satu halaman keyset.
+
+    Urutan tampilan adalah tanggal DESC, id DESC. `after` mengambil halaman
+    berikutnya (baris lebih lama dari cursor), `before` halaman sebelumnya.
+    Hanya per_page + 1 baris yang dibaca, berapapun total datanya (per
+    shard jika conn None, lalu di-merge).
+    """
+    tanggal, id_ = f'{alias}tanggal', f'{alias}id'
+    after, before = decode_cursor(after), decode_cursor(before)
+    params = list(params)
+
+    if before:
+        query += f' AND ({tanggal}, {id_}) > (?, ?) ORDER BY {tanggal} ASC, {id_} ASC LIMIT ?'
+        rows = _baca_urut(conn, query, params + [*before, per_page + 1], per_page + 1, naik=True)
+        ada_lagi = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return {
+            'transaksi': rows,
+            'prev_cursor': encode_cursor(rows[0]) if ada_lagi else None,
+            'next_cursor': encode_cursor(rows[-1]) if rows else None,
+        }
+
+    if after:
+        query += f' AND ({tanggal}, {id_}) < (?, ?)'
+        params.extend(after)
+    query += f' ORDER BY {tanggal} DESC, {id_} DESC LIMIT ?'
+    rows = _baca_urut(conn, query, params + [per_page + 1], per_page + 1)
+    ada_lagi = len(rows) > per_page
+    rows = rows[:per_page]
+    return {
+        'transaksi': rows,
+        'prev_cursor': encode_cursor(rows[0]) if after and rows else None,
+        'next_cursor': encode_cursor(rows[-1]) if ada_lagi else None,
+    }
+
+def _fetchall(conn, query, params=()):
+    return conn.execute(query, params).fetchall()
+
+# Kunci merge (tanggal, id); atribut Baris dibaca tanpa frame Python
+_KUNCI_URUT = attrgetter('tanggal', 'id')
+
+def _gabung_urut(hasil_shard, limit=None, naik=False):
+    """Merge hasil per shard yang masing-masing sudah urut (tanggal, id)
+    DESC (atau ASC jika naik), dipotong ke `limit` baris."""
+    if len(hasil_shard) == 1:
+        return hasil_shard[0]
+    rows = heapq.merge(*hasil_shard, key=_KUNCI_URUT, reverse=not naik)
+    return list(islice(rows, limit))
+
+def _baca_urut(conn, query, params, limit=None, naik=False):
+    """Menjalankan query berurutan (tanggal, id) di conn, atau di semua shard
+    (conn None) lalu merge hasilnya."""
+    if conn is not None:
+        return conn.execute(query, params).fetchall()
+    return _gabung_urut(_sebar(_fetchall, query, params), limit, naik)
+
+def _filter_user_shard(kolom='u.id'):
+    """Kondisi SQL yang membatasi baris users ke user milik shard koneksi
+    (dijalankan per shard via _sebar); kosong tanpa sharding."""
+    if DB_SHARDS <= 1:
+        return ''
+    return f' AND {kolom} % (SELECT jumlah FROM info_shard) = (SELECT indeks FROM info_shard)'
+
+def _rentang_bulan(bulan, tahun):
+    """Mengubah (bulan, tahun) menjadi rentang tanggal [awal, akhir) yang bisa memakai index."""
+    bulan, tahun = int(bulan), int(tahun)
+    awal = f"{tahun:04d}-{bulan:02d}-01"
+    if bulan == 12:
+        akhir = f"{tahun + 1:04d}-01-01"
+    else:
+        akhir = f"{tahun:04d}-{bulan + 1:02d}-01"
+    return awal, akhir
+
+def _tulis(user_id, sql, params, tunggu=True):
+    """Menjalankan satu perintah tulis milik user_id lalu invalidasi cache user itu.
+
+    Jika antrian_tulis aktif, perintah digabung ke group commit thread
+    penulis file database user itu. tunggu=False mengembalikan Future yang
+    selesai setelah commit (tanpa antrian: Future yang sudah selesai);
+    selain itu menunggu dan mengembalikan rowcount.
+    """
+    if antrian_tulis.aktif():
+        path = path_shard(shard_untuk(user_id)) if DB_SHARDS > 1 else DB_NAME
+        future = antrian_tulis.kirim(path, lambda: get_connection(user_id), sql, params,
+                                     setelah=lambda: cache.invalidate(user_id))
+        return future.result() if tunggu else future
+    conn = get_connection(user_id)
+    with conn:
+        jumlah = conn.execute(sql, params).rowcount
+    cache.invalidate(user_id)
+    if tunggu:
+        return jumlah
+    future = Future()
+    future.set_result(jumlah)
+    return future
+
+def tambah_transaksi(user_id, tanggal, tipe, kategori, jumlah, catatan, tunggu=True):
+    """Menambahkan transaksi baru (jumlah dalam sen)."""
+    return _tulis(user_id, '''
         INSERT INTO transaksi (user_id, tanggal, tipe, kategori, jumlah, catatan)
         VALUES (?, ?, ?, ?, ?, ?)
-    ''', (user_id, tanggal, tipe, kategori, jumlah, catatan))
-    conn.commit()
-    conn.close()
+    ''', (user_id, tanggal, tipe, kategori, jumlah, catatan), tunggu)
+
+
+def tambah_transaksi_id(user_id, tanggal, tipe, kategori, jumlah, catatan):
+    """Seperti tambah_transaksi, tetapi mengembalikan id transaksi baru.
+
+    Selalu ditulis langsung, tidak lewat antrian_tulis: group commit hanya
+    mengembalikan rowcount.
+    """
+    conn = get_connection(user_id)
+    with conn:
+        id_transaksi = conn.execute('''
+            INSERT INTO transaksi (user_id, tanggal, tipe, kategori, jumlah, catatan)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, tanggal, tipe, kategori, jumlah, catatan)).lastrowid
+    cache.invalidate(user_id)
+    return id_transaksi
+
 
+def tambah_transaksi_bulk(user_id, rows):
+    """Menambahkan banyak transaksi sekaligus dalam satu transaksi database.
 
+    rows: iterable (tanggal, tipe, kategori, jumlah sen, catatan), sudah divalidasi.
+    Mengembalikan jumlah baris yang ditambahkan.
+    """
+    conn = get_connection(user_id)
+    with conn:
+        cursor = conn.executemany('''
+            INSERT INTO transaksi (user_id, tanggal, tipe, kategori, jumlah, catatan)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', ((user_id, *row) for row in rows))
+    cache.invalidate(user_id)
+    return cursor.rowcount
 
-def tambah_user(username, password):
-    """Menambahkan user baru."""
+def tambah_user(username, password, role='user'):
+    """Menambahkan user baru (role: 'user' atau 'admin')."""
+    conn = get_connection()
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('INSERT INTO users (username, password) VALUES (?, ?)', (username, password))
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute('INSERT INTO users (username, password, role) VALUES (?, ?, ?)',
+                         (username, password, role))
+        cache.invalidate()
         return True
     except sqlite3.IntegrityError:
         return False
 
 def cek_user(username):
     """Mengambil data user berdasarkan username."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE username = ?', (username,))
-    user = c.fetchone()
-    conn.close()
-    return user
+    conn = get_connection()
+    return conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
 
 def update_password(user_id, new_password):
     """Update password user."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('UPDATE users SET password = ? WHERE id = ?', (new_password, user_id))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        conn.execute('UPDATE users SET password = ? WHERE id = ?', (new_password, user_id))
 
 def hapus_user(user_id):
     """Hapus user dan semua transaksinya."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    # Hapus transaksi user dulu
-    c.execute('DELETE FROM transaksi WHERE user_id = ?', (user_id,))
-    # Hapus user
-    c.execute('DELETE FROM users WHERE id = ?', (user_id,))
-    conn.commit()
-    conn.close()
+    # Koneksi shard melihat tabel users lewat DB_NAME yang di-ATTACH
+    conn = get_connection(user_id)
+    with conn:
+        # Hapus transaksi, aturan berulang, dan anggaran user dulu
+        conn.execute('DELETE FROM transaksi WHERE user_id = ?', (user_id,))
+        conn.execute('DELETE FROM transaksi_berulang WHERE user_id = ?', (user_id,))
+        conn.execute('DELETE FROM anggaran WHERE user_id = ?', (user_id,))
+        conn.execute('DELETE FROM saldo_bulanan WHERE user_id = ?', (user_id,))
+        # Hapus user
+        conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
+    cache.invalidate(user_id)
 
 def update_user(user_id, username, password=None):
-    """Update data user (username dan/atau password)."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    if password:
-        c.execute('UPDATE users SET username = ?, password = ? WHERE id = ?', (username, password, user_id))
-    else:
-        c.execute('UPDATE users SET username = ? WHERE id = ?', (username, user_id))
-    conn.commit()
-    conn.close()
+    """Update data user (username dan/atau password).
+
+    Mengembalikan False jika username sudah dipakai user lain.
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            if password:
+                conn.execute('UPDATE users SET username = ?, password = ? WHERE id = ?', (username, password, user_id))
+            else:
+                conn.execute('UPDATE users SET username = ? WHERE id = ?', (username, user_id))
+    except sqlite3.IntegrityError:
+        return False
+    cache.invalidate(user_id)
+    return True
 
 def get_user_by_id(user_id):
     """Mengambil data user berdasarkan ID."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-    user = c.fetchone()
-    conn.close()
-    return user
+    conn = get_connection()
+    return conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
 
+def get_identitas_user(user_id):
+    """Mengambil id, username, dan role user untuk login_required.
 
-def ambil_semua_transaksi(user_id, start_date=None, end_date=None, tipe=None):
-    """Mengambil data transaksi dengan opsi filter tanggal dan tipe."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row 
-    c = conn.cursor()
-    
-    query = 'SELECT * FROM transaksi WHERE user_id = ?'
+    Sengaja tidak di-cache: dengan backend per proses, user yang dihapus atau
+    diturunkan dari admin di satu worker tetap berhak di worker lain sampai
+    TTL. Ini satu lookup primary key.
+    """
+    conn = get_connection()
+    return conn.execute('SELECT id, username, role FROM users WHERE id = ?', (user_id,)).fetchone()
+
+
+def _query_transaksi(user_id, start_date=None, end_date=None, tipe=None, kolom='*'):
+    """Menyusun query + params daftar transaksi satu user (tanpa ORDER BY)."""
+    query = f'SELECT {kolom} FROM transaksi WHERE user_id = ?'
     params = [user_id]
     
     if start_date:
@@ -131,208 +944,678 @@ def ambil_semua_transaksi(user_id, start_date=None, end_date=None, tipe=None):
         query += " AND tipe = ?"
         params.append(tipe)
         
+    return query, params
+
+def ambil_semua_transaksi(user_id, start_date=None, end_date=None, tipe=None):
+    """Mengambil data transaksi dengan opsi filter tanggal dan tipe."""
+    conn = get_connection(user_id)
+    query, params = _query_transaksi(user_id, start_date, end_date, tipe)
     query += ' ORDER BY tanggal DESC, id DESC'
-    
-    c.execute(query, params)
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    return conn.execute(query, params).fetchall()
+
+def ambil_transaksi_halaman(user_id, start_date=None, end_date=None, tipe=None,
+                            per_page=DEFAULT_PER_PAGE, after=None, before=None, kolom='*'):
+    """Mengambil satu halaman transaksi (keyset pada tanggal, id).
+
+    after/before adalah cursor dari halaman sebelumnya (lihat _ambil_halaman).
+    kolom membatasi kolom yang dibaca (harus memuat tanggal dan id), mis.
+    agar baris bisa langsung di-serialisasi oleh API tanpa diproyeksikan lagi.
+    """
+    conn = get_connection(user_id)
+    query, params = _query_transaksi(user_id, start_date, end_date, tipe, kolom)
+    return _ambil_halaman(conn, query, params, per_page, after, before)
+
+def saldo_berjalan(user_id, rows):
+    """Saldo user (sen) tepat setelah setiap transaksi di rows, dalam urutan
+    rows: semua pemasukan dikurangi semua pengeluaran sampai (tanggal, id)
+    baris itu, termasuk transaksi yang tidak lolos filter halaman.
+
+    Per bulan yang muncul di rows: saldo awal bulan dari checkpoint
+    saldo_bulanan (satu lookup index), neto bulan itu sebelum tanggal baris
+    tertua dari index covering, lalu baris dari tanggal itu sampai baris
+    terbaru. Biayanya sebanding dengan ukuran halaman (dan isi bulannya),
+    bukan dengan panjang riwayat.
+    """
+    conn = get_connection(user_id)
+    per_bulan = {}
+    for row in rows:
+        per_bulan.setdefault(row['tanggal'][:7], []).append((row['tanggal'], row['id']))
+    saldo = {}
+    for bulan, kunci in per_bulan.items():
+        (tanggal_awal, _), (tanggal_akhir, id_akhir) = min(kunci), max(kunci)
+        tahun, bulan_ = int(bulan[:4]), int(bulan[5:7])
+        jalan = conn.execute('''
+            SELECT COALESCE((
+                SELECT saldo FROM saldo_bulanan
+                WHERE user_id = ? AND (tahun, bulan) < (?, ?)
+                ORDER BY tahun DESC, bulan DESC LIMIT 1), 0)
+            + COALESCE((
+                SELECT SUM(CASE tipe WHEN 'Pemasukan' THEN jumlah ELSE -jumlah END) FROM transaksi
+                WHERE user_id = ? AND tipe IN ('Pemasukan', 'Pengeluaran')
+                  AND tanggal >= ? AND tanggal < ?), 0)
+        ''', (user_id, tahun, bulan_, user_id, bulan + '-01', tanggal_awal)).fetchone()[0]
+        dicari = set(kunci)
+        for id_, tanggal, tipe, jumlah in conn.execute('''
+            SELECT id, tanggal, tipe, jumlah FROM transaksi
+            WHERE user_id = ? AND tanggal >= ? AND (tanggal, id) <= (?, ?)
+            ORDER BY tanggal, id
+        ''', (user_id, tanggal_awal, tanggal_akhir, id_akhir)):
+            if tipe == 'Pemasukan':
+                jalan += jumlah
+            elif tipe == 'Pengeluaran':
+                jalan -= jumlah
+            if (tanggal, id_) in dicari:
+                saldo[id_] = jalan
+    return [saldo[row['id']] for row in rows]
+
+# Batas jumlah kata dalam satu pencarian
+MAX_KATA_CARI = 8
+# Relevansi (makin kecil makin relevan): catatan lebih penting dari
+# kategori, kolom pengguna hanya untuk filter
+SKOR_CARI = 'bm25(transaksi_fts, 1.0, 0.5, 0.0)'
+
+def ekspresi_cari(kata, user_id=None):
+    """Mengubah teks pencarian bebas menjadi query FTS5 yang aman.
 
+    Setiap kata menjadi prefix "kata"* dan semuanya wajib ada di catatan
+    atau kategori; sintaks FTS5 dari input tidak pernah diteruskan.
+    Mengembalikan None jika tidak ada kata yang bisa dicari.
+    """
+    token = re.findall(r'\w+', kata or '')[:MAX_KATA_CARI]
+    if not token:
+        return None
+    ekspresi = '{catatan kategori} : (' + ' AND '.join(f'"{t}"*' for t in token) + ')'
+    if user_id:
+        ekspresi = f'pengguna : "u{int(user_id)}" AND {ekspresi}'
+    return ekspresi
+
+def cari_transaksi(kata, user_id=None, start_date=None, end_date=None, tipe=None,
+                   per_page=DEFAULT_PER_PAGE, after=None, before=None):
+    """Mencari transaksi lewat index FTS5 atas catatan dan kategori, urut
+    relevansi (bm25) lalu terbaru. Tanpa user_id mencari di semua user
+    (laporan admin, hasil di-merge dari semua shard).
+
+    Hasil berbentuk sama dengan _ambil_halaman, tetapi cursor berupa offset
+    karena urutan relevansi tidak punya kunci keyset: `after` adalah offset
+    awal halaman berikutnya, `before` offset awal halaman yang sedang dilihat.
+    """
+    ekspresi = ekspresi_cari(kata, user_id)
+    if ekspresi is None:
+        return {'transaksi': [], 'prev_cursor': None, 'next_cursor': None}
+    if after:
+        offset = _offset_cursor(after)
+    else:
+        offset = max(0, _offset_cursor(before) - per_page)
+
+    filter_sql, params = '', []
+    if start_date:
+        filter_sql += ' AND t.tanggal >= ?'
+        params.append(start_date)
+    if end_date:
+        filter_sql += ' AND t.tanggal <= ?'
+        params.append(end_date)
+    if tipe and tipe != 'Semua':
+        filter_sql += ' AND t.tipe = ?'
+        params.append(tipe)
+
+    if filter_sql:
+        query = f'''
+            SELECT t.*, u.username, {SKOR_CARI} AS skor
+            FROM transaksi_fts
+            JOIN transaksi t ON t.id = transaksi_fts.rowid
+            LEFT JOIN users u ON t.user_id = u.id
+            WHERE transaksi_fts MATCH ?{filter_sql}
+            ORDER BY skor, t.id DESC LIMIT ? OFFSET ?
+        '''
+    else:
+        # Tanpa filter kolom transaksi: urutkan di index FTS saja, lalu baca
+        # baris tabel transaksi untuk halaman ini saja
+        query = f'''
+            SELECT t.*, u.username, f.skor
+            FROM (SELECT rowid, {SKOR_CARI} AS skor FROM transaksi_fts
+                  WHERE transaksi_fts MATCH ? ORDER BY skor, rowid DESC LIMIT ? OFFSET ?) f
+            JOIN transaksi t ON t.id = f.rowid
+            LEFT JOIN users u ON t.user_id = u.id
+            ORDER BY f.skor, t.id DESC
+        '''
+    params = [ekspresi] + params
+
+    if user_id or DB_SHARDS <= 1:
+        rows = get_connection(user_id).execute(query, params + [per_page + 1, offset]).fetchall()
+    else:
+        # Setiap shard mengembalikan kandidat sampai akhir halaman ini, lalu di-merge
+        hasil_shard = _sebar(_fetchall, query, params + [offset + per_page + 1, 0])
+        rows = heapq.merge(*hasil_shard, key=lambda row: (row['skor'], -row['id']))
+        rows = list(islice(rows, offset, offset + per_page + 1))
+    ada_lagi = len(rows) > per_page
+    return {
+        'transaksi': rows[:per_page],
+        'prev_cursor': str(offset) if offset else None,
+        'next_cursor': str(offset + per_page) if ada_lagi else None,
+    }
+
+def _offset_cursor(cursor):
+    try:
+        return max(0, int(cursor or 0))
+    except ValueError:
+        return 0
+
+def rebuild_index_cari():
+    """Membangun ulang transaksi_fts dari tabel transaksi (di setiap shard)."""
+    def bangun(conn):
+        with conn:
+            conn.execute("INSERT INTO transaksi_fts (transaksi_fts) VALUES ('delete-all')")
+            conn.execute(_ISI_FTS_SQL)
+    _sebar(bangun)
+
+@cache.cached(per_user=True)
 def ambil_transaksi_limit(user_id, limit=5, bulan=None, tahun=None):
     """Mengambil n transaksi terbaru, opsional difilter per bulan."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
+    conn = get_connection(user_id)
     
     query = 'SELECT * FROM transaksi WHERE user_id = ?'
     params = [user_id]
     
     if bulan and tahun:
-        query += " AND strftime('%m', tanggal) = ? AND strftime('%Y', tanggal) = ?"
-        bulan_str = f"{int(bulan):02d}"
-        params.extend([bulan_str, str(tahun)])
+        query += " AND tanggal >= ? AND tanggal < ?"
+        params.extend(_rentang_bulan(bulan, tahun))
         
     query += ' ORDER BY tanggal DESC, id DESC LIMIT ?'
     params.append(limit)
     
-    c.execute(query, params)
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    return conn.execute(query, params).fetchall()
 
-def hapus_transaksi(id_transaksi, user_id):
+def hapus_transaksi(id_transaksi, user_id, tunggu=True):
     """Menghapus transaksi berdasarkan ID dan user_id."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('DELETE FROM transaksi WHERE id = ? AND user_id = ?', (id_transaksi, user_id))
-    conn.commit()
-    conn.close()
+    return _tulis(user_id, 'DELETE FROM transaksi WHERE id = ? AND user_id = ?',
+                  (id_transaksi, user_id), tunggu)
+
+def hapus_transaksi_banyak(ids, user_id, tunggu=True):
+    """Menghapus banyak transaksi milik user dalam satu perintah (satu
+    commit); id milik user lain diabaikan. Mengembalikan jumlah yang terhapus."""
+    ids = [int(i) for i in ids]
+    return _tulis(user_id, f'DELETE FROM transaksi WHERE user_id = ? AND id IN ({",".join("?" * len(ids))})',
+                  (user_id, *ids), tunggu)
 
 def ambil_satu_transaksi(id_transaksi, user_id):
     """Mengambil satu data transaksi berdasarkan ID dan user_id."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM transaksi WHERE id = ? AND user_id = ?', (id_transaksi, user_id))
-    row = c.fetchone()
-    conn.close()
-    return row
-
-def edit_transaksi(id_transaksi, user_id, tanggal, tipe, kategori, jumlah, catatan):
+    conn = get_connection(user_id)
+    return conn.execute('SELECT * FROM transaksi WHERE id = ? AND user_id = ?',
+                        (id_transaksi, user_id)).fetchone()
+
+def edit_transaksi(id_transaksi, user_id, tanggal, tipe, kategori, jumlah, catatan, tunggu=True):
     """Mengubah data transaksi yang sudah ada."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''
-        UPDATE transaksi 
+    return _tulis(user_id, '''
+        UPDATE transaksi
         SET tanggal = ?, tipe = ?, kategori = ?, jumlah = ?, catatan = ?
         WHERE id = ? AND user_id = ?
-    ''', (tanggal, tipe, kategori, jumlah, catatan, id_transaksi, user_id))
-    conn.commit()
-    conn.close()
+    ''', (tanggal, tipe, kategori, jumlah, catatan, id_transaksi, user_id), tunggu)
 
 def get_available_months(user_id):
     """Mengambil daftar bulan dan tahun yang tersedia dari data transaksi."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row  
-    c = conn.cursor()
-    # Mengambil tahun dan bulan unik dari kolom tanggal (format YYYY-MM-DD)
-    c.execute('''
-        SELECT DISTINCT strftime('%Y', tanggal) as tahun, strftime('%m', tanggal) as bulan 
-        FROM transaksi 
+    conn = get_connection(user_id)
+    # Bulan yang punya transaksi = bulan yang punya baris rollup (trigger
+    # menghapus baris yang jumlah_transaksi-nya 0). Primary key
+    # (user_id, tahun, bulan, ...) sudah urut, jadi GROUP BY dan ORDER BY
+    # tidak butuh sort. Format 'YYYY'/'MM' sama seperti strftime dulu.
+    return conn.execute('''
+        SELECT printf('%04d', tahun) AS tahun, printf('%02d', bulan) AS bulan
+        FROM ringkasan_bulanan
         WHERE user_id = ?
-        ORDER BY tahun DESC, bulan DESC
-    ''', (user_id,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
+        GROUP BY ringkasan_bulanan.tahun, ringkasan_bulanan.bulan
+        ORDER BY ringkasan_bulanan.tahun DESC, ringkasan_bulanan.bulan DESC
+    ''', (user_id,)).fetchall()
+
+def hitung_agregasi(user_id=None, start_date=None, end_date=None, tipe=None, bulan=None, tahun=None,
+                    cari=None):
+    """Menghitung pemasukan, pengeluaran, saldo (sen), jumlah transaksi, dan
+    rincian per kategori dalam satu query GROUP BY.
+
+    Semua filter opsional: tanpa user_id berarti semua user (admin),
+    start_date/end_date inklusif seperti ambil_semua_transaksi,
+    bulan+tahun membatasi ke satu bulan kalender, dan cari membatasi ke
+    hasil cari_transaksi dengan teks yang sama.
+    """
+    ekspresi = ekspresi_cari(cari, user_id)
+    if not start_date and not end_date and not ekspresi:
+        # Filter selaras batas bulan: cukup baca rollup ringkasan_bulanan
+        query = '''
+            SELECT tipe, kategori, SUM(total) AS total, SUM(jumlah_transaksi) AS n
+            FROM ringkasan_bulanan WHERE 1=1
+        '''
+        params = []
+        if user_id:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        if bulan and tahun:
+            query += " AND tahun = ? AND bulan = ?"
+            params.extend([int(tahun), int(bulan)])
+        if tipe and tipe != 'Semua':
+            query += " AND tipe = ?"
+            params.append(tipe)
+        query += ' GROUP BY tipe, kategori'
+        return _susun_agregasi(_agregasi_per_shard(user_id, query, params))
+
+    query = 'SELECT tipe, kategori, SUM(jumlah) AS total, COUNT(*) AS n FROM transaksi WHERE 1=1'
+    params = []
+
+    if user_id:
+        query += " AND user_id = ?"
+        params.append(user_id)
+
+    if bulan and tahun:
+        query += " AND tanggal >= ? AND tanggal < ?"
+        params.extend(_rentang_bulan(bulan, tahun))
+
+    if start_date:
+        query += " AND tanggal >= ?"
+        params.append(start_date)
+
+    if end_date:
+        query += " AND tanggal <= ?"
+        params.append(end_date)
+
+    if tipe and tipe != 'Semua':
+        query += " AND tipe = ?"
+        params.append(tipe)
 
+    if ekspresi:
+        query += " AND id IN (SELECT rowid FROM transaksi_fts WHERE transaksi_fts MATCH ?)"
+        params.append(ekspresi)
+
+    query += ' GROUP BY tipe, kategori'
+    return _susun_agregasi(_agregasi_per_shard(user_id, query, params))
+
+def _agregasi_per_shard(user_id, query, params):
+    """Baris (tipe, kategori, total, n) dari shard user_id, atau dari semua
+    shard (dijumlahkan per tipe dan kategori) jika user_id kosong."""
+    if user_id:
+        return get_connection(user_id).execute(query, params)
+    hasil_shard = _sebar(_fetchall, query, params)
+    if len(hasil_shard) == 1:
+        return hasil_shard[0]
+    gabungan = {}
+    for rows in hasil_shard:
+        for row in rows:
+            kunci = (row['tipe'], row['kategori'])
+            total, n = gabungan.get(kunci, (0, 0))
+            gabungan[kunci] = (total + row['total'], n + row['n'])
+    return [{'tipe': tipe, 'kategori': kategori, 'total': total, 'n': n}
+            for (tipe, kategori), (total, n) in sorted(gabungan.items())]
+
+def _susun_agregasi(rows):
+    """Menyusun baris (tipe, kategori, total, n) menjadi dict hasil hitung_agregasi."""
+    hasil = {'pemasukan': 0, 'pengeluaran': 0, 'jumlah_transaksi': 0, 'per_kategori': []}
+    for row in rows:
+        if row['tipe'] == 'Pemasukan':
+            hasil['pemasukan'] += row['total']
+        elif row['tipe'] == 'Pengeluaran':
+            hasil['pengeluaran'] += row['total']
+        hasil['jumlah_transaksi'] += row['n']
+        hasil['per_kategori'].append({
+            'tipe': row['tipe'],
+            'kategori': row['kategori'],
+            'total': row['total'],
+            'jumlah_transaksi': row['n'],
+        })
+    hasil['saldo'] = hasil['pemasukan'] - hasil['pengeluaran']
+    return hasil
+
+@cache.cached(per_user=True)
 def hitung_ringkasan(user_id, bulan=None, tahun=None):
     """Menghitung total pemasukan, pengeluaran, dan saldo (opsional: per bulan)."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    query_pemasukan = "SELECT SUM(jumlah) FROM transaksi WHERE user_id = ? AND tipe = 'Pemasukan'"
-    query_pengeluaran = "SELECT SUM(jumlah) FROM transaksi WHERE user_id = ? AND tipe = 'Pengeluaran'"
-    params = [user_id]
-    
-    if bulan and tahun:
-        filter_clause = " AND strftime('%m', tanggal) = ? AND strftime('%Y', tanggal) = ?"
-        query_pemasukan += filter_clause
-        query_pengeluaran += filter_clause
-        # Format bulan menjadi 2 digit string (misal '01', '12')
-        bulan_str = f"{int(bulan):02d}"
-        params.extend([bulan_str, str(tahun)])
-
-    c.execute(query_pemasukan, params)
-    result_pemasukan = c.fetchone()
-    pemasukan = result_pemasukan[0] if result_pemasukan and result_pemasukan[0] else 0
-    
-    c.execute(query_pengeluaran, params)
-    result_pengeluaran = c.fetchone()
-    pengeluaran = result_pengeluaran[0] if result_pengeluaran and result_pengeluaran[0] else 0
-    
-    conn.close()
-    
-    saldo = pemasukan - pengeluaran
+    agregasi = hitung_agregasi(user_id, bulan=bulan, tahun=tahun)
     return {
-        'pemasukan': pemasukan,
-        'pengeluaran': pengeluaran,
-        'saldo': saldo
+        'pemasukan': agregasi['pemasukan'],
+        'pengeluaran': agregasi['pengeluaran'],
+        'saldo': agregasi['saldo']
     }
 
+def simpan_anggaran(user_id, kategori, batas, tunggu=True):
+    """Menetapkan batas pengeluaran bulanan (sen) untuk satu kategori."""
+    return _tulis(user_id, '''
+        INSERT INTO anggaran (user_id, kategori, batas) VALUES (?, ?, ?)
+        ON CONFLICT (user_id, kategori) DO UPDATE SET batas = excluded.batas
+    ''', (user_id, kategori, batas), tunggu)
+
+def hapus_anggaran(user_id, kategori, tunggu=True):
+    """Menghapus anggaran satu kategori (beserta peringatannya)."""
+    return _tulis(user_id, 'DELETE FROM anggaran WHERE user_id = ? AND kategori = ?',
+                  (user_id, kategori), tunggu)
+
+@cache.cached(per_user=True)
+def status_anggaran(user_id, bulan, tahun):
+    """Batas, pemakaian, dan sisa setiap anggaran user di satu bulan (sen).
+
+    Pemakaian diambil dari ringkasan_bulanan, satu lookup per kategori,
+    tidak peduli berapa banyak transaksinya.
+    """
+    conn = get_connection(user_id)
+    rows = conn.execute('''
+        SELECT a.kategori, a.batas, COALESCE(r.total, 0) AS terpakai
+        FROM anggaran a
+        LEFT JOIN ringkasan_bulanan r
+          ON r.user_id = a.user_id AND r.tahun = ? AND r.bulan = ?
+         AND r.tipe = 'Pengeluaran' AND r.kategori = a.kategori
+        WHERE a.user_id = ?
+        ORDER BY a.kategori
+    ''', (int(tahun), int(bulan), user_id))
+    return [{
+        'kategori': row['kategori'],
+        'batas': row['batas'],
+        'terpakai': row['terpakai'],
+        'sisa': row['batas'] - row['terpakai'],
+        'melebihi': row['terpakai'] > row['batas'],
+    } for row in rows]
+
+def ambil_peringatan_anggaran(user_id, bulan, tahun, kategori=None):
+    """Kategori yang melebihi anggaran di satu bulan, sudah dihitung saat
+    transaksi ditulis (opsional: satu kategori saja)."""
+    query = '''
+        SELECT kategori, terpakai, batas FROM peringatan_anggaran
+        WHERE user_id = ? AND tahun = ? AND bulan = ?
+    '''
+    params = [user_id, int(tahun), int(bulan)]
+    if kategori is not None:
+        query += ' AND kategori = ?'
+        params.append(kategori)
+    return get_connection(user_id).execute(query + ' ORDER BY kategori', params).fetchall()
+
+FREKUENSI_BERULANG = ('harian', 'mingguan', 'bulanan')
+
+# Jumlah transaksi yang dibuat per commit oleh materialisasi_berulang
+UKURAN_BATCH_BERULANG = 1000
+
+def kejadian_berikutnya(frekuensi, mulai, tanggal):
+    """Kejadian setelah `tanggal` (date) untuk aturan yang dimulai `mulai`.
+
+    Bulanan memakai tanggal dari `mulai`, dipotong ke akhir bulan yang lebih
+    pendek (mulai 31 Jan: 28/29 Feb, 31 Mar, 30 Apr, ...).
+    """
+    if frekuensi == 'harian':
+        return tanggal + timedelta(days=1)
+    if frekuensi == 'mingguan':
+        return tanggal + timedelta(days=7)
+    tahun, bulan = divmod(tanggal.year * 12 + tanggal.month, 12)
+    bulan += 1
+    return date(tahun, bulan, min(mulai.day, calendar.monthrange(tahun, bulan)[1]))
+
+def tambah_transaksi_berulang(user_id, frekuensi, mulai, tipe, kategori, jumlah, catatan, selesai=None):
+    """Menyimpan aturan transaksi berulang (jumlah dalam sen) lalu langsung
+    membuat kejadiannya yang sudah jatuh tempo. Mengembalikan id aturan."""
+    if frekuensi not in FREKUENSI_BERULANG:
+        raise ValueError(f'frekuensi harus salah satu dari {", ".join(FREKUENSI_BERULANG)}')
+    conn = get_connection(user_id)
+    with conn:
+        id_aturan = conn.execute('''
+            INSERT INTO transaksi_berulang
+                (user_id, frekuensi, mulai, selesai, berikutnya, tipe, kategori, jumlah, catatan)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, frekuensi, mulai, selesai, None if selesai and selesai < mulai else mulai,
+              tipe, kategori, jumlah, catatan)).lastrowid
+    materialisasi_berulang(user_id=user_id)
+    return id_aturan
+
+def ambil_transaksi_berulang(user_id):
+    """Semua aturan berulang milik user, urut waktu dibuat."""
+    return get_connection(user_id).execute(
+        'SELECT * FROM transaksi_berulang WHERE user_id = ? ORDER BY id', (user_id,)).fetchall()
+
+def hapus_transaksi_berulang(id_aturan, user_id, tunggu=True):
+    """Menghentikan aturan berulang; transaksi yang sudah dibuat tetap ada."""
+    return _tulis(user_id, 'DELETE FROM transaksi_berulang WHERE id = ? AND user_id = ?',
+                  (id_aturan, user_id), tunggu)
+
+def materialisasi_berulang(hari_ini=None, user_id=None, batch=UKURAN_BATCH_BERULANG):
+    """Membuat semua transaksi dari aturan berulang yang jatuh tempo sampai
+    hari_ini (default: hari ini), untuk semua user atau satu user saja.
+
+    Setiap batch (maksimal `batch` transaksi, dari aturan yang paling lama
+    tertunda) ditulis bersama kolom berikutnya dalam satu transaksi database,
+    sehingga aman dijalankan ulang atau bersamaan dari beberapa proses.
+    Tanpa yang jatuh tempo, biayanya satu lookup index per shard.
+
+    Mengembalikan dict: aturan dan transaksi yang diproses, durasi setiap
+    batch (detik), dan lag (detik dari tanggal kejadian tertua yang dibuat
+    sampai commit-nya; 0 jika tidak ada).
+    """
+    hari_ini = hari_ini or date.today().isoformat()
+    if user_id is not None:
+        hasil = [_materialisasi_shard(get_connection(user_id), hari_ini, user_id, batch)]
+    else:
+        hasil = _sebar(_materialisasi_shard, hari_ini, None, batch)
+    return {
+        'aturan': sum(h['aturan'] for h in hasil),
+        'transaksi': sum(h['transaksi'] for h in hasil),
+        'durasi_batch': [d for h in hasil for d in h['durasi_batch']],
+        'lag': max(h['lag'] for h in hasil),
+    }
+
+def _materialisasi_shard(conn, hari_ini, user_id, batch):
+    query = 'SELECT * FROM transaksi_berulang WHERE berikutnya <= ?'
+    params = [hari_ini]
+    if user_id is not None:
+        # Aturan satu user sedikit; urutannya tidak penting
+        query += ' AND user_id = ?'
+        params.append(user_id)
+    else:
+        query += ' ORDER BY berikutnya'
+    query += ' LIMIT ?'
+    hasil = {'aturan': 0, 'transaksi': 0, 'durasi_batch': [], 'lag': 0.0}
+    akhir = date.fromisoformat(hari_ini)
+    # Pemeriksaan tanpa lock tulis: kebanyakan putaran tidak menemukan apa pun
+    while conn.execute(query, (*params, 1)).fetchone():
+        mulai_batch = time.perf_counter()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Dibaca ulang di dalam transaksi tulis: proses lain yang baru
+            # commit sudah memajukan aturannya
+            baru, maju, users = [], [], set()
+            for aturan in conn.execute(query, (*params, batch)).fetchall():
+                mulai = date.fromisoformat(aturan['mulai'])
+                selesai = date.fromisoformat(aturan['selesai']) if aturan['selesai'] else date.max
+                tanggal = date.fromisoformat(aturan['berikutnya'])
+                while tanggal <= min(akhir, selesai) and len(baru) < batch:
+                    baru.append((aturan['user_id'], tanggal.isoformat(), aturan['tipe'],
+                                 aturan['kategori'], aturan['jumlah'], aturan['catatan']))
+                    tanggal = kejadian_berikutnya(aturan['frekuensi'], mulai, tanggal)
+                maju.append((None if tanggal > selesai else tanggal.isoformat(), aturan['id']))
+                users.add(aturan['user_id'])
+                if len(baru) >= batch:
+                    break
+            conn.executemany('''
+                INSERT INTO transaksi (user_id, tanggal, tipe, kategori, jumlah, catatan)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', baru)
+            conn.executemany('UPDATE transaksi_berulang SET berikutnya = ? WHERE id = ?', maju)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        for uid in users:
+            cache.invalidate(uid)
+        hasil['aturan'] += len(maju)
+        hasil['transaksi'] += len(baru)
+        hasil['durasi_batch'].append(time.perf_counter() - mulai_batch)
+        if baru:
+            tertua = datetime.combine(date.fromisoformat(min(row[1] for row in baru)), datetime.min.time())
+            hasil['lag'] = max(hasil['lag'], (datetime.now() - tertua).total_seconds())
+    return hasil
+
+@cache.cached(per_user=False)
 def admin_hitung_ringkasan():
     """Menghitung total ringkasan untuk admin (semua user)."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    c.execute("SELECT SUM(jumlah) FROM transaksi WHERE tipe = 'Pemasukan'")
-    pemasukan = c.fetchone()[0] or 0
-    
-    c.execute("SELECT SUM(jumlah) FROM transaksi WHERE tipe = 'Pengeluaran'")
-    pengeluaran = c.fetchone()[0] or 0
-    
-    conn.close()
-    
+    agregasi = hitung_agregasi()
     return {
-        'pemasukan': pemasukan,
-        'pengeluaran': pengeluaran,
-        'saldo': pemasukan - pengeluaran
+        'pemasukan': agregasi['pemasukan'],
+        'pengeluaran': agregasi['pengeluaran'],
+        'saldo': agregasi['saldo']
     }
 
-def admin_ambil_semua_transaksi():
-    """Mengambil semua transaksi gabungan dengan data user for admin."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    query = '''
+@cache.cached(per_user=False)
+def admin_ambil_transaksi_limit(limit=10):
+    """Mengambil n transaksi terbaru dari semua user untuk dashboard admin."""
+    return _baca_urut(None, '''
         SELECT t.*, u.username 
         FROM transaksi t
         LEFT JOIN users u ON t.user_id = u.id
         ORDER BY t.tanggal DESC, t.id DESC
-    '''
-    
-    c.execute(query)
-    rows = c.fetchall()
-    conn.close()
-    return rows
+        LIMIT ?
+    ''', (limit,), limit)
 
+@cache.cached(per_user=False)
 def admin_get_stats_per_user():
     """Mengambil statistik per user untuk chart admin."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    query = '''
+    query = f'''
         SELECT u.username,
-               COALESCE(SUM(CASE WHEN t.tipe = 'Pemasukan' THEN t.jumlah ELSE 0 END), 0) as pemasukan,
-               COALESCE(SUM(CASE WHEN t.tipe = 'Pengeluaran' THEN t.jumlah ELSE 0 END), 0) as pengeluaran
+               COALESCE(SUM(CASE WHEN r.tipe = 'Pemasukan' THEN r.total ELSE 0 END), 0) as pemasukan,
+               COALESCE(SUM(CASE WHEN r.tipe = 'Pengeluaran' THEN r.total ELSE 0 END), 0) as pengeluaran
         FROM users u
-        LEFT JOIN transaksi t ON u.id = t.user_id
-        WHERE u.username != 'admin'
+        LEFT JOIN ringkasan_bulanan r ON u.id = r.user_id
+        WHERE u.role != 'admin'{_filter_user_shard()}
         GROUP BY u.id, u.username
     '''
     
-    c.execute(query)
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    # Setiap user hanya muncul di shard-nya sendiri, jadi cukup disambung
+    return [row for rows in _sebar(_fetchall, query) for row in rows]
+
+@cache.cached(per_user=False)
+def admin_top_user(n=10):
+    """Mengambil n user dengan perputaran (pemasukan + pengeluaran) terbesar."""
+    hasil_shard = _sebar(_fetchall, f'''
+        SELECT u.id, u.username,
+               COALESCE(SUM(CASE WHEN r.tipe = 'Pemasukan' THEN r.total ELSE 0 END), 0) as pemasukan,
+               COALESCE(SUM(CASE WHEN r.tipe = 'Pengeluaran' THEN r.total ELSE 0 END), 0) as pengeluaran
+        FROM users u
+        LEFT JOIN ringkasan_bulanan r ON u.id = r.user_id
+        WHERE u.role != 'admin'{_filter_user_shard()}
+        GROUP BY u.id, u.username
+        ORDER BY COALESCE(SUM(r.total), 0) DESC, u.id
+        LIMIT ?
+    ''', (n,))
+    if len(hasil_shard) == 1:
+        return hasil_shard[0]
+    rows = heapq.merge(*hasil_shard, key=lambda row: (-(row['pemasukan'] + row['pengeluaran']), row['id']))
+    return list(islice(rows, n))
+
+# Ekspresi periode per granularitas deret waktu harian/mingguan.
+# Minggu diberi label tanggal hari Senin-nya.
+_PERIODE_SQL = {
+    'harian': 'tanggal',
+    'mingguan': "date(tanggal, '-6 days', 'weekday 1')",
+}
+
+@cache.cached(per_user=True)
+def ambil_deret_waktu(user_id, granularitas, start_date, end_date):
+    """Total pemasukan/pengeluaran per periode ('harian', 'mingguan', atau
+    'bulanan') untuk satu user, urut periode. Periode tanpa transaksi tidak
+    ikut; grafik.susun_deret mengisi dan menurunkan resolusinya.
 
+    'bulanan' dibaca dari ringkasan_bulanan dan mencakup bulan penuh dari
+    start_date sampai end_date.
+    """
+    conn = get_connection(user_id)
+    if granularitas == 'bulanan':
+        awal, akhir = start_date[:7].split('-'), end_date[:7].split('-')
+        return conn.execute('''
+            SELECT printf('%04d-%02d', tahun, bulan) AS periode,
+                   SUM(CASE WHEN tipe = 'Pemasukan' THEN total ELSE 0 END) AS pemasukan,
+                   SUM(CASE WHEN tipe = 'Pengeluaran' THEN total ELSE 0 END) AS pengeluaran
+            FROM ringkasan_bulanan
+            WHERE user_id = ? AND (tahun, bulan) >= (?, ?) AND (tahun, bulan) <= (?, ?)
+            GROUP BY tahun, bulan
+            ORDER BY tahun, bulan
+        ''', (user_id, int(awal[0]), int(awal[1]), int(akhir[0]), int(akhir[1]))).fetchall()
+
+    periode = _PERIODE_SQL[granularitas]
+    # tipe IN (...) memberi planner pilihan covering index idx_transaksi_user_tipe_tanggal
+    return conn.execute(f'''
+        SELECT {periode} AS periode,
+               SUM(CASE WHEN tipe = 'Pemasukan' THEN jumlah ELSE 0 END) AS pemasukan,
+               SUM(CASE WHEN tipe = 'Pengeluaran' THEN jumlah ELSE 0 END) AS pengeluaran
+        FROM transaksi
+        WHERE user_id = ? AND tipe IN ('Pemasukan', 'Pengeluaran') AND tanggal >= ? AND tanggal <= ?
+        GROUP BY 1
+        ORDER BY 1
+    ''', (user_id, start_date, end_date)).fetchall()
+
+@cache.cached(per_user=False)
 def admin_get_all_users():
     """Mengambil semua user untuk dropdown filter."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT id, username FROM users WHERE username != 'admin'")
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    conn = get_connection()
+    return conn.execute("SELECT id, username FROM users WHERE role != 'admin'").fetchall()
 
+@cache.cached(per_user=False)
 def admin_get_all_users_detail():
     """Mengambil semua user dengan detail untuk manajemen."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("""
+    hasil_shard = _sebar(_fetchall, f"""
         SELECT u.id, u.username, 
-               COUNT(t.id) as total_transaksi,
-               COALESCE(SUM(CASE WHEN t.tipe = 'Pemasukan' THEN t.jumlah ELSE 0 END), 0) as total_pemasukan,
-               COALESCE(SUM(CASE WHEN t.tipe = 'Pengeluaran' THEN t.jumlah ELSE 0 END), 0) as total_pengeluaran
+               COALESCE(SUM(r.jumlah_transaksi), 0) as total_transaksi,
+               COALESCE(SUM(CASE WHEN r.tipe = 'Pemasukan' THEN r.total ELSE 0 END), 0) as total_pemasukan,
+               COALESCE(SUM(CASE WHEN r.tipe = 'Pengeluaran' THEN r.total ELSE 0 END), 0) as total_pengeluaran
         FROM users u
-        LEFT JOIN transaksi t ON u.id = t.user_id
-        WHERE u.username != 'admin'
+        LEFT JOIN ringkasan_bulanan r ON u.id = r.user_id
+        WHERE u.role != 'admin'{_filter_user_shard()}
         GROUP BY u.id, u.username
     """)
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    return list(heapq.merge(*hasil_shard, key=lambda row: row['id']))
 
-def admin_laporan(start_date=None, end_date=None, user_id=None, tipe=None):
-    """Mengambil laporan transaksi dengan filter untuk admin."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
+def rebuild_ringkasan():
+    """Membangun ulang tabel ringkasan_bulanan (dan saldo_bulanan) dari data
+    mentah transaksi."""
+    def bangun(conn):
+        with conn:
+            # Checkpoint saldo dikosongkan dulu: trigger insert ringkasan
+            # (urut bulan) lalu membangunnya kembali tanpa menggeser bulan lain
+            conn.execute('DELETE FROM saldo_bulanan')
+            conn.execute('DELETE FROM ringkasan_bulanan')
+            conn.execute(_ISI_RINGKASAN_SQL)
+    _sebar(bangun)
+    cache.invalidate_all()
+
+def verifikasi_ringkasan():
+    """Membandingkan ringkasan_bulanan dan saldo_bulanan dengan agregasi data
+    mentah (eksak, karena nominal berupa integer sen).
+
+    Mengembalikan daftar selisih (kunci, nilai rollup, nilai seharusnya);
+    daftar kosong berarti rollup konsisten.
+    """
+    return [selisih for hasil in _sebar(_verifikasi_ringkasan) for selisih in hasil]
+
+def _verifikasi_ringkasan(conn):
+    seharusnya = {}
+    for row in conn.execute(_AGREGASI_BULANAN_SQL):
+        seharusnya[tuple(row[:5])] = (row[5], row[6])
+    rollup = {}
+    for row in conn.execute('SELECT user_id, tahun, bulan, tipe, kategori, total, jumlah_transaksi '
+                            'FROM ringkasan_bulanan'):
+        rollup[tuple(row[:5])] = (row[5], row[6])
+
+    # Checkpoint saldo: kumulatif neto per user sampai akhir bulannya
+    neto = {}
+    for (user_id, tahun, bulan, tipe, _), (total, _) in seharusnya.items():
+        if tipe in ('Pemasukan', 'Pengeluaran'):
+            kunci = (user_id, tahun, bulan)
+            neto[kunci] = neto.get(kunci, 0) + (total if tipe == 'Pemasukan' else -total)
+    saldo = {tuple(row[:3]): row[3] for row in conn.execute(
+        'SELECT user_id, tahun, bulan, saldo FROM saldo_bulanan')}
+    user_id = jalan = None
+    for kunci in sorted(set(neto) | set(saldo)):
+        if kunci[0] != user_id:
+            user_id, jalan = kunci[0], 0
+        jalan += neto.get(kunci, 0)
+        seharusnya[('saldo', *kunci)] = jalan
+        rollup[('saldo', *kunci)] = saldo.get(kunci)
+
+    selisih = []
+    for kunci in sorted(set(seharusnya) | set(rollup), key=repr):
+        aktual, benar = rollup.get(kunci), seharusnya.get(kunci)
+        if aktual != benar:
+            selisih.append((kunci, aktual, benar))
+    return selisih
+
+def _query_laporan(start_date=None, end_date=None, user_id=None, tipe=None):
+    """Menyusun query + params laporan admin (tanpa ORDER BY)."""
     query = '''
         SELECT t.*, u.username 
         FROM transaksi t
@@ -357,9 +1640,44 @@ def admin_laporan(start_date=None, end_date=None, user_id=None, tipe=None):
         query += " AND t.tipe = ?"
         params.append(tipe)
         
+    return query, params
+
+def admin_laporan(start_date=None, end_date=None, user_id=None, tipe=None):
+    """Mengambil laporan transaksi dengan filter untuk admin."""
+    conn = get_connection(user_id) if user_id else None
+    query, params = _query_laporan(start_date, end_date, user_id, tipe)
     query += ' ORDER BY t.tanggal DESC, t.id DESC'
-    
-    c.execute(query, params)
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    return _baca_urut(conn, query, params)
+
+def admin_laporan_halaman(start_date=None, end_date=None, user_id=None, tipe=None,
+                          per_page=DEFAULT_PER_PAGE, after=None, before=None):
+    """Mengambil satu halaman laporan admin (keyset pada tanggal, id)."""
+    conn = get_connection(user_id) if user_id else None
+    query, params = _query_laporan(start_date, end_date, user_id, tipe)
+    return _ambil_halaman(conn, query, params, per_page, after, before, alias='t.')
+
+def admin_laporan_iter(start_date=None, end_date=None, user_id=None, tipe=None, batch_size=1000):
+    """Generator baris laporan admin untuk export, dibaca per batch lewat fetchmany.
+
+    Memori yang dipakai konstan (satu batch per shard) berapapun jumlah barisnya.
+    """
+    query, params = _query_laporan(start_date, end_date, user_id, tipe)
+    query += ' ORDER BY t.tanggal DESC, t.id DESC'
+    if user_id or DB_SHARDS <= 1:
+        yield from _iter_cursor(get_connection(user_id or None), query, params, batch_size)
+        return
+    # Merge lazy dari semua shard, tetap urut tanggal DESC, id DESC
+    yield from heapq.merge(*(_iter_cursor(conn, query, params, batch_size) for conn in koneksi_shard()),
+                           key=_KUNCI_URUT, reverse=True)
+
+def _iter_cursor(conn, query, params, batch_size):
+    cursor = conn.execute(query, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        # Tutup cursor walau client memutus download di tengah jalan
+        cursor.close()
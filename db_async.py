@@ -0,0 +1,72 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import database as db
+
+# Jumlah thread database per proses; setiap thread memegang satu koneksi
+# SQLite (lihat database.get_connection).
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+_executor = None
+
+
+def configure(workers=None):
+    """Mengganti executor database (executor lama ditutup setelah selesai)."""
+    global _executor
+    lama = _executor
+    _executor = ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS,
+                                   thread_name_prefix='db')
+    if lama is not None:
+        lama.shutdown(wait=True)
+    return _executor
+
+
+def configure_from_env():
+    """Membaca DB_EXECUTOR_WORKERS dari environment."""
+    return configure(int(os.environ.get('DB_EXECUTOR_WORKERS', 0)) or None)
+
+
+def get_executor():
+    if _executor is None:
+        configure()
+    return _executor
+
+
+async def jalankan(fungsi, *args, **kwargs):
+    """Menjalankan fungsi database.py di executor database tanpa memblok event loop."""
+    loop = asyncio.get_running_loop()
+    # run_in_executor tidak membawa contextvars; salin agar catatan request
+    # (mis. profil.py) tetap terlihat di thread database
+    konteks = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(konteks.run, fungsi, *args, **kwargs))
+
+
+async def jalankan_query(query):
+    """Versi async app.jalankan_query: semua pemanggilan berjalan bersamaan."""
+    return await asyncio.gather(*(jalankan(panggil) for panggil in query))
+
+
+async def tulis(fungsi, *args, **kwargs):
+    """Seperti jalankan, untuk fungsi tulis database.py yang menerima tunggu=.
+
+    Dengan antrian_tulis aktif, thread database hanya mengantrekan perintah;
+    event loop yang menunggu commit-nya, bukan thread executor.
+    """
+    future = await jalankan(fungsi, *args, tunggu=False, **kwargs)
+    return await asyncio.wrap_future(future)
+
+
+def __getattr__(nama):
+    """`await db_async.hitung_ringkasan(...)` sama dengan `db.hitung_ringkasan(...)`,
+    tetapi dijalankan di executor database."""
+    fungsi = getattr(db, nama)
+    if not callable(fungsi):
+        raise AttributeError(nama)
+
+    @functools.wraps(fungsi)
+    async def wrapper(*args, **kwargs):
+        return await jalankan(fungsi, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,70 @@
+import math
+from datetime import date
+
+import uang
+
+GRANULARITAS = ('harian', 'mingguan', 'bulanan')
+
+# Jumlah titik default per deret; rentang lebih panjang digabung per bucket.
+DEFAULT_MAX_TITIK = 120
+
+
+def indeks_periode(granularitas, tanggal):
+    """Nomor urut periode dari teks 'YYYY-MM-DD' (atau 'YYYY-MM' untuk bulanan).
+
+    Periode berurutan punya indeks berurutan, jadi selisih indeks adalah
+    jarak antar periode.
+    """
+    if granularitas == 'bulanan':
+        tahun, bulan = int(tanggal[:4]), int(tanggal[5:7])
+        return tahun * 12 + bulan - 1
+    ordinal = date.fromisoformat(tanggal[:10]).toordinal()
+    if granularitas == 'mingguan':
+        # date(1, 1, 1) adalah hari Senin, jadi minggu dimulai hari Senin
+        return (ordinal - 1) // 7
+    return ordinal
+
+
+def label_periode(granularitas, indeks):
+    """Kebalikan indeks_periode: 'YYYY-MM' untuk bulanan, tanggal awal periode lainnya."""
+    if granularitas == 'bulanan':
+        tahun, bulan = divmod(indeks, 12)
+        return f'{tahun:04d}-{bulan + 1:02d}'
+    if granularitas == 'mingguan':
+        return date.fromordinal(indeks * 7 + 1).isoformat()
+    return date.fromordinal(indeks).isoformat()
+
+
+def susun_deret(rows, granularitas, start_date, end_date, max_titik=DEFAULT_MAX_TITIK):
+    """Menyusun baris (periode, pemasukan, pengeluaran) menjadi deret rapat.
+
+    Periode tanpa transaksi bernilai 0. Jika rentang berisi lebih dari
+    max_titik periode, setiap `langkah` periode berurutan dijumlahkan menjadi
+    satu titik (total tetap eksak), sehingga ukuran respons tidak ikut
+    tumbuh dengan panjang riwayat. Label titik adalah awal bucket-nya.
+    """
+    awal = indeks_periode(granularitas, start_date)
+    akhir = indeks_periode(granularitas, end_date)
+    jumlah_periode = max(akhir - awal + 1, 1)
+    langkah = math.ceil(jumlah_periode / max_titik)
+    jumlah_titik = math.ceil(jumlah_periode / langkah)
+
+    pemasukan = uang.DeretUang([0] * jumlah_titik)
+    pengeluaran = uang.DeretUang([0] * jumlah_titik)
+    for row in rows:
+        i = (indeks_periode(granularitas, row['periode']) - awal) // langkah
+        if 0 <= i < jumlah_titik:
+            pemasukan.data[i] += row['pemasukan']
+            pengeluaran.data[i] += row['pengeluaran']
+
+    return {
+        'granularitas': granularitas,
+        'langkah': langkah,
+        'label': [label_periode(granularitas, awal + i * langkah) for i in range(jumlah_titik)],
+        'pemasukan': pemasukan.ke_rupiah(),
+        'pengeluaran': pengeluaran.ke_rupiah(),
+        'total': {
+            'pemasukan': uang.ke_rupiah(pemasukan.total()),
+            'pengeluaran': uang.ke_rupiah(pengeluaran.total()),
+        },
+    }
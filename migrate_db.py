@@ -1,29 +1,115 @@
-import sqlite3
+import glob
+import os
+import sys
+import cache
 import database as db
 
 DB_NAME = 'keuangan.db'
 
 def migrate():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # Check if user_id column exists
-    try:
-        c.execute('SELECT user_id FROM transaksi LIMIT 1')
-        print("Column user_id already exists.")
-    except sqlite3.OperationalError:
-        print("Adding user_id column...")
-        # Add column
-        c.execute('ALTER TABLE transaksi ADD COLUMN user_id INTEGER')
-        
-        # Assign all existing transactions to the first user (usually ID 1)
-        # Assuming user with ID 1 exists. If not, they will be orphaned until assigned.
-        c.execute('UPDATE transaksi SET user_id = 1 WHERE user_id IS NULL')
-        
-        conn.commit()
-        print("Migration complete. user_id added and populated with default 1.")
-        
-    conn.close()
+    """Apply every pending schema migration to DB_NAME (and its shards when
+    DB_SHARDS > 1). Safe to re-run; run it once before starting workers."""
+    db.DB_NAME = DB_NAME
+    versi = db.versi_schema(db.get_connection())
+    if versi == db.SCHEMA_VERSION:
+        print(f"Schema version: {versi} (up to date)")
+    else:
+        if 0 < versi < 5:
+            print("Converting transaksi.jumlah and ringkasan_bulanan.total to integer sen...")
+        print(f"Migrating schema version {versi} -> {db.SCHEMA_VERSION}...")
+    db.init_db()
+    print(f"Schema version: {db.versi_schema(db.get_connection())}")
+
+def status():
+    """Print the schema version of DB_NAME and its shards; True if all are current."""
+    db.DB_NAME = DB_NAME
+    file = [(DB_NAME, db.SCHEMA_VERSION)]
+    if db.DB_SHARDS > 1:
+        file += [(db.path_shard(i), db.SHARD_SCHEMA_VERSION) for i in range(db.DB_SHARDS)]
+    terbaru = True
+    for path, dibutuhkan in file:
+        # Jangan membuat file kosong hanya untuk membaca versinya
+        versi = db.versi_schema(db._koneksi(path)) if os.path.exists(path) else None
+        terbaru = terbaru and versi == dibutuhkan
+        print(f"{path}: " + ("missing" if versi is None else f"version {versi}")
+              + ("" if versi == dibutuhkan else f" (needs {dibutuhkan})"))
+    return terbaru
+
+def pindah_shard(jumlah):
+    """Move all transactions to `jumlah` shard files (1 = back to DB_NAME only).
+
+    Existing shards are first merged back into DB_NAME, then rows are
+    distributed by user_id % jumlah. Safe to re-run after an interruption.
+    """
+    db.DB_NAME = DB_NAME
+    db.DB_SHARDS = 1
+    db.init_db()
+    conn = db.get_connection()
+    root, ext = os.path.splitext(DB_NAME)
+    lama = sorted(glob.glob(f'{glob.escape(root)}.shard*{ext or ".db"}'))
+    for path in lama:
+        conn.execute('ATTACH DATABASE ? AS lama', (path,))
+        with conn:
+            # Budgets first, so the rollup triggers recompute alerts for the copied rows
+            conn.execute('INSERT OR REPLACE INTO anggaran SELECT * FROM lama.anggaran')
+            # Ids are unique across shards; IGNORE skips rows already copied by an interrupted run
+            conn.execute('INSERT OR IGNORE INTO transaksi_berulang SELECT * FROM lama.transaksi_berulang')
+            conn.execute('INSERT OR IGNORE INTO transaksi SELECT * FROM lama.transaksi')
+        conn.execute('DETACH DATABASE lama')
+        print(f"merged {path}")
+    db.close_connection()
+    for path in lama:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    if jumlah > 1:
+        db.DB_SHARDS = jumlah
+        db.init_shard(cek_utama=False)
+        conn = db.get_connection()
+        id_max = {tabel: conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabel}").fetchone()[0]
+                  for tabel in ('transaksi', 'transaksi_berulang')}
+        for i, shard in enumerate(db.koneksi_shard()):
+            with shard:
+                # New ids must not collide with migrated ones from any shard
+                for tabel, maks in id_max.items():
+                    shard.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?",
+                                  (max(i * db.ID_PER_SHARD, maks), tabel))
+                shard.execute('INSERT OR REPLACE INTO anggaran SELECT * FROM utama.anggaran '
+                              'WHERE user_id % ? = ?', (jumlah, i))
+                shard.execute('INSERT INTO transaksi_berulang SELECT * FROM utama.transaksi_berulang '
+                              'WHERE user_id % ? = ?', (jumlah, i))
+                n = shard.execute('INSERT INTO transaksi SELECT * FROM utama.transaksi '
+                                  'WHERE COALESCE(user_id, 0) % ? = ?', (jumlah, i)).rowcount
+            print(f"{db.path_shard(i)}: {n} transaksi")
+        with conn:
+            conn.execute('DELETE FROM ringkasan_bulanan')
+            conn.execute('DELETE FROM saldo_bulanan')
+            conn.execute('DELETE FROM transaksi')
+            conn.execute('DELETE FROM anggaran')
+            conn.execute('DELETE FROM transaksi_berulang')
+        db.close_connection()
+    cache.invalidate_all()
+    print(f"Done. Start the app with DB_SHARDS={jumlah}.")
 
 if __name__ == '__main__':
+    if '--rebuild-ringkasan' in sys.argv:
+        db.rebuild_ringkasan()
+        print("ringkasan_bulanan rebuilt from transaksi.")
+        sys.exit(0)
+    if '--rebuild-fts' in sys.argv:
+        db.rebuild_index_cari()
+        print("transaksi_fts rebuilt from transaksi.")
+        sys.exit(0)
+    if '--verifikasi-ringkasan' in sys.argv:
+        selisih = db.verifikasi_ringkasan()
+        for kunci, aktual, benar in selisih:
+            print(f"{kunci}: rollup={aktual} seharusnya={benar}")
+        print("OK: ringkasan_bulanan konsisten." if not selisih else f"{len(selisih)} selisih ditemukan.")
+        sys.exit(1 if selisih else 0)
+    if '--shard' in sys.argv:
+        pindah_shard(int(sys.argv[sys.argv.index('--shard') + 1]))
+        sys.exit(0)
+    if '--status' in sys.argv:
+        sys.exit(0 if status() else 1)
     migrate()
@@ -0,0 +1,124 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Default metode hash Werkzeug, bisa diganti lewat PASSWORD_HASH_METHOD,
+# misalnya 'pbkdf2:sha256:600000' atau 'scrypt:32768:8:1'.
+DEFAULT_METHOD = 'scrypt'
+DEFAULT_SALT_LENGTH = 16
+# Batas request yang boleh menunggu giliran KDF per worker pool
+DEFAULT_MAX_ANTRIAN = 64
+
+
+class PoolPenuh(Exception):
+    """Antrian hashing sudah penuh; request sebaiknya ditolak (503)."""
+
+
+class PasswordHasher:
+    """Hash dan verifikasi password di thread pool terbatas.
+
+    hashlib.scrypt dan hashlib.pbkdf2_hmac melepas GIL, jadi KDF berjalan
+    paralel di `workers` thread tanpa memblok thread lain. Jumlah request
+    yang menunggu dibatasi `max_antrian`; di atas itu PoolPenuh dilempar
+    daripada menumpuk antrian tanpa batas saat login storm.
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, salt_length=DEFAULT_SALT_LENGTH,
+                 workers=None, max_antrian=DEFAULT_MAX_ANTRIAN):
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password')
+        self._slot = threading.BoundedSemaphore(self.workers + max_antrian)
+        self._prefix = None
+
+    def _submit(self, fn, *args):
+        if not self._slot.acquire(blocking=False):
+            raise PoolPenuh()
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slot.release()
+            raise
+        future.add_done_callback(lambda _: self._slot.release())
+        return future
+
+    def hash_async(self, password):
+        """Future berisi hash password dengan parameter saat ini."""
+        return self._submit(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify_async(self, pwhash, password):
+        """Future berisi True/False hasil check_password_hash."""
+        return self._submit(check_password_hash, pwhash, password)
+
+    def hash(self, password):
+        return self.hash_async(password).result()
+
+    def verify(self, pwhash, password):
+        return self.verify_async(pwhash, password).result()
+
+    @property
+    def prefix(self):
+        """Bagian 'metode$' dari hash baru, mis. 'scrypt:32768:8:1'."""
+        if self._prefix is None:
+            # Werkzeug menormalkan metode (mengisi default iterasi/cost), jadi
+            # cara paling pasti adalah melihat hash yang benar-benar dihasilkan.
+            self._prefix = generate_password_hash('', self.method, 1).split('$', 1)[0]
+        return self._prefix
+
+    def perlu_rehash(self, pwhash):
+        """True jika hash tersimpan memakai parameter yang sudah usang."""
+        return pwhash.split('$', 1)[0] != self.prefix
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+_hasher = None
+
+
+def configure(method=DEFAULT_METHOD, salt_length=DEFAULT_SALT_LENGTH,
+              workers=None, max_antrian=DEFAULT_MAX_ANTRIAN):
+    """Mengganti hasher global (pool lama ditutup setelah pekerjaannya selesai)."""
+    global _hasher
+    lama = _hasher
+    _hasher = PasswordHasher(method, salt_length, workers, max_antrian)
+    if lama is not None:
+        lama.shutdown()
+    return _hasher
+
+
+def configure_from_app(app):
+    """Membaca PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH, PASSWORD_HASH_WORKERS,
+    dan PASSWORD_HASH_MAX_ANTRIAN dari app.config (default dari environment)."""
+    config = app.config
+    config.setdefault('PASSWORD_HASH_METHOD', os.environ.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
+    config.setdefault('PASSWORD_SALT_LENGTH', int(os.environ.get('PASSWORD_SALT_LENGTH', DEFAULT_SALT_LENGTH)))
+    config.setdefault('PASSWORD_HASH_WORKERS', int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None)
+    config.setdefault('PASSWORD_HASH_MAX_ANTRIAN',
+                      int(os.environ.get('PASSWORD_HASH_MAX_ANTRIAN', DEFAULT_MAX_ANTRIAN)))
+    return configure(config['PASSWORD_HASH_METHOD'], config['PASSWORD_SALT_LENGTH'],
+                     config['PASSWORD_HASH_WORKERS'], config['PASSWORD_HASH_MAX_ANTRIAN'])
+
+
+def get_hasher():
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher()
+    return _hasher
+
+
+def hash_password(password):
+    """Hash password di pool hashing; melempar PoolPenuh saat antrian penuh."""
+    return get_hasher().hash(password)
+
+
+def verify_password(pwhash, password):
+    """Verifikasi password di pool hashing; melempar PoolPenuh saat antrian penuh."""
+    return get_hasher().verify(pwhash, password)
+
+
+def perlu_rehash(pwhash):
+    return get_hasher().perlu_rehash(pwhash)
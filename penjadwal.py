@@ -0,0 +1,130 @@
+import argparse
+import os
+import threading
+import time
+
+import database as db
+
+# Jeda antar putaran materialisasi transaksi berulang. Putaran tanpa aturan
+# yang jatuh tempo hanya satu lookup index per shard.
+DEFAULT_INTERVAL = 60  # detik
+
+_aktif = False
+_interval = DEFAULT_INTERVAL
+_thread = None
+_pid = None
+_berhenti = threading.Event()
+_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {'putaran': 0, 'gagal': 0, 'aturan': 0, 'transaksi': 0, 'batch': 0,
+          'durasi_batch_total': 0.0, 'durasi_batch_maks': 0.0, 'lag': 0.0,
+          'terakhir': None, 'error_terakhir': None}
+
+
+def jalankan_sekali(hari_ini=None):
+    """Satu putaran materialisasi_berulang untuk semua user; mencatat hasilnya
+    di stats() dan mengembalikannya."""
+    try:
+        hasil = db.materialisasi_berulang(hari_ini)
+    except Exception as e:
+        with _stats_lock:
+            _stats['gagal'] += 1
+            _stats['error_terakhir'] = repr(e)
+        raise
+    with _stats_lock:
+        _stats['putaran'] += 1
+        _stats['aturan'] += hasil['aturan']
+        _stats['transaksi'] += hasil['transaksi']
+        _stats['batch'] += len(hasil['durasi_batch'])
+        _stats['durasi_batch_total'] += sum(hasil['durasi_batch'])
+        if hasil['transaksi']:
+            # Putaran kosong tidak menimpa angka putaran terakhir yang bekerja
+            _stats['durasi_batch_maks'] = max(hasil['durasi_batch'])
+            _stats['lag'] = hasil['lag']
+        _stats['terakhir'] = time.time()
+    return hasil
+
+
+def _jalan():
+    while not _berhenti.is_set():
+        try:
+            jalankan_sekali()
+        except Exception:
+            # Sudah tercatat di stats; putaran berikutnya mencoba lagi
+            pass
+        _berhenti.wait(_interval)
+
+
+def aktif():
+    return _aktif
+
+
+def mulai():
+    """Menjalankan thread penjadwal di proses ini jika belum berjalan."""
+    global _thread, _pid
+    with _lock:
+        if _pid == os.getpid() and _thread is not None and _thread.is_alive():
+            return
+        # Thread tidak ikut ke proses hasil fork; proses anak memulai sendiri
+        _berhenti.clear()
+        _pid = os.getpid()
+        _thread = threading.Thread(target=_jalan, daemon=True, name='penjadwal-berulang')
+        _thread.start()
+
+
+def berhenti():
+    """Menghentikan thread penjadwal (putaran yang sedang berjalan diselesaikan)."""
+    global _thread
+    with _lock:
+        thread, _thread = (_thread, None) if _pid == os.getpid() else (None, None)
+    _berhenti.set()
+    if thread is not None:
+        thread.join()
+
+
+def configure(aktif=True, interval=None):
+    """Mengaktifkan/menonaktifkan penjadwal di proses ini.
+
+    Beberapa worker yang masing-masing menjalankan penjadwal tetap aman:
+    setiap batch mengklaim aturannya di dalam transaksi tulis, jadi kejadian
+    yang sama tidak pernah dibuat dua kali.
+    """
+    global _aktif, _interval
+    berhenti()
+    _aktif = aktif
+    _interval = interval or DEFAULT_INTERVAL
+    if aktif:
+        mulai()
+
+
+def configure_from_env():
+    """Membaca RECURRING=1 dan RECURRING_INTERVAL (detik) dari environment."""
+    configure(os.environ.get('RECURRING', '') not in ('', '0'),
+              float(os.environ.get('RECURRING_INTERVAL', 0)) or None)
+
+
+def stats():
+    """Counter proses ini: putaran, aturan dan transaksi yang dibuat, jumlah
+    dan durasi batch, serta batch terlama dan lag (detik dari tanggal
+    kejadian tertua sampai dibuat) putaran terakhir yang membuat transaksi."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Materialisasi transaksi berulang yang jatuh tempo.')
+    parser.add_argument('--loop', action='store_true', help='terus berjalan setiap --interval detik')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL)
+    parser.add_argument('--sampai', help='tanggal YYYY-MM-DD (default: hari ini)')
+    args = parser.parse_args()
+    db.cek_schema()
+    while True:
+        hasil = jalankan_sekali(args.sampai)
+        durasi = hasil['durasi_batch']
+        print(f"{hasil['transaksi']} transaksi dari {hasil['aturan']} aturan, {len(durasi)} batch "
+              f"({sum(durasi) * 1000:.1f} ms, maks {max(durasi, default=0) * 1000:.1f} ms), "
+              f"lag {hasil['lag']:.0f} s", flush=True)
+        if not args.loop:
+            break
+        time.sleep(args.interval)
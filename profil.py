@@ -0,0 +1,324 @@
+import contextvars
+import functools
+import hmac
+import inspect
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from flask import Response, before_render_template, g, jsonify, request, template_rendered
+
+import antrian_tulis
+import penjadwal
+
+# Batas atas bucket histogram latensi (detik), gaya Prometheus
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Jumlah profil request terakhir yang disimpan untuk /api/profil
+JUMLAH_PROFIL = 50
+
+# Catatan request yang sedang berjalan. ContextVar (bukan flask.g) agar ikut
+# terbawa ke thread executor db_async yang menjalankan query varian async (asgi.py).
+_request = contextvars.ContextVar('profil_request', default=None)
+# Pemanggilan fungsi database.py yang sedang berjalan di thread ini, untuk
+# trace callback SQLite
+_lokal = threading.local()
+
+# Trace callback SQLite memberi SQL dengan parameter sudah terisi; literal
+# string (username, hash password, catatan) disamarkan sebelum disimpan
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+_aktif = False
+
+
+class Histogram:
+    """Histogram kumulatif per kombinasi label, siap ditulis format Prometheus."""
+
+    def __init__(self, nama, keterangan, label):
+        self.nama = nama
+        self.keterangan = keterangan
+        self.label = label
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def observe(self, nilai, *label):
+        with self._lock:
+            data = self._data.get(label)
+            if data is None:
+                data = self._data[label] = [[0] * len(BUCKETS), 0.0, 0]
+            for i, batas in enumerate(BUCKETS):
+                if nilai <= batas:
+                    data[0][i] += 1
+            data[1] += nilai
+            data[2] += 1
+
+    def tulis(self):
+        baris = [f'# HELP {self.nama} {self.keterangan}', f'# TYPE {self.nama} histogram']
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._data.items())
+        for label, (buckets, total, jumlah) in items:
+            pasangan = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.label, label))
+            for batas, n in zip(BUCKETS, buckets):
+                baris.append(f'{self.nama}_bucket{{{pasangan},le="{batas}"}} {n}')
+            baris.append(f'{self.nama}_bucket{{{pasangan},le="+Inf"}} {jumlah}')
+            baris.append(f'{self.nama}_sum{{{pasangan}}} {total}')
+            baris.append(f'{self.nama}_count{{{pasangan}}} {jumlah}')
+        return baris
+
+
+def _escape(nilai):
+    return str(nilai).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+latensi_request = Histogram('http_request_duration_seconds', 'Latensi request per route.',
+                            ('route', 'method', 'status'))
+latensi_db = Histogram('db_call_duration_seconds', 'Durasi fungsi database.py.', ('fungsi',))
+latensi_render = Histogram('template_render_duration_seconds', 'Durasi render template Jinja.',
+                           ('template',))
+latensi_hash = Histogram('password_hash_duration_seconds', 'Durasi hash/verifikasi password.',
+                         ('operasi',))
+
+_profil_terakhir = deque(maxlen=JUMLAH_PROFIL)
+
+
+def aktif():
+    return _aktif
+
+
+def _jumlah_baris(hasil):
+    if isinstance(hasil, list):
+        return len(hasil)
+    if isinstance(hasil, dict) and 'transaksi' in hasil:
+        # Halaman keyset dari _ambil_halaman
+        return len(hasil['transaksi'])
+    if hasil is None:
+        return 0
+    if isinstance(hasil, dict) or hasattr(hasil, 'keys'):
+        return 1
+    return None
+
+
+def _bungkus_db(nama, fungsi):
+    @functools.wraps(fungsi)
+    def wrapper(*args, **kwargs):
+        catatan = _request.get()
+        panggilan = {'fungsi': nama, 'sql': []}
+        sebelumnya = getattr(_lokal, 'panggilan', None)
+        _lokal.panggilan = panggilan
+        mulai = time.perf_counter()
+        try:
+            hasil = fungsi(*args, **kwargs)
+        finally:
+            durasi = time.perf_counter() - mulai
+            _lokal.panggilan = sebelumnya
+            latensi_db.observe(durasi, nama)
+        if sebelumnya is not None:
+            # Dipanggil dari fungsi database.py lain: sudah dihitung oleh pemanggilnya
+            sebelumnya['sql'].extend(panggilan['sql'])
+        elif catatan is not None:
+            panggilan['durasi_ms'] = round(durasi * 1000, 3)
+            panggilan['baris'] = _jumlah_baris(hasil)
+            catatan['db'].append(panggilan)
+        return hasil
+    return wrapper
+
+
+def _bungkus_hash(operasi, fungsi):
+    @functools.wraps(fungsi)
+    def wrapper(*args, **kwargs):
+        mulai = time.perf_counter()
+        try:
+            return fungsi(*args, **kwargs)
+        finally:
+            durasi = time.perf_counter() - mulai
+            latensi_hash.observe(durasi, operasi)
+            catatan = _request.get()
+            if catatan is not None:
+                catatan['hash'] += durasi
+    return wrapper
+
+
+def _trace_sql(sql):
+    panggilan = getattr(_lokal, 'panggilan', None)
+    if panggilan is not None:
+        panggilan['sql'].append(_LITERAL.sub('?', ' '.join(sql.split())))
+
+
+def instrumentasi_database(db):
+    """Membungkus setiap fungsi publik database.py dan memasang trace SQL
+    pada koneksi baru."""
+    for nama, fungsi in list(vars(db).items()):
+        if nama.startswith('_') or not inspect.isfunction(fungsi) or fungsi.__module__ != db.__name__:
+            continue
+        if nama in ('get_connection', 'close_connection', 'connection_stats', 'koneksi_shard',
+                    'path_shard', 'shard_untuk', 'ekspresi_cari', 'kejadian_berikutnya'):
+            continue
+        setattr(db, nama, _bungkus_db(nama, fungsi))
+
+    buka_asli = db._open_connection
+
+    @functools.wraps(buka_asli)
+    def buka_dengan_trace(*args):
+        conn = buka_asli(*args)
+        conn.set_trace_callback(_trace_sql)
+        return conn
+    db._open_connection = buka_dengan_trace
+    # Koneksi yang sudah terbuka di thread ini belum punya trace callback
+    db.close_connection()
+
+
+def instrumentasi_passwords(passwords):
+    passwords.hash_password = _bungkus_hash('hash', passwords.hash_password)
+    passwords.verify_password = _bungkus_hash('verify', passwords.verify_password)
+
+
+def _mulai_request():
+    g.profil_token = _request.set({'mulai': time.perf_counter(), 'db': [], 'render': 0.0, 'hash': 0.0})
+
+
+def _mulai_render(sender, template, context, **extra):
+    catatan = _request.get()
+    if catatan is not None:
+        catatan.setdefault('render_mulai', []).append(time.perf_counter())
+
+
+def _selesai_render(sender, template, context, **extra):
+    catatan = _request.get()
+    if catatan is not None and catatan.get('render_mulai'):
+        durasi = time.perf_counter() - catatan['render_mulai'].pop()
+        catatan['render'] += durasi
+        latensi_render.observe(durasi, template.name or '-')
+
+
+def _selesai_request(response):
+    catatan = _request.get()
+    if catatan is None:
+        return response
+    total = time.perf_counter() - catatan['mulai']
+    db_ms = sum(p['durasi_ms'] for p in catatan['db'])
+    route = request.url_rule.rule if request.url_rule else '<404>'
+    latensi_request.observe(total, route, request.method, response.status_code)
+
+    timing = [f'db;dur={db_ms:.2f};desc="{len(catatan["db"])} panggilan"']
+    if catatan['render']:
+        timing.append(f'render;dur={catatan["render"] * 1000:.2f}')
+    if catatan['hash']:
+        timing.append(f'hash;dur={catatan["hash"] * 1000:.2f}')
+    timing.append(f'total;dur={total * 1000:.2f}')
+    response.headers.add('Server-Timing', ', '.join(timing))
+
+    _profil_terakhir.append({
+        'route': route,
+        'path': request.full_path,
+        'method': request.method,
+        'status': response.status_code,
+        'total_ms': round(total * 1000, 3),
+        'db_ms': round(db_ms, 3),
+        'render_ms': round(catatan['render'] * 1000, 3),
+        'hash_ms': round(catatan['hash'] * 1000, 3),
+        'db': catatan['db'],
+    })
+    return response
+
+
+def _akhiri_request(exc):
+    token = g.pop('profil_token', None)
+    if token is not None:
+        _request.reset(token)
+
+
+def token_valid():
+    """True jika request membawa header Authorization: Bearer METRICS_TOKEN."""
+    token = os.environ.get('METRICS_TOKEN')
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+# metrics dan profil_terakhir tidak memeriksa akses sendiri; app.py
+# mendaftarkannya di balik token_valid() atau login admin.
+def metrics():
+    baris = []
+    for histogram in (latensi_request, latensi_db, latensi_render, latensi_hash):
+        baris.extend(histogram.tulis())
+    if antrian_tulis.aktif():
+        baris.extend(_metrik_antrian_tulis())
+    if penjadwal.aktif():
+        baris.extend(_metrik_penjadwal())
+    return Response('\n'.join(baris) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+# Batas atas bucket histogram ukuran group commit antrian_tulis
+BUCKETS_BATCH = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _metrik_antrian_tulis():
+    stats = antrian_tulis.stats()
+    baris = [
+        '# HELP write_queue_depth Perintah tulis yang menunggu di antrian.',
+        '# TYPE write_queue_depth gauge',
+        f'write_queue_depth {stats["kedalaman"]}',
+        '# HELP write_queue_commits_total Group commit oleh thread penulis.',
+        '# TYPE write_queue_commits_total counter',
+        f'write_queue_commits_total {stats["commit"]}',
+        '# HELP write_queue_failed_total Perintah tulis yang gagal.',
+        '# TYPE write_queue_failed_total counter',
+        f'write_queue_failed_total {stats["gagal"]}',
+        '# HELP write_batch_size Jumlah perintah per group commit.',
+        '# TYPE write_batch_size histogram',
+    ]
+    ukuran = stats['ukuran_batch']
+    for batas in BUCKETS_BATCH:
+        baris.append(f'write_batch_size_bucket{{le="{batas}"}} {sum(n for k, n in ukuran.items() if k <= batas)}')
+    baris.append(f'write_batch_size_bucket{{le="+Inf"}} {stats["commit"]}')
+    baris.append(f'write_batch_size_sum {sum(k * n for k, n in ukuran.items())}')
+    baris.append(f'write_batch_size_count {stats["commit"]}')
+    return baris
+
+
+def _metrik_penjadwal():
+    stats = penjadwal.stats()
+    return [
+        '# HELP recurring_lag_seconds Umur kejadian tertua saat dibuat, putaran terakhir yang membuat transaksi.',
+        '# TYPE recurring_lag_seconds gauge',
+        f'recurring_lag_seconds {stats["lag"]}',
+        '# HELP recurring_last_run_timestamp_seconds Waktu putaran penjadwal terakhir yang berhasil.',
+        '# TYPE recurring_last_run_timestamp_seconds gauge',
+        f'recurring_last_run_timestamp_seconds {stats["terakhir"] or 0}',
+        '# HELP recurring_runs_failed_total Putaran penjadwal yang gagal.',
+        '# TYPE recurring_runs_failed_total counter',
+        f'recurring_runs_failed_total {stats["gagal"]}',
+        '# HELP recurring_materialized_total Transaksi yang dibuat dari aturan berulang.',
+        '# TYPE recurring_materialized_total counter',
+        f'recurring_materialized_total {stats["transaksi"]}',
+        '# HELP recurring_batch_seconds Durasi satu batch materialisasi (satu commit).',
+        '# TYPE recurring_batch_seconds summary',
+        f'recurring_batch_seconds_sum {stats["durasi_batch_total"]}',
+        f'recurring_batch_seconds_count {stats["batch"]}',
+    ]
+
+
+def profil_terakhir():
+    """Profil request terakhir (query, durasi, baris), yang paling lambat dulu."""
+    return jsonify(sorted(_profil_terakhir, key=lambda p: p['total_ms'], reverse=True))
+
+
+def configure_from_app(app, db, passwords):
+    """Memasang instrumentasi jika PROFILING aktif (app.config atau environment).
+
+    Saat nonaktif tidak ada yang dibungkus atau didaftarkan, jadi tidak ada
+    overhead sama sekali.
+    """
+    global _aktif
+    app.config.setdefault('PROFILING', os.environ.get('PROFILING', '') not in ('', '0'))
+    if not app.config['PROFILING'] or _aktif:
+        return
+    _aktif = True
+    instrumentasi_database(db)
+    instrumentasi_passwords(passwords)
+    app.before_request(_mulai_request)
+    app.after_request(_selesai_request)
+    app.teardown_request(_akhiri_request)
+    before_render_template.connect(_mulai_render, app)
+    template_rendered.connect(_selesai_render, app)
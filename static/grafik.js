@@ -0,0 +1,39 @@
+// Memuat data chart dari /api/grafik/* saat canvas mulai terlihat,
+// sehingga ukuran halaman tidak ikut tumbuh dengan jumlah data.
+// Browser menyimpan respons dan merevalidasinya lewat ETag/Last-Modified.
+function muatGrafik(canvas, url, gambar) {
+    let chart = null;
+
+    function ambil(urlBaru) {
+        return fetch(urlBaru || url, { credentials: 'same-origin' })
+            .then(function(res) {
+                if (!res.ok) throw new Error(res.status);
+                return res.json();
+            })
+            .then(function(data) {
+                if (chart) chart.destroy();
+                chart = gambar(canvas.getContext('2d'), data);
+                return chart;
+            })
+            .catch(function(err) {
+                console.error('Gagal memuat grafik', url, err);
+            });
+    }
+
+    if ('IntersectionObserver' in window) {
+        const observer = new IntersectionObserver(function(entries) {
+            if (entries.some(function(e) { return e.isIntersecting; })) {
+                observer.disconnect();
+                ambil();
+            }
+        });
+        observer.observe(canvas);
+    } else {
+        ambil();
+    }
+    return { muatUlang: ambil };
+}
+
+function formatRupiah(value) {
+    return 'Rp ' + value.toLocaleString('id-ID');
+}
@@ -0,0 +1,35 @@
+import pytest
+
+
+@pytest.fixture
+def analitik(aplikasi):
+    """Memanggil app.api_analitik dalam satu request tiruan, opsional sebagai user (username, role db, role session)."""
+    import database as db
+
+    def panggil(user=None):
+        with aplikasi.app.test_request_context('/api/analitik?baris=tipe'):
+            if user is not None:
+                username, role_db, role_session = user
+                if db.cek_user(username) is None:
+                    db.tambah_user(username, 'x', role_db)
+                aplikasi.session['user_id'] = db.cek_user(username)['id']
+                aplikasi.session['role'] = role_session
+            return aplikasi.app.make_response(aplikasi.api_analitik())
+    return panggil
+
+
+def test_tanpa_login_diarahkan_ke_login(analitik):
+    respons = analitik()
+    assert respons.status_code == 302 and respons.location.endswith('/login')
+
+
+@pytest.mark.parametrize('user', [('analis', 'user', 'user'), ('admin_diturunkan', 'user', 'admin')])
+def test_bukan_admin_ditolak(analitik, user):
+    # Role di cookie session tidak dipercaya; role dibaca dari database
+    assert analitik(user).status_code == 403
+
+
+def test_admin(analitik):
+    pytest.importorskip('numpy')
+    respons = analitik(('admin_analitik', 'admin', 'admin'))
+    assert respons.status_code == 200 and isinstance(respons.get_json(), list)
@@ -0,0 +1,50 @@
+import sqlite3
+import threading
+
+import pytest
+
+import antrian_tulis
+
+
+@pytest.fixture
+def tabel(tmp_path):
+    """kirim(sql, params) ke antrian tulis sebuah database sementara berisi
+    tabel t(x). SQL boleh memanggil tahan(), yang menunggu kirim.lepas."""
+    path = str(tmp_path / 'antrian.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE t (x INTEGER NOT NULL)')
+    lepas = threading.Event()
+
+    def buka():
+        conn = sqlite3.connect(path, isolation_level=None)
+        conn.create_function('tahan', 0, lambda: lepas.wait(5))
+        return conn
+
+    antrian_tulis.configure()
+
+    def kirim(sql, params=()):
+        return antrian_tulis.kirim(path, buka, sql, params)
+    kirim.lepas = lepas
+    kirim.isi = lambda: [x for x, in sqlite3.connect(path).execute('SELECT x FROM t ORDER BY x')]
+    yield kirim
+    lepas.set()
+    antrian_tulis.configure(aktif=False)
+
+
+@pytest.mark.parametrize('params, error', [((None,), sqlite3.IntegrityError),
+                                           ((10 ** 30,), OverflowError)])
+def test_perintah_gagal_hanya_menggagalkan_dirinya(tabel, params, error):
+    # Penulis tertahan di perintah pertama sampai semua perintah mengantre
+    tertahan = tabel('INSERT INTO t SELECT 0 WHERE tahan()')
+    futures = [tabel('INSERT INTO t VALUES (?)', (1,)),
+               tabel('INSERT INTO t VALUES (?)', params),
+               tabel('INSERT INTO t VALUES (?)', (2,))]
+    tabel.lepas.set()
+    assert tertahan.result(5) == 1
+    assert futures[0].result(5) == 1 and futures[2].result(5) == 1
+    with pytest.raises(error):
+        futures[1].result(5)
+    # Batch berikutnya tidak terhalang transaksi yang tertinggal
+    assert tabel('INSERT INTO t VALUES (?)', (3,)).result(5) == 1
+    assert tabel.isi() == [0, 1, 2, 3]
+    assert antrian_tulis.stats()['gagal'] >= 1
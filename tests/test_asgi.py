@@ -0,0 +1,89 @@
+import asyncio
+import inspect
+import sys
+
+import pytest
+
+HALAMAN = [
+    ('user', '/'),
+    ('user', '/transaksi?start_date=2026-01-01&end_date=2026-01-31'),
+    ('user', '/transaksi?q=makan'),
+    ('admin', '/'),
+    ('admin', '/laporan?start_date=2026-01-01&end_date=2026-01-31'),
+    ('admin', '/laporan?q=makan'),
+    ('admin', '/kelola-user'),
+    ('user', '/laporan'),
+]
+
+
+@pytest.fixture
+def pasang_asgi(aplikasi, monkeypatch):
+    """Mengimpor asgi.py; variannya terpasang di salinan view_functions yang dipulihkan setelah test."""
+    def pasang():
+        monkeypatch.setattr(aplikasi.app, 'view_functions', dict(aplikasi.app.view_functions))
+        sys.modules.pop('asgi', None)
+        import asgi
+        return asgi
+    yield pasang
+    sys.modules.pop('asgi', None)
+
+
+def test_wsgi_memakai_view_sync(aplikasi):
+    for endpoint in ('dashboard', 'transaksi', 'laporan', 'kelola_user', 'anggaran',
+                     'api_v1_transaksi', 'api_v1_hapus_transaksi'):
+        view = inspect.unwrap(aplikasi.app.view_functions[endpoint])
+        assert not inspect.iscoroutinefunction(view), endpoint
+
+
+@pytest.mark.parametrize('role, path', HALAMAN)
+def test_varian_async_sama_dengan_sync(aplikasi, login, pasang_asgi, role, path):
+    client = aplikasi.app.test_client()
+    login(client, 'user')
+    client.post('/transaksi', data={'aksi': 'tambah', 'tanggal': '2026-01-05', 'tipe': 'Pengeluaran',
+                                    'kategori': 'Makan', 'jumlah': '25000', 'catatan': 'makan siang'})
+    login(client, role, role)
+    client.get(path)  # menghabiskan flash dari POST
+    sync = client.get(path)
+
+    pasang_asgi()
+    respons = client.get(path)
+    assert (respons.status_code, respons.get_data()) == (sync.status_code, sync.get_data())
+
+
+def test_post_tetap_view_sync(aplikasi, login, pasang_asgi):
+    view_sync = aplikasi.app.view_functions['transaksi']
+    asgi = pasang_asgi()
+    assert asgi.app.view_functions['transaksi'] is not view_sync
+    client = aplikasi.app.test_client()
+    user_id = login(client, 'penulis')
+    respons = client.post('/transaksi', data={'aksi': 'tambah', 'tanggal': '2026-02-01', 'tipe': 'Pemasukan',
+                                              'kategori': 'Gaji', 'jumlah': '1000', 'catatan': ''})
+    assert respons.status_code == 302
+    assert aplikasi.db.ambil_transaksi_limit(user_id, 1)[0]['kategori'] == 'Gaji'
+
+
+def test_application_asgi(aplikasi, login, pasang_asgi):
+    from asgiref.testing import ApplicationCommunicator
+
+    asgi = pasang_asgi()
+    client = aplikasi.app.test_client()
+    login(client, 'lewat_asgi')
+    cookie = f"session={client.get_cookie('session').value}".encode()
+    scope = {'type': 'http', 'http_version': '1.1', 'method': 'GET', 'path': '/', 'root_path': '',
+             'query_string': b'', 'headers': [(b'host', b'localhost'), (b'cookie', cookie)]}
+
+    async def request():
+        komunikator = ApplicationCommunicator(asgi.application, scope)
+        await komunikator.send_input({'type': 'http.request', 'body': b''})
+        pesan = [await komunikator.receive_output(5)]
+        while pesan[-1]['type'] == 'http.response.start' or pesan[-1].get('more_body'):
+            pesan.append(await komunikator.receive_output(5))
+        return pesan
+
+    async def bersamaan():
+        # Beberapa request sekaligus: masing-masing di thread sendiri
+        return await asyncio.gather(*(request() for _ in range(8)))
+
+    for mulai, *body in asyncio.run(bersamaan()):
+        assert mulai['status'] == 200
+        assert b'lewat_asgi' in b''.join(p.get('body', b'') for p in body)
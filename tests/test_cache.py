@@ -0,0 +1,63 @@
+import pytest
+
+import cache
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        backend = cache.MemoryBackend()
+    else:
+        backend = cache.SQLiteBackend(str(tmp_path / 'cache.db'))
+    cache.configure(backend)
+    yield backend
+    cache.configure(None)
+
+
+def test_hasil_cache_tidak_ikut_berubah(backend):
+    @cache.cached()
+    def ringkasan(user_id):
+        return {'per_kategori': [{'kategori': 'Makan', 'total': 100}]}
+
+    pertama = ringkasan(1)
+    pertama['per_kategori'].append({'kategori': 'Sisipan', 'total': 1})
+    kedua = ringkasan(1)
+    kedua['per_kategori'][0]['total'] = 0
+    assert ringkasan(1) == {'per_kategori': [{'kategori': 'Makan', 'total': 100}]}
+    assert cache.stats()['hits'] >= 2
+
+
+def test_kedua_backend_mengembalikan_bentuk_json(backend):
+    @cache.cached()
+    def pasangan(user_id):
+        return {1: (2, 3)}
+
+    pasangan(1)
+    assert pasangan(1) == {'1': [2, 3]}
+
+
+def test_invalidate_all_saat_sedang_dihitung(backend):
+    # invalidate_all di tengah perhitungan: hasil lama tersimpan di key lama,
+    # pembacaan berikutnya tetap menghitung ulang
+    data = {'total': 100}
+
+    @cache.cached()
+    def ringkasan(user_id):
+        hasil = dict(data)
+        data['total'] = 200
+        cache.invalidate_all()
+        return hasil
+
+    assert ringkasan(1) == {'total': 100}
+    assert ringkasan(1) == {'total': 200}
+
+
+def test_default_backend_bersama(monkeypatch, tmp_path):
+    monkeypatch.delenv('CACHE_BACKEND', raising=False)
+    monkeypatch.delenv('CACHE_PATH', raising=False)
+    cache.configure_from_env(str(tmp_path / 'app.cache.db'))
+    try:
+        assert isinstance(cache._backend, cache.SQLiteBackend)
+        assert cache._backend.path == str(tmp_path / 'app.cache.db')
+    finally:
+        cache.configure(None)
@@ -0,0 +1,195 @@
+# EXPLAIN QUERY PLAN untuk setiap query database.py: gagal jika ada yang
+# membaca seluruh tabel/index atau mengurutkan lewat temp B-tree, kecuali
+# langkah plan yang tercatat di IZIN_PLAN beserta alasannya.
+import os
+import re
+import tempfile
+
+import database as db
+
+
+def jalankan_semua_query():
+    """Call every read/write function in database.py against the current DB_NAME."""
+    db.tambah_user('alice', 'x')
+    db.tambah_user('bob', 'x')
+    uid = db.cek_user('alice')['id']
+    db.get_user_by_id(uid)
+    db.tambah_transaksi(uid, '2026-01-05', 'Pemasukan', 'Gaji', 100, '')
+    db.tambah_transaksi(uid, '2026-01-06', 'Pengeluaran', 'Makan', 25, '')
+    db.ambil_semua_transaksi(uid)
+    db.ambil_semua_transaksi(uid, '2026-01-01', '2026-01-31', 'Pengeluaran')
+    db.ambil_transaksi_limit(uid, 5)
+    db.ambil_transaksi_limit(uid, 5, bulan=1, tahun=2026)
+    db.ambil_satu_transaksi(1, uid)
+    db.edit_transaksi(1, uid, '2026-01-05', 'Pemasukan', 'Gaji', 150, '')
+    db.get_available_months(uid)
+    db.hitung_ringkasan(uid)
+    db.hitung_ringkasan(uid, bulan=1, tahun=2026)
+    db.admin_hitung_ringkasan()
+    db.hitung_agregasi(uid, '2026-01-01', '2026-01-31', 'Pemasukan')
+    db.hitung_agregasi(None, '2026-01-01', '2026-01-31')
+    db.admin_get_stats_per_user()
+    db.admin_top_user(10)
+    for granularitas in ('harian', 'mingguan', 'bulanan'):
+        db.ambil_deret_waktu(uid, granularitas, '2025-12-01', '2026-01-31')
+    db.admin_get_all_users()
+    db.admin_get_all_users_detail()
+    db.admin_laporan('2026-01-01', '2026-01-31')
+    db.admin_laporan('2026-01-01', '2026-01-31', uid, 'Pemasukan')
+    halaman = db.ambil_transaksi_halaman(uid, per_page=1)
+    db.saldo_berjalan(uid, halaman['transaksi'])
+    db.ambil_transaksi_halaman(uid, per_page=1, after=halaman['next_cursor'])
+    db.ambil_transaksi_halaman(uid, per_page=1, before=halaman['next_cursor'])
+    halaman = db.admin_laporan_halaman('2026-01-01', '2026-01-31', per_page=1)
+    db.admin_laporan_halaman('2026-01-01', '2026-01-31', per_page=1, after=halaman['next_cursor'])
+    db.admin_laporan_halaman(per_page=1, before=halaman['next_cursor'])
+    db.admin_ambil_transaksi_limit(10)
+    halaman = db.cari_transaksi('gaj', uid, '2026-01-01', '2026-01-31', per_page=1)
+    db.cari_transaksi('makan', per_page=1, after=halaman['next_cursor'])
+    db.hitung_agregasi(uid, cari='gaji')
+    db.simpan_anggaran(uid, 'Makan', 20)
+    db.simpan_anggaran(uid, 'Makan', 30)
+    db.status_anggaran(uid, 1, 2026)
+    db.ambil_peringatan_anggaran(uid, 1, 2026)
+    db.ambil_peringatan_anggaran(uid, 1, 2026, 'Makan')
+    db.hapus_anggaran(uid, 'Makan')
+    id_aturan = db.tambah_transaksi_berulang(uid, 'bulanan', '2026-01-25', 'Pengeluaran', 'Sewa', 50, '')
+    db.ambil_transaksi_berulang(uid)
+    db.materialisasi_berulang('2026-03-01')
+    db.hapus_transaksi_berulang(id_aturan, uid)
+    db.update_user(uid, 'alice')
+    db.update_password(uid, 'y')
+    db.hapus_transaksi(2, uid)
+    db.hapus_transaksi_banyak([db.tambah_transaksi_id(uid, '2026-01-07', 'Pengeluaran', 'Makan', 5, ''), 1], uid)
+    db.hapus_user(db.cek_user('bob')['id'])
+
+
+# Plan steps that read more than an index lookup but are expected. Each
+# entry is (pattern matched against the whitespace-normalized SQL, exact
+# EXPLAIN QUERY PLAN detail, reason). Anything else that scans a table or
+# sorts through a temporary B-tree fails cek_index.
+
+IZIN_PLAN = [
+    (r"^SELECT tipe, kategori, SUM\(total\) AS total, SUM\(jumlah_transaksi\) AS n "
+     r"FROM ringkasan_bulanan WHERE 1=1 AND user_id = ",
+     'USE TEMP B-TREE FOR GROUP BY',
+     "hitung_agregasi (rollup, one user): sorts that user's rollup rows "
+     "(months x categories), never transaksi rows"),
+    (r"^SELECT tipe, kategori, SUM\(total\) AS total, SUM\(jumlah_transaksi\) AS n "
+     r"FROM ringkasan_bulanan WHERE 1=1 GROUP BY",
+     'SCAN ringkasan_bulanan USING COVERING INDEX idx_ringkasan_tipe_kategori',
+     "hitung_agregasi (rollup, all users): the admin total reads every rollup row "
+     "once, already grouped by the covering index"),
+    (r"^SELECT tipe, kategori, SUM\(jumlah\) AS total, COUNT\(\*\) AS n FROM transaksi WHERE ",
+     'USE TEMP B-TREE FOR GROUP BY',
+     "hitung_agregasi (date range or search): sorts only the rows found through "
+     "the tanggal/user index or the FTS match"),
+    (r"^SELECT date\(tanggal, '-6 days', 'weekday 1'\) AS periode, .* FROM transaksi WHERE user_id = ",
+     'USE TEMP B-TREE FOR GROUP BY',
+     "ambil_deret_waktu (weekly): week buckets are an expression over the "
+     "user's date range, which is read through the index"),
+    (r"^SELECT u\.(?:id, u\.)?username, .* FROM users u LEFT JOIN ringkasan_bulanan r "
+     r"ON u\.id = r\.user_id WHERE u\.role != 'admin' GROUP BY u\.id, u\.username",
+     'SCAN u',
+     "admin_get_stats_per_user / admin_get_all_users_detail / admin_top_user: one "
+     "row per user is the result; rollup rows are joined by primary key"),
+    (r"^SELECT u\.id, u\.username, .* GROUP BY u\.id, u\.username "
+     r"ORDER BY COALESCE\(SUM\(r\.total\), 0\) DESC, u\.id LIMIT ",
+     'USE TEMP B-TREE FOR ORDER BY',
+     "admin_top_user: ranking by an aggregate needs every user's total; "
+     "bounded by the number of users"),
+    (r"^SELECT id, username FROM users WHERE role != 'admin'$",
+     'SCAN users USING COVERING INDEX idx_users_role',
+     "admin_get_all_users: lists every non-admin user"),
+    (r"^SELECT t\.\*, u\.username FROM transaksi t LEFT JOIN users u ON t\.user_id = u\.id "
+     r"ORDER BY t\.tanggal DESC, t\.id DESC LIMIT ",
+     'SCAN t USING INDEX idx_transaksi_tanggal',
+     "admin_ambil_transaksi_limit: walks the tanggal index newest first and "
+     "stops after LIMIT rows"),
+    (r"^SELECT t\.\*, u\.username, (?:bm25\(|f\.skor)",
+     'USE TEMP B-TREE FOR ORDER BY',
+     "cari_transaksi: results are ordered by bm25 rank, computed over the FTS "
+     "match hits only"),
+    (r"^SELECT t\.\*, u\.username, f\.skor FROM \(SELECT rowid, bm25\(",
+     'SCAN f',
+     "cari_transaksi: reads the subquery's page of at most LIMIT ranked hits"),
+]
+
+
+def pakai_index(detail):
+    """True for plan steps that are index lookups, or no table read at all."""
+    if detail.startswith('SCAN'):
+        # FTS5 MATCH (idxStr M...) is an index lookup; CONSTANT ROW reads no table
+        return detail == 'SCAN CONSTANT ROW' or re.search(r'VIRTUAL TABLE INDEX \d+:M', detail) is not None
+    return 'TEMP B-TREE' not in detail
+
+
+def cek_index(izin_plan=IZIN_PLAN):
+    """Run EXPLAIN QUERY PLAN on every query issued by database.py.
+
+    Returns a list of (sql, plan detail) for statements that scan a table
+    (or a whole index) or sort through a temporary B-tree, unless that plan
+    step is listed in IZIN_PLAN. IZIN_PLAN entries that no longer match any
+    statement are returned too, so the allowlist cannot go stale.
+    """
+    nama_lama, shards_lama = db.DB_NAME, db.DB_SHARDS
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, 'cek_index.db')
+        # Query per shard sama dengan query satu file; cukup diperiksa tanpa sharding
+        db.DB_SHARDS = 1
+        try:
+            db.init_db()
+            conn = db.get_connection()
+            statements = []
+            conn.set_trace_callback(statements.append)
+            try:
+                jalankan_semua_query()
+            finally:
+                conn.set_trace_callback(None)
+
+            izin = [(re.compile(pola), detail, alasan) for pola, detail, alasan in izin_plan]
+            terpakai = set()
+            masalah = []
+            for sql in dict.fromkeys(statements):
+                kata_awal = sql.lstrip().split(None, 1)[0].upper()
+                if kata_awal not in ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE'):
+                    continue
+                sql = ' '.join(sql.split())
+                for row in conn.execute('EXPLAIN QUERY PLAN ' + sql):
+                    detail = row[3]
+                    if pakai_index(detail):
+                        continue
+                    cocok = [i for i, (pola, d, _) in enumerate(izin) if d == detail and pola.search(sql)]
+                    if cocok:
+                        terpakai.update(cocok)
+                    else:
+                        masalah.append((sql, detail))
+            for i, (pola, detail, alasan) in enumerate(izin_plan):
+                if i not in terpakai:
+                    masalah.append((pola, f'IZIN_PLAN entry matched no statement: {detail}'))
+            return masalah
+        finally:
+            db.close_connection()
+            db.DB_NAME, db.DB_SHARDS = nama_lama, shards_lama
+
+
+def test_semua_query_memakai_index():
+    masalah = cek_index()
+    assert masalah == [], '\n'.join(f'{detail}\n    {sql}' for sql, detail in masalah)
+
+
+def test_sort_tanpa_index_terdeteksi(monkeypatch):
+    # Versi lama get_available_months: DISTINCT atas strftime(tanggal) butuh temp B-tree
+    def bulan_lama(user_id):
+        return db.get_connection(user_id).execute(
+            "SELECT DISTINCT strftime('%Y', tanggal) AS tahun, strftime('%m', tanggal) AS bulan "
+            "FROM transaksi WHERE user_id = ? ORDER BY tahun DESC, bulan DESC", (user_id,)).fetchall()
+    monkeypatch.setattr(db, 'get_available_months', bulan_lama)
+    detail = {d for _, d in cek_index()}
+    assert 'USE TEMP B-TREE FOR DISTINCT' in detail
+
+
+def test_izin_plan_tidak_basi():
+    # Entri IZIN_PLAN yang tidak lagi cocok dengan statement mana pun ikut dilaporkan
+    izin_plan = IZIN_PLAN + [('^SELECT tidak_ada', 'SCAN tidak_ada', 'contoh')]
+    assert [sql for sql, _ in cek_index(izin_plan)] == ['^SELECT tidak_ada']
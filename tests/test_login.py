@@ -0,0 +1,35 @@
+import sqlite3
+
+import pytest
+
+import cache
+
+
+@pytest.fixture
+def cache_per_proses():
+    cache.configure(cache.MemoryBackend())
+    yield
+    cache.configure(None)
+
+
+def _ubah_dari_worker_lain(aplikasi, sql, user_id):
+    # Koneksi terpisah tanpa cache.invalidate, seperti penulisan di proses lain
+    with sqlite3.connect(aplikasi.db.DB_NAME) as conn:
+        conn.execute(sql, (user_id,))
+
+
+def test_admin_diturunkan_di_worker_lain(aplikasi, login, cache_per_proses):
+    client = aplikasi.app.test_client()
+    user_id = login(client, 'admin_lama', 'admin')
+    assert client.get('/kelola-user').status_code == 200
+    _ubah_dari_worker_lain(aplikasi, "UPDATE users SET role = 'user' WHERE id = ?", user_id)
+    assert client.get('/kelola-user').status_code == 302
+
+
+def test_user_dihapus_di_worker_lain(aplikasi, login, cache_per_proses):
+    client = aplikasi.app.test_client()
+    user_id = login(client, 'akan_dihapus')
+    assert client.get('/').status_code == 200
+    _ubah_dari_worker_lain(aplikasi, 'DELETE FROM users WHERE id = ?', user_id)
+    respons = client.get('/')
+    assert respons.status_code == 302 and respons.location.endswith('/login')
@@ -0,0 +1,42 @@
+import pytest
+
+
+@pytest.fixture
+def metrik(aplikasi):
+    """Memanggil view di balik metrics_required dalam satu request tiruan."""
+    import database as db
+
+    def panggil(headers=None, remote_addr='127.0.0.1', user=None):
+        view = aplikasi.metrics_required(lambda: 'metrik')
+        with aplikasi.app.test_request_context('/metrics', headers=headers,
+                                               environ_base={'REMOTE_ADDR': remote_addr}):
+            if user is not None:
+                username, role_db, role_session = user
+                if db.cek_user(username) is None:
+                    db.tambah_user(username, 'x', role_db)
+                aplikasi.session['user_id'] = db.cek_user(username)['id']
+                aplikasi.session['role'] = role_session
+            return aplikasi.app.make_response(view())
+    return panggil
+
+
+def test_loopback_tanpa_token_ditolak(metrik, monkeypatch):
+    monkeypatch.delenv('METRICS_TOKEN', raising=False)
+    assert metrik().status_code == 302
+
+
+def test_token(metrik, monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', 'rahasia')
+    assert metrik({'Authorization': 'Bearer rahasia'}, remote_addr='10.0.0.9').get_data() == b'metrik'
+    assert metrik({'Authorization': 'Bearer salah'}).status_code == 302
+
+
+def test_admin_login(metrik, monkeypatch):
+    monkeypatch.delenv('METRICS_TOKEN', raising=False)
+    assert metrik(user=('admin_metrik', 'admin', 'admin')).get_data() == b'metrik'
+
+
+def test_role_session_tidak_dipercaya(metrik, monkeypatch):
+    monkeypatch.delenv('METRICS_TOKEN', raising=False)
+    # Role di cookie session admin, tetapi di database sudah user biasa
+    assert metrik(user=('mantan_admin', 'user', 'admin')).status_code == 403
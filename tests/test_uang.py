@@ -0,0 +1,42 @@
+import pytest
+
+import uang
+
+
+@pytest.mark.parametrize('nilai, sen', [('1500.5', 150050), (0.1, 10), ('1e3', 100000),
+                                        ('1000000000000', uang.MAKS_SEN)])
+def test_ke_sen(nilai, sen):
+    assert uang.ke_sen(nilai) == sen
+
+
+@pytest.mark.parametrize('nilai', ['abc', None, True, 'nan', 'inf', '1e30', '1e20',
+                                   '1000000000000.01', '-1e20', 10**30])
+def test_ke_sen_menolak(nilai):
+    with pytest.raises(ValueError):
+        uang.ke_sen(nilai)
+
+
+@pytest.mark.parametrize('path, data', [
+    ('/transaksi', {'aksi': 'tambah', 'tanggal': '2026-01-05', 'tipe': 'Pemasukan',
+                    'kategori': 'Gaji', 'jumlah': '1e30'}),
+    ('/transaksi', {'aksi': 'tambah', 'tanggal': '2026-01-05', 'tipe': 'Pemasukan',
+                    'kategori': 'Gaji', 'jumlah': '1e20'}),
+    ('/anggaran', {'kategori': 'Makan', 'batas': '1e30'}),
+])
+def test_form_nominal_terlalu_besar(aplikasi, login, path, data):
+    client = aplikasi.app.test_client()
+    login(client, 'penabung')
+    respons = client.post(path, data=data)
+    assert respons.status_code == 302
+    with client.session_transaction() as session:
+        assert session['_flashes'][-1][0] == 'danger'
+
+
+@pytest.mark.parametrize('jumlah', ['1e30', '1e20'])
+def test_import_nominal_terlalu_besar(aplikasi, login, jumlah):
+    client = aplikasi.app.test_client()
+    login(client, 'penabung')
+    respons = client.post('/transaksi/import', json=[
+        {'tanggal': '2026-01-05', 'tipe': 'Pemasukan', 'kategori': 'Gaji', 'jumlah': jumlah}])
+    assert respons.status_code == 400
+    assert respons.get_json()['errors'][0]['message'].startswith('Jumlah tidak valid')
@@ -0,0 +1,42 @@
+import pytest
+
+
+@pytest.mark.parametrize('tanggal, tipe', [('05/01/2026', 'Pemasukan'), ('2026-01-05', 'Lainnya')])
+def test_form_menerima_seperti_sebelumnya(aplikasi, tanggal, tipe):
+    # Form /transaksi: tanggal dan tipe sudah dibatasi input date dan select
+    assert aplikasi.validasi_transaksi(tanggal, tipe, 'Gaji', '1000') == (100000, None)
+
+
+@pytest.mark.parametrize('tanggal, tipe, pesan', [
+    ('05/01/2026', 'Pemasukan', 'Tanggal tidak valid'),
+    ('2026-01-05', 'Lainnya', 'Tipe harus'),
+])
+def test_import_dan_api_ketat(aplikasi, tanggal, tipe, pesan):
+    jumlah, error = aplikasi.validasi_transaksi_ketat(tanggal, tipe, 'Gaji', '1000')
+    assert jumlah is None and error.startswith(pesan)
+
+
+def test_import_menolak_tipe_asing(aplikasi, login):
+    client = aplikasi.app.test_client()
+    login(client, 'importir')
+    respons = client.post('/transaksi/import', json=[
+        {'tanggal': '2026-01-05', 'tipe': 'Pemasukan', 'kategori': 'Gaji', 'jumlah': '10'},
+        {'tanggal': '2026-01-05', 'tipe': 'Lainnya', 'kategori': 'Gaji', 'jumlah': '10'},
+    ])
+    assert respons.status_code == 400
+    assert [e['baris'] for e in respons.get_json()['errors']] == [2]
+
+
+@pytest.mark.parametrize('tanggal, peringatan', [('05/01/2026', False), ('2026-01-05', True)])
+def test_form_pengeluaran_dengan_anggaran(aplikasi, login, tanggal, peringatan):
+    client = aplikasi.app.test_client()
+    user_id = login(client, f'penganggar{int(peringatan)}')
+    client.post('/anggaran', data={'kategori': 'Makan', 'batas': '10'})
+    respons = client.post('/transaksi', data={'aksi': 'tambah', 'tanggal': tanggal, 'tipe': 'Pengeluaran',
+                                              'kategori': 'Makan', 'jumlah': '25', 'catatan': ''})
+    # Transaksi tersimpan sekali dan respons tetap redirect, bukan 500
+    assert respons.status_code == 302
+    assert [t['tanggal'] for t in aplikasi.db.ambil_transaksi_limit(user_id, 5)] == [tanggal]
+    with client.session_transaction() as session:
+        pesan = [pesan for _, pesan in session.get('_flashes', [])]
+    assert any('melebihi anggaran' in p for p in pesan) == peringatan
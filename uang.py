@@ -0,0 +1,102 @@
+from array import array
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN, ROUND_HALF_UP
+
+# Semua nominal disimpan sebagai INTEGER dalam sen (1 Rupiah = 100 sen),
+# sehingga penjumlahan selalu eksak dan tidak membawa galat float.
+SEN_PER_RUPIAH = 100
+
+_SATU_SEN = Decimal('0.01')
+
+# Nominal terbesar per transaksi/anggaran: Rp 1 triliun. Jauh di bawah batas
+# INTEGER SQLite (2**63 - 1 sen), sehingga SUM atas puluhan ribu transaksi
+# sebesar ini pun tidak overflow.
+MAKS_SEN = 10**12 * SEN_PER_RUPIAH
+
+
+def ke_sen(nilai):
+    """Mengubah nominal Rupiah (str/int/float) menjadi integer sen.
+
+    Dibulatkan ke sen terdekat. Melempar ValueError jika bukan angka
+    yang valid (termasuk NaN dan tak hingga) atau jika besarnya melebihi
+    MAKS_SEN.
+    """
+    if isinstance(nilai, bool):
+        raise ValueError(nilai)
+    try:
+        # str() dulu agar float 0.1 dibaca sebagai 0.1, bukan 0.1000000000000000055...
+        rupiah = Decimal(str(nilai).strip())
+        if not rupiah.is_finite():
+            raise ValueError(nilai)
+        # quantize melempar InvalidOperation untuk eksponen besar seperti '1e30'
+        sen = int(rupiah.quantize(_SATU_SEN, rounding=ROUND_HALF_UP) * SEN_PER_RUPIAH)
+    except (InvalidOperation, TypeError):
+        raise ValueError(nilai) from None
+    if abs(sen) > MAKS_SEN:
+        raise ValueError(nilai)
+    return sen
+
+
+def ke_rupiah(sen):
+    """Integer sen menjadi angka Rupiah untuk JSON/chart (int jika bulat)."""
+    rupiah, sisa = divmod(int(sen), SEN_PER_RUPIAH)
+    if not sisa:
+        return rupiah
+    return float(Decimal(int(sen)) / SEN_PER_RUPIAH)
+
+
+def format_desimal(sen):
+    """Integer sen menjadi teks desimal eksak, mis. 1500050 -> '15000.50'."""
+    sen = int(sen)
+    rupiah, sisa = divmod(abs(sen), SEN_PER_RUPIAH)
+    tanda = '-' if sen < 0 else ''
+    return f'{tanda}{rupiah}' if not sisa else f'{tanda}{rupiah}.{sisa:02d}'
+
+
+def format_rupiah(sen):
+    """Integer sen menjadi 'Rp 1.234.567' (dibulatkan ke Rupiah, half-even
+    seperti format float '{:,.0f}' sebelumnya)."""
+    rupiah = (Decimal(int(sen)) / SEN_PER_RUPIAH).quantize(Decimal(1), rounding=ROUND_HALF_EVEN)
+    return f"Rp {int(rupiah):,}".replace(",", ".")
+
+
+class DeretUang:
+    """Deret nominal (sen) yang disimpan rapat di array('q').
+
+    Untuk hasil agregasi dan data chart yang besar: 8 byte per nilai, bukan
+    satu objek int per baris, dan sum() berjalan di atas integer eksak.
+    Atribut `data` (array) mendukung buffer protocol, jadi
+    numpy.frombuffer(deret.data, dtype='int64') bisa membacanya tanpa
+    menyalin bila NumPy tersedia.
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, nilai=()):
+        self.data = array('q', nilai)
+
+    @classmethod
+    def dari_kolom(cls, rows, kolom):
+        """Mengambil satu kolom sen dari baris hasil query."""
+        return cls(row[kolom] for row in rows)
+
+    def append(self, sen):
+        self.data.append(sen)
+
+    def total(self):
+        return sum(self.data)
+
+    def ke_rupiah(self):
+        """List angka Rupiah, siap di-serialisasi ke JSON untuk chart."""
+        return [ke_rupiah(sen) for sen in self.data]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __getitem__(self, index):
+        return self.data[index]
+
+    def __repr__(self):
+        return f'DeretUang({self.data.tolist()!r})'